@@ -0,0 +1,276 @@
+"""
+Running accumulation of distributed correction values.
+
+Instead of keeping every event around and averaging all of them again, the
+accumulator keeps a per-cell sum and count of the non-zero shares of the
+events (see event_table.py). Events from new logs can be added at any time
+and the averaged table is what average_distributed_results would return for
+all events together.
+
+Next to the plain sums, every cell keeps the (constant size) state for the
+other aggregation modes (see AGGREGATION_MODES in config.py), so switching
+the mode needs no re-parsing and works with any number of logs:
+  - dwell / area: sums of value * excursion duration / area and of the weights,
+  - trimmed: a histogram of the values (count and sum per bin); the trimmed
+    mean drops whole bins from both ends and a share of the bin where the
+    cut falls, taking that share at the bin's mean value.
+Recency weighting needs the accumulators of the single logs and is done by
+logset.LogSet.
+"""
+
+from array import array
+
+from config import ROW_HEADERS, COL_HEADERS, TRIM_FRACTION, HISTOGRAM_BINS, HISTOGRAM_RANGE
+
+_BIN_WIDTH = 2 * HISTOGRAM_RANGE / HISTOGRAM_BINS
+
+
+def _bin(value):
+    """Histogram bin of a value (values outside the range go to the end bins)."""
+    return min(HISTOGRAM_BINS - 1, max(0, int((value + HISTOGRAM_RANGE) / _BIN_WIDTH)))
+
+
+def trimmed_mean(histogram, trim=TRIM_FRACTION):
+    """
+    Mean of a cell histogram (HISTOGRAM_BINS counts followed by the sums)
+    without the 'trim' fraction of smallest and of largest values.
+    """
+    counts = histogram[:HISTOGRAM_BINS]
+    sums = histogram[HISTOGRAM_BINS:]
+    total_count = sum(counts)
+    if total_count <= 0:
+        return 0
+    total_sum = sum(sums)
+    for order in (range(HISTOGRAM_BINS), range(HISTOGRAM_BINS - 1, -1, -1)):
+        remaining = total_count * trim
+        for b in order:
+            if remaining <= 0:
+                break
+            count = counts[b]
+            if count <= 0:
+                continue
+            taken = min(count, remaining)
+            total_sum -= sums[b] * taken / count
+            remaining -= taken
+    kept = total_count * (1 - 2 * trim)
+    return total_sum / kept if kept > 0 else sum(sums) / total_count
+
+
+class CorrectionAccumulator:
+    def __init__(self, row_headers=ROW_HEADERS, col_headers=COL_HEADERS):
+        self.row_headers = row_headers
+        self.col_headers = col_headers
+        self.sums = {}    # (row_header, col_header) -> sum of non-zero values
+        self.counts = {}  # (row_header, col_header) -> number of non-zero values
+        # Dwell weighting: sums of value * weight and of the weights, for the
+        # excursion duration and area as weight.
+        self.dwell_sums = {}
+        self.dwell_weights = {}
+        self.area_sums = {}
+        self.area_weights = {}
+        self.histograms = {}  # (row_header, col_header) -> array of bin counts, then bin sums
+        self.timestamp = None  # time of the log (for recency weighting), if known
+
+    def _weighted(self):
+        """The per-cell sums that merge and subtract alike."""
+        return (self.sums, self.dwell_sums, self.dwell_weights, self.area_sums, self.area_weights)
+
+    def add(self, events, file_id=None):
+        """
+        Adds the events of an EventTable (see event_table.py), all or only
+        those of one log, to the running totals. Every non-zero share of an
+        event in a cell counts as one value of that cell.
+        """
+        cell_count = len(events.row_headers) * len(events.col_headers)
+        sums = [0.0] * cell_count
+        counts = [0] * cell_count
+        dwell_sums = [0.0] * cell_count
+        dwell_weights = [0.0] * cell_count
+        area_sums = [0.0] * cell_count
+        area_weights = [0.0] * cell_count
+        histograms = {}
+        durations = events.columns["duration"]
+        areas = events.columns["area"]
+        for index, cell, value in events.shares(file_id):
+            duration = durations[index]
+            area = areas[index]
+            sums[cell] += value
+            counts[cell] += 1
+            dwell_sums[cell] += value * duration
+            dwell_weights[cell] += duration
+            area_sums[cell] += value * area
+            area_weights[cell] += area
+            histogram = histograms.get(cell)
+            if histogram is None:
+                histogram = histograms[cell] = array("d", bytes(16 * HISTOGRAM_BINS))
+            b = _bin(value)
+            histogram[b] += 1
+            histogram[HISTOGRAM_BINS + b] += value
+
+        # Fold the flat per-cell totals into the keyed ones.
+        for cell, count in enumerate(counts):
+            if not count:
+                continue
+            key = events.cell_key(cell)
+            for mine, value in zip(self._weighted(), (sums[cell], dwell_sums[cell], dwell_weights[cell],
+                                                      area_sums[cell], area_weights[cell])):
+                mine[key] = mine.get(key, 0) + value
+            self.counts[key] = self.counts.get(key, 0) + count
+            own = self.histograms.get(key)
+            if own is None:
+                self.histograms[key] = histograms[cell]
+            else:
+                for b, value in enumerate(histograms[cell]):
+                    own[b] += value
+
+    def merge(self, other):
+        """Adds the totals of another accumulator (e.g. one per log file) to this one."""
+        for mine, theirs in zip(self._weighted(), other._weighted()):
+            for key, value in theirs.items():
+                mine[key] = mine.get(key, 0) + value
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        for key, histogram in other.histograms.items():
+            own = self.histograms.get(key)
+            if own is None:
+                self.histograms[key] = array("d", histogram)
+            else:
+                for b, value in enumerate(histogram):
+                    own[b] += value
+
+    def subtract(self, other):
+        """Removes the totals of another accumulator that was merged earlier."""
+        for mine, theirs in zip(self._weighted(), other._weighted()):
+            for key, value in theirs.items():
+                mine[key] = mine.get(key, 0) - value
+        for key, histogram in other.histograms.items():
+            own = self.histograms.get(key)
+            if own is not None:
+                for b, value in enumerate(histogram):
+                    own[b] -= value
+        for key, count in other.counts.items():
+            remaining = self.counts.get(key, 0) - count
+            if remaining > 0:
+                self.counts[key] = remaining
+            else:
+                self.counts.pop(key, None)
+                self.histograms.pop(key, None)
+                for values in self._weighted():
+                    values.pop(key, None)
+
+    def is_empty(self):
+        return not self.counts
+
+    def averaged(self, mode="mean", trim=TRIM_FRACTION):
+        """
+        Returns a dictionary with keys (row_header, col_header) and the averaged
+        non-zero values, in the same form as average_distributed_results.
+        'mode' is "mean", "dwell", "area" or "trimmed" (see AGGREGATION_MODES;
+        "recency" is the plain mean for a single accumulator).
+        """
+        if mode == "dwell":
+            weighted = (self.dwell_sums, self.dwell_weights)
+        elif mode == "area":
+            weighted = (self.area_sums, self.area_weights)
+        else:
+            weighted = None
+
+        avg_distributed = {}
+        for row in self.row_headers:
+            for col in self.col_headers:
+                key = (row, col)
+                count = self.counts.get(key, 0)
+                if not count:
+                    avg_distributed[key] = 0
+                elif mode == "trimmed" and key in self.histograms:
+                    avg_distributed[key] = trimmed_mean(self.histograms[key], trim)
+                elif weighted is not None and weighted[1].get(key, 0) > 0:
+                    avg_distributed[key] = weighted[0][key] / weighted[1][key]
+                else:
+                    avg_distributed[key] = self.sums[key] / count
+        return avg_distributed
+
+    def to_dict(self):
+        """Returns a JSON serializable representation (cell keys as 'row|col')."""
+        data = {
+            "sums": {f"{r}|{c}": v for (r, c), v in self.sums.items()},
+            "counts": {f"{r}|{c}": v for (r, c), v in self.counts.items()},
+            # Only the used bins, as [bin, count, sum].
+            "histograms": {
+                f"{r}|{c}": [[b, h[b], h[HISTOGRAM_BINS + b]] for b in range(HISTOGRAM_BINS) if h[b]]
+                for (r, c), h in self.histograms.items()
+            },
+            "timestamp": self.timestamp
+        }
+        for name in ("dwell_sums", "dwell_weights", "area_sums", "area_weights"):
+            data[name] = {f"{r}|{c}": v for (r, c), v in getattr(self, name).items()}
+        return data
+
+    @classmethod
+    def from_dict(cls, data, row_headers=ROW_HEADERS, col_headers=COL_HEADERS):
+        """Rebuilds an accumulator from the output of to_dict."""
+        acc = cls(row_headers, col_headers)
+        for key, value in data.get("sums", {}).items():
+            acc.sums[_parse_key(key)] = value
+        for key, count in data.get("counts", {}).items():
+            acc.counts[_parse_key(key)] = count
+        for name in ("dwell_sums", "dwell_weights", "area_sums", "area_weights"):
+            values = getattr(acc, name)
+            for key, value in data.get(name, {}).items():
+                values[_parse_key(key)] = value
+        for key, bins in data.get("histograms", {}).items():
+            histogram = acc.histograms[_parse_key(key)] = array("d", bytes(16 * HISTOGRAM_BINS))
+            for b, count, total in bins:
+                histogram[b] = count
+                histogram[HISTOGRAM_BINS + b] = total
+        acc.timestamp = data.get("timestamp")
+        return acc
+
+
+class GridAccumulator:
+    """
+    Per-cell sum and count of arbitrary sample values, for the analyzers
+    (see analyzers.py) that look at other things than the N75 correction.
+    """
+
+    def __init__(self, row_headers=ROW_HEADERS, col_headers=COL_HEADERS):
+        self.row_headers = row_headers
+        self.col_headers = col_headers
+        self.sums = {}
+        self.counts = {}
+
+    def add(self, key, value):
+        self.sums[key] = self.sums.get(key, 0) + value
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def add_many(self, keys, values):
+        """Adds one value per cell key (two equally long sequences)."""
+        for key, value in zip(keys, values):
+            self.sums[key] = self.sums.get(key, 0) + value
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def merge(self, other):
+        for key, value in other.sums.items():
+            self.sums[key] = self.sums.get(key, 0) + value
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+
+    def means(self):
+        """Mean value per cell (0 where nothing was added), keyed (row_header, col_header)."""
+        return {
+            (row, col): self.sums[(row, col)] / self.counts[(row, col)] if self.counts.get((row, col)) else 0
+            for row in self.row_headers for col in self.col_headers
+        }
+
+    def totals(self):
+        """Summed value per cell (0 where nothing was added), keyed (row_header, col_header)."""
+        return {
+            (row, col): self.sums.get((row, col), 0)
+            for row in self.row_headers for col in self.col_headers
+        }
+
+
+def _parse_key(key):
+    """Turns a 'row|col' string back into a (row_header, col_header) tuple."""
+    row, col = key.split("|", 1)
+    return int(row), col
@@ -0,0 +1,205 @@
+"""
+Analyzers sharing one pass over a log.
+
+The N75 correction table is only one thing the logs can tell. Every analysis
+is an Analyzer: it declares the channels it needs (names from
+csv_handler.COLUMNS), owns its own grid accumulator and gets the log chunk by
+chunk. run_analyzers reads the (conditioned / resampled, cached) columns once
+and hands every chunk to all analyzers, reading only the channels at least one
+of them needs.
+
+New analyses are added by subclassing Analyzer and decorating the class with
+@register; they can then be picked by name (see create_analyzers).
+"""
+
+from bisect import bisect_left
+
+from config import ROW_HEADERS, COL_HEADERS, LIMITER_MARGIN
+from accumulator import CorrectionAccumulator, GridAccumulator
+from csv_handler import COLUMNS, EventDetector, iter_rows
+
+ANALYZERS = {}   # name -> Analyzer subclass
+
+
+def register(cls):
+    """Class decorator adding an analyzer to ANALYZERS."""
+    ANALYZERS[cls.name] = cls
+    return cls
+
+
+def create_analyzers(names, th1, th2):
+    """Instantiates the registered analyzers with the given names."""
+    return [ANALYZERS[name](th1, th2) for name in names]
+
+
+def run_analyzers(chunks, analyzers):
+    """Hands every chunk of columns to all analyzers, then lets them finish."""
+    for chunk in chunks:
+        for analyzer in analyzers:
+            analyzer.process(chunk)
+    for analyzer in analyzers:
+        analyzer.finish()
+    return analyzers
+
+
+def needed_columns(analyzers):
+    """Channels needed by at least one of the analyzers, in COLUMNS order."""
+    needed = set()
+    for analyzer in analyzers:
+        needed.update(analyzer.columns)
+    return [name for name, _ in COLUMNS if name in needed]
+
+
+def _nearest(values, x):
+    """Index of the value nearest to x in an ascending list."""
+    i = bisect_left(values, x)
+    if i == 0:
+        return 0
+    if i == len(values):
+        return i - 1
+    return i if values[i] - x < x - values[i - 1] else i - 1
+
+
+class Analyzer:
+    name = ""
+    title = ""
+    columns = ()
+
+    def __init__(self, th1, th2, row_headers=ROW_HEADERS, col_headers=COL_HEADERS):
+        self.th1 = th1
+        self.th2 = th2
+        self.row_headers = row_headers
+        self.col_headers = col_headers
+        self.grid = GridAccumulator(row_headers, col_headers)
+        self._rows_ascending = sorted(row_headers)
+        self._col_values = [float(s.replace(",", ".")) for s in col_headers]
+
+    def process(self, chunk):
+        """Takes one chunk of columns (channel name -> sequence of floats)."""
+        raise NotImplementedError
+
+    def finish(self):
+        """Called after the last chunk."""
+
+    def table(self):
+        """The analysis result as a table keyed (row_header, col_header)."""
+        return self.grid.means()
+
+    def cell_keys(self, rpm, iq):
+        """Nearest map cell (row_header, col_header) for every RPM / injection quantity pair."""
+        rows = self._rows_ascending
+        cols = self._col_values
+        return [
+            (rows[_nearest(rows, r)], self.col_headers[_nearest(cols, q)])
+            for r, q in zip(rpm, iq)
+        ]
+
+
+@register
+class CorrectionAnalyzer(Analyzer):
+    """The N75 correction table (the checks of csv_handler.detect_events)."""
+    name = "correction"
+    title = "N75 correction"
+    columns = tuple(name for name, _ in COLUMNS)
+
+    def __init__(self, th1, th2, row_headers=ROW_HEADERS, col_headers=COL_HEADERS,
+                 log=None, windows=None):
+        super().__init__(th1, th2, row_headers, col_headers)
+        self.grid = CorrectionAccumulator(row_headers, col_headers)
+        self.detector = EventDetector(th1, th2, log, windows)
+        self.events = None
+
+    def process(self, chunk):
+        self.detector.feed(iter_rows([chunk]))
+
+    def finish(self):
+        self.events = self.detector.finish()
+        self.grid.add(self.events)
+
+    def table(self):
+        return self.grid.averaged()
+
+
+@register
+class SpecDeviationAnalyzer(Analyzer):
+    """Mean deviation of the actual from the specified intake pressure (mbar) per cell."""
+    name = "spec_deviation"
+    title = "Boost deviation from spec (mbar)"
+    columns = ("eng_speed", "inj_qty_actual", "spec_int", "act_int")
+
+    def process(self, chunk):
+        iq = chunk["inj_qty_actual"]
+        # Only while fuel is injected (no overrun / idle cut-off).
+        running = [i for i, q in enumerate(iq) if q > 0]
+        spec = chunk["spec_int"]
+        act = chunk["act_int"]
+        rpm = chunk["eng_speed"]
+        self.grid.add_many(
+            self.cell_keys([rpm[i] for i in running], [iq[i] for i in running]),
+            [act[i] - spec[i] for i in running]
+        )
+
+
+@register
+class LimiterAnalyzer(Analyzer):
+    """
+    Injection quantity limiter hits per cell: how often the actual quantity
+    dropped more than LIMITER_MARGIN below the requested one.
+    """
+    name = "limiter_hits"
+    title = "IQ limiter hits"
+    columns = ("eng_speed", "inj_qty_actual", "inj_qty_req")
+
+    def __init__(self, th1, th2, row_headers=ROW_HEADERS, col_headers=COL_HEADERS,
+                 margin=LIMITER_MARGIN):
+        super().__init__(th1, th2, row_headers, col_headers)
+        self.margin = margin
+        self._limited = False   # state of the last sample of the previous chunk
+
+    def process(self, chunk):
+        act = chunk["inj_qty_actual"]
+        req = chunk["inj_qty_req"]
+        limited = [r > 0 and r - a > self.margin for a, r in zip(act, req)]
+        previous = [self._limited] + limited[:-1]
+        hits = [i for i, (now, before) in enumerate(zip(limited, previous)) if now and not before]
+        if limited:
+            self._limited = limited[-1]
+        rpm = chunk["eng_speed"]
+        self.grid.add_many(self.cell_keys([rpm[i] for i in hits], [req[i] for i in hits]),
+                           [1] * len(hits))
+
+    def table(self):
+        return self.grid.totals()
+
+
+@register
+class OvershootAnalyzer(Analyzer):
+    """Time (seconds) spent at least Threshold 1 above the specified pressure, per cell."""
+    name = "overshoot_duration"
+    title = "Overshoot duration (s)"
+    columns = ("time", "eng_speed", "inj_qty_actual", "spec_int", "act_int")
+
+    def __init__(self, th1, th2, row_headers=ROW_HEADERS, col_headers=COL_HEADERS):
+        super().__init__(th1, th2, row_headers, col_headers)
+        self._last_time = None
+
+    def process(self, chunk):
+        times = chunk["time"]
+        if not len(times):
+            return
+        spec = chunk["spec_int"]
+        act = chunk["act_int"]
+        th1 = self.th1
+        # Each sample stands for the time since the previous one.
+        previous = [times[0] if self._last_time is None else self._last_time] + list(times[:-1])
+        self._last_time = times[-1]
+        over = [i for i, (a, s) in enumerate(zip(act, spec)) if a - s >= th1]
+        rpm = chunk["eng_speed"]
+        iq = chunk["inj_qty_actual"]
+        self.grid.add_many(
+            self.cell_keys([rpm[i] for i in over], [iq[i] for i in over]),
+            [max(0.0, times[i] - previous[i]) for i in over]
+        )
+
+    def table(self):
+        return self.grid.totals()
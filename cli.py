@@ -0,0 +1,352 @@
+"""
+Headless command line runner.
+
+  python main.py watch <directory> [--th1 100] [--th2 200]
+  python main.py analyze <log.csv> [<log.csv> ...] [--exclude <log.csv> ...] [--aggregation dwell]
+  python main.py events <log.csv> [--rpm-min 2000] [--rpm-max 3000] [--min-dev 150] [--show N]
+  python main.py evaluate <log.csv> [<log.csv> ...] --map <map.txt> [--column-fix] [--sensitivity -20]
+  python main.py export <log.csv> [<log.csv> ...] --out <events.bin> [--csv <events.csv>]
+  python main.py report <log.csv> [<log.csv> ...] [--analyzers spec_deviation limiter_hits ...]
+  python main.py serve [--host 127.0.0.1] [--port 8475] [--socket /tmp/n75.sock]
+  python main.py tune <log.csv> [<log.csv> ...] --map <map.txt> [--holdout <log.csv> ...] [--top N] [--sensitivity -20]
+"""
+
+import argparse
+import os
+
+from config import (
+    ROW_HEADERS,
+    COL_HEADERS,
+    DEFAULT_THRESHOLD1,
+    DEFAULT_THRESHOLD2,
+    DEFAULT_CONDITIONING,
+    WATCH_POLL_INTERVAL,
+    AGGREGATION_MODES,
+    SERVICE_HOST,
+    SERVICE_PORT,
+    SERVICE_JOB_WORKERS
+)
+from csv_handler import print_distributed_table
+from accumulator import CorrectionAccumulator
+from logset import LogSet, parse_logs_parallel
+from log_cache import ingest, filter_windows, analyze
+from analyzers import ANALYZERS, create_analyzers
+from watcher import LogWatcher
+from event_table import EventTable
+from maps import parse_vagedcsuite, format_vagedcsuite, map_values, updated_map, fix_map
+from evaluator import ReplayEvaluator
+from tuner import tune, split_logs
+from service import serve
+
+
+def add_threshold_arguments(parser):
+    parser.add_argument("--th1", type=float, default=DEFAULT_THRESHOLD1, help="Threshold 1")
+    parser.add_argument("--th2", type=float, default=DEFAULT_THRESHOLD2, help="Threshold 2")
+    parser.add_argument("--condition", action="store_true",
+                        help="filter the signals (spikes, median, debounce) before event detection")
+    parser.add_argument("--resample", type=float, default=None, metavar="STEP",
+                        help="resample all channels onto a fixed time step (seconds)")
+
+
+def parse_options(args):
+    """Returns the extra parse_csv options selected on the command line."""
+    options = {}
+    if args.condition:
+        options["conditioning"] = dict(DEFAULT_CONDITIONING)
+    if args.resample:
+        options["resample_step"] = args.resample
+    return options
+
+
+def cmd_watch(args):
+    """Watches a directory and prints the averaged table after every ingested batch."""
+    watcher = LogWatcher(args.directory, args.th1, args.th2, parse_options(args),
+                         poll_interval=args.interval)
+    accumulator = CorrectionAccumulator()
+
+    indexed = watcher.indexed_results()
+    for _, acc in indexed:
+        accumulator.merge(acc)
+    print(f"Watching {args.directory} ({len(indexed)} logs restored from index). Ctrl+C to stop.")
+    if indexed:
+        print_distributed_table(accumulator.averaged(), ROW_HEADERS, COL_HEADERS)
+
+    def on_batch(batch):
+        for path, acc in batch:
+            print(f"Ingested {os.path.basename(path)}")
+            accumulator.merge(acc)
+        print("\n--- Averaged Distributed Table - Watch ---")
+        print_distributed_table(accumulator.averaged(), ROW_HEADERS, COL_HEADERS)
+
+    try:
+        watcher.run(on_batch)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+
+
+def cmd_analyze(args):
+    """
+    Parses the logs in parallel, prints the averaged table over all logs that
+    are not excluded and how far each log is from it.
+    """
+    log_set = LogSet()
+    log_set.set_mode(args.aggregation)
+    parse_logs_parallel(args.files, args.th1, args.th2, log_set.add, max_workers=args.workers,
+                        options=parse_options(args))
+
+    excluded = {os.path.abspath(p) for p in args.exclude}
+    for path in log_set.paths():
+        if os.path.abspath(path) in excluded:
+            log_set.set_enabled(path, False)
+
+    aggregate = log_set.averaged()
+    print("\n--- Averaged Distributed Table - Final ---")
+    print_distributed_table(aggregate, ROW_HEADERS, COL_HEADERS)
+
+    print("\n--- RMS deviation from the aggregate per log ---")
+    deviations = [(log_set.deviation(p, aggregate)[1], p) for p in args.files if p in log_set.logs]
+    for rms, path in sorted(deviations, reverse=True):
+        flag = "" if log_set.is_enabled(path) else "  (excluded)"
+        print(f"{rms:>8.3f}  {path}{flag}")
+
+
+def format_window(number, window):
+    """One line summary of an acceleration window."""
+    return (
+        f"#{number:<4} {window['start_time']:>9.2f}-{window['end_time']:<9.2f} "
+        f"rows {window['start_row']}-{window['end_row']:<8} "
+        f"rpm {window['rpm_min']:>5.0f}-{window['rpm_max']:<5.0f} "
+        f"over {window['peak_over']:>7.1f} under {window['peak_under']:>7.1f}  "
+        f"{len(window['cells'])} cells corrected"
+    )
+
+
+def cmd_events(args):
+    """Lists the acceleration windows of a log, or prints the samples of one of them."""
+    options = parse_options(args)
+    _, cached = ingest(args.file, args.th1, args.th2, options)
+    windows = cached.load_events(args.th1, args.th2)
+
+    if args.show is not None:
+        if not 0 <= args.show < len(windows):
+            print(f"No window #{args.show} (log has {len(windows)} windows).")
+            return
+        window = windows[args.show]
+        print(format_window(args.show, window))
+        for row, label, value in window["events"]:
+            print(f"  row {row}: {label} ({value:+.3f})")
+        for r, c, value in window["cells"]:
+            print(f"  {r:>5} / {c:>6}: {value:+.3f}")
+        columns = cached.read_window(window["start_row"], window["end_row"])
+        names = list(columns)
+        print("".join(f"{name:>16}" for name in names))
+        for row in zip(*(columns[name] for name in names)):
+            print("".join(f"{value:>16.2f}" for value in row))
+        return
+
+    selected = filter_windows(windows, args.rpm_min, args.rpm_max, args.min_dev)
+    number_of = {id(window): n for n, window in enumerate(windows)}
+    for window in selected:
+        print(format_window(number_of[id(window)], window))
+    print(f"{len(selected)} of {len(windows)} windows")
+
+
+def cmd_report(args):
+    """
+    Runs the selected analyzers (see analyzers.py) over the logs, one pass per
+    log over the cached columns, and prints one table per analyzer.
+    """
+    totals = create_analyzers(args.analyzers, args.th1, args.th2)
+    options = parse_options(args)
+    for path in args.files:
+        per_log = create_analyzers(args.analyzers, args.th1, args.th2)
+        analyze(path, per_log, options)
+        for total, analyzer in zip(totals, per_log):
+            total.grid.merge(analyzer.grid)
+    for analyzer in totals:
+        print(f"\n--- {analyzer.title} ---")
+        print_distributed_table(analyzer.table(), ROW_HEADERS, COL_HEADERS)
+
+
+def cmd_export(args):
+    """Collects the events of the logs into one EventTable, writes it and prints per-log stats."""
+    options = parse_options(args)
+    table = EventTable()
+    for path in args.files:
+        correction, _ = ingest(path, args.th1, args.th2, options)
+        table.extend(correction.events, path=os.path.abspath(path))
+    if args.out:
+        table.save_binary(args.out)
+    if args.csv:
+        table.save_csv(args.csv)
+    print(f"{len(table)} events ({table.nbytes() / 1024:.1f} kB)")
+    for stats in table.file_stats():
+        print(f"{stats['events']:>7} events  over {stats['over']:>6}  under {stats['under']:>6}  "
+              f"mean weight {stats['weight']:>+7.3f}  excursions {stats['duration']:>8.1f} s  {stats['path']}")
+
+
+def cmd_serve(args):
+    """Runs the local analysis service (see service.py)."""
+    try:
+        serve(args.host, args.port, args.socket, args.workers, args.jobs)
+    except OSError as e:
+        print(f"Cannot start the service: {e}")
+
+
+def read_map(path):
+    """Reads a map saved as VAGEDCSuite clipboard text; returns None (and says so) if invalid."""
+    with open(path, mode="r", encoding="utf-8") as f:
+        texts = parse_vagedcsuite(f.read())
+    if texts is None:
+        print(f"{path} does not hold VAGEDCSuite clipboard data.")
+        return None
+    return map_values(texts)
+
+
+def cmd_evaluate(args):
+    """
+    Replays the logs against the original map (as copied from VAGEDCSuite),
+    the updated map and the fixed map and prints the predicted RMS boost error of each.
+    """
+    original = read_map(args.map)
+    if original is None:
+        return
+
+    options = parse_options(args)
+    accumulator = CorrectionAccumulator()
+    evaluator = ReplayEvaluator(original, sensitivity=args.sensitivity)
+    for path in args.files:
+        correction, cached = ingest(path, args.th1, args.th2, options)
+        accumulator.merge(correction.grid)
+        evaluator.add_log(cached, cached.load_events(args.th1, args.th2))
+
+    updated = updated_map(original, accumulator.averaged())
+    _, fixed = fix_map(updated, args.column_fix)
+    print(f"{evaluator.samples} samples, sensitivity {evaluator.sensitivity:.2f} mbar per %")
+    for name, score in zip(("original", "updated", "fixed"),
+                           evaluator.score_many([original, updated, fixed])):
+        print(f"{name:<9} rms {score['rms']:>8.2f} mbar  improvement {score['improvement']:>+8.2f}")
+
+
+def cmd_tune(args):
+    """
+    Searches thresholds, gain and column fix for the map with the lowest
+    predicted boost error on the held-out logs; prints the ranking and the
+    best map in VAGEDCSuite clipboard format.
+    """
+    original = read_map(args.map)
+    if original is None:
+        return
+    if args.holdout:
+        held_out = [p for p in args.files if p in args.holdout] or args.holdout
+        training = [p for p in args.files if p not in args.holdout]
+    else:
+        training, held_out = split_logs(args.files)
+    if not training:
+        print("Every log is held out; leave at least one log for training.")
+        return
+    print(f"Training on {len(training)} logs, scoring on {len(held_out)} held-out logs.")
+
+    def on_progress(done, total, best):
+        print(f"{done}/{total} threshold pairs, best rms {best['rms']:.2f} "
+              f"(th1 {best['th1']:g}, th2 {best['th2']:g}, gain {best['gain']:g})")
+
+    ranked = tune(original, training, held_out, parse_options(args), max_workers=args.workers,
+                  window_thresholds=(args.th1, args.th2), sensitivity=args.sensitivity,
+                  on_progress=on_progress)
+    if not ranked:
+        print("Nothing to tune.")
+        return
+    print(f"\n{'th1':>7} {'th2':>7} {'gain':>6} {'fix':>4} {'rms':>9} {'improvement':>12}")
+    for entry in ranked[:args.top]:
+        print(f"{entry['th1']:>7g} {entry['th2']:>7g} {entry['gain']:>6g} "
+              f"{'yes' if entry['column_fix'] else 'no':>4} {entry['rms']:>9.2f} {entry['improvement']:>+12.2f}")
+    print("\nBest map:")
+    print(format_vagedcsuite(ranked[0]["map"]))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py", description="n75-Tuner headless runner")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    watch = subparsers.add_parser("watch", help="ingest new CSV logs dropped into a directory")
+    watch.add_argument("directory")
+    add_threshold_arguments(watch)
+    watch.add_argument("--interval", type=float, default=WATCH_POLL_INTERVAL,
+                       help="seconds between directory polls")
+    watch.set_defaults(func=cmd_watch)
+
+    analyze = subparsers.add_parser("analyze", help="parse logs and compare each one to the aggregate")
+    analyze.add_argument("files", nargs="+")
+    add_threshold_arguments(analyze)
+    analyze.add_argument("--exclude", nargs="*", default=[], help="logs left out of the aggregate")
+    analyze.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    analyze.add_argument("--aggregation", choices=AGGREGATION_MODES, default="mean",
+                         help="how the corrections of the logs are combined per cell")
+    analyze.set_defaults(func=cmd_analyze)
+
+    events = subparsers.add_parser("events", help="list acceleration windows or show one of them")
+    events.add_argument("file")
+    add_threshold_arguments(events)
+    events.add_argument("--rpm-min", type=float, default=None)
+    events.add_argument("--rpm-max", type=float, default=None)
+    events.add_argument("--min-dev", type=float, default=None,
+                        help="minimum peak over- or underboost")
+    events.add_argument("--show", type=int, default=None, metavar="N",
+                        help="print the samples of window N")
+    events.set_defaults(func=cmd_events)
+
+    export = subparsers.add_parser("export", help="write the boost events of the logs to a binary / CSV file")
+    export.add_argument("files", nargs="+")
+    add_threshold_arguments(export)
+    export.add_argument("--out", default=None, metavar="FILE", help="binary event table")
+    export.add_argument("--csv", default=None, metavar="FILE", help="CSV with one line per event")
+    export.set_defaults(func=cmd_export)
+
+    report = subparsers.add_parser("report", help="print other per-cell analyses of the logs")
+    report.add_argument("files", nargs="+")
+    add_threshold_arguments(report)
+    report.add_argument("--analyzers", nargs="+", choices=sorted(ANALYZERS),
+                        default=["spec_deviation", "limiter_hits", "overshoot_duration"])
+    report.set_defaults(func=cmd_report)
+
+    evaluate = subparsers.add_parser("evaluate", help="replay logs against the original, updated and fixed map")
+    evaluate.add_argument("files", nargs="+")
+    evaluate.add_argument("--map", required=True, metavar="FILE",
+                          help="text file with the map as copied from VAGEDCSuite")
+    add_threshold_arguments(evaluate)
+    evaluate.add_argument("--column-fix", action="store_true",
+                          help="adjust column differences in the fixed map")
+    evaluate.add_argument("--sensitivity", type=float, default=None,
+                          help="boost error change in mbar per map percent (default: fitted from the logs)")
+    evaluate.set_defaults(func=cmd_evaluate)
+
+    serve_parser = subparsers.add_parser("serve", help="run the local analysis service")
+    serve_parser.add_argument("--host", default=SERVICE_HOST)
+    serve_parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    serve_parser.add_argument("--socket", default=None, metavar="PATH",
+                              help="listen on a Unix socket instead of TCP")
+    serve_parser.add_argument("--workers", type=int, default=None, help="number of parsing processes")
+    serve_parser.add_argument("--jobs", type=int, default=SERVICE_JOB_WORKERS,
+                              help="number of jobs running at once")
+    serve_parser.set_defaults(func=cmd_serve)
+
+    tune_parser = subparsers.add_parser("tune", help="search thresholds and gain for the best map")
+    tune_parser.add_argument("files", nargs="+")
+    tune_parser.add_argument("--map", required=True, metavar="FILE",
+                             help="text file with the map as copied from VAGEDCSuite")
+    add_threshold_arguments(tune_parser)
+    tune_parser.add_argument("--holdout", nargs="*", default=[],
+                             help="logs to score the candidates on (default: every 4th log)")
+    tune_parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    tune_parser.add_argument("--top", type=int, default=10, help="number of ranked candidates to print")
+    tune_parser.add_argument("--sensitivity", type=float, default=None,
+                             help="boost error change in mbar per map percent (default: fitted from the logs)")
+    tune_parser.set_defaults(func=cmd_tune)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
@@ -0,0 +1,221 @@
+"""
+Signal conditioning applied to the log columns before event detection.
+
+Every step works on whole columns (one pass per column instead of per-row
+branching). SignalConditioner chains the steps and carries their state across
+chunks, so a log can be conditioned chunk by chunk while it is being streamed.
+
+Steps, in order:
+  1. drop rows with implausible values (per-channel min/max)
+  2. spike rejection: a single sample jumping away from both neighbours by
+     more than spike_threshold is replaced by the mean of its neighbours
+  3. trailing rolling median over median_window samples
+  4. exponential moving average with factor ema_alpha
+  5. debounce of the inj_qty_req rise: a rise only passes once it has held
+     for debounce_samples samples, so a one-sample blip no longer starts
+     an acceleration
+"""
+
+from array import array
+from bisect import insort, bisect_left
+from itertools import compress, islice
+from operator import and_, itemgetter, sub
+
+from config import DEFAULT_CONDITIONING
+
+
+def keep_plausible(columns, limits):
+    """
+    Returns new columns without the rows where any channel listed in 'limits'
+    (name -> (min, max)) is outside its range.
+    """
+    mask = None
+    for name, (low, high) in limits.items():
+        values = columns.get(name)
+        if not values or (low <= min(values) and max(values) <= high):
+            continue  # Channel entirely in range, no per-row check needed.
+        channel_ok = map(and_, map(float(low).__le__, values), map(float(high).__ge__, values))
+        mask = list(channel_ok) if mask is None else list(map(and_, mask, channel_ok))
+    if mask is None:
+        return columns
+    return {name: array("d", compress(values, mask)) for name, values in columns.items()}
+
+
+def reject_spikes(values, threshold, before=None, after=None):
+    """
+    Replaces isolated spikes by the mean of their neighbours. 'before' and
+    'after' are the samples surrounding this slice (None at the log edges);
+    without a neighbour a sample is left as it is.
+    """
+    out = array("d", values)
+    if not values or threshold <= 0:
+        return out
+    buf = list(values)
+    if before is not None:
+        buf.insert(0, before)
+    if after is not None:
+        buf.append(after)
+    offset = 1 if before is not None else 0
+
+    # Steps between consecutive samples; a spike is a big step followed by
+    # a big step back in the opposite direction. The big steps are picked out
+    # without a Python loop over the samples, only they are looked at one by one.
+    steps = list(map(sub, islice(buf, 1, None), buf))
+    big = set(compress(range(len(steps)), map(float(threshold).__lt__, map(abs, steps))))
+    for k in sorted(big):
+        if k + 1 in big:
+            back = steps[k + 1]
+            if (back > 0) != (steps[k] > 0):
+                i = k + 1 - offset  # index of the spiking sample within 'values'
+                if 0 <= i < len(out):
+                    out[i] = (buf[k] + buf[k + 2]) / 2
+    return out
+
+
+def rolling_median(values, window, history=()):
+    """
+    Trailing median over 'window' samples. 'history' holds up to window - 1
+    samples that precede this slice, so consecutive chunks join seamlessly.
+    """
+    if window <= 1:
+        return array("d", values)
+    history = list(history)[-(window - 1):]
+    buf = history + list(values)
+    out = array("d")
+    # Until 'window' samples are available the median runs over fewer samples.
+    warmup = min(len(buf), window - 1)
+    for i in range(len(history), warmup):
+        w = sorted(buf[:i + 1])
+        m = len(w)
+        out.append(w[m // 2] if m % 2 else (w[m // 2 - 1] + w[m // 2]) / 2)
+    if len(buf) < window:
+        return out
+
+    if window == 3:
+        # Common case: the middle of each sorted triple of shifted copies of
+        # the column. One sorted() call per sample beats chaining min/max.
+        out.extend(map(itemgetter(1), map(sorted, zip(buf, islice(buf, 1, None), islice(buf, 2, None)))))
+        return out
+
+    sorted_window = sorted(buf[:window - 1])
+    for i in range(window - 1, len(buf)):
+        insort(sorted_window, buf[i])
+        if len(sorted_window) > window:
+            del sorted_window[bisect_left(sorted_window, buf[i - window])]
+        m = window
+        out.append(sorted_window[m // 2] if m % 2 else (sorted_window[m // 2 - 1] + sorted_window[m // 2]) / 2)
+    return out
+
+
+def ema(values, alpha, initial=None):
+    """Exponential moving average; 'initial' is the last output of the previous chunk."""
+    out = array("d")
+    if alpha <= 0 or alpha >= 1:
+        out.extend(values)
+        return out
+    last = initial
+    for v in values:
+        last = v if last is None else last + alpha * (v - last)
+        out.append(last)
+    return out
+
+
+def debounce_rises(values, samples, initial=None, lookahead=()):
+    """
+    Holds the previous value until a rise has lasted 'samples' samples; falls
+    pass immediately. 'initial' is the last output before this slice and
+    'lookahead' the samples following it (needed to confirm rises near the end).
+    """
+    if samples <= 1:
+        return array("d", values)
+    buf = list(values) + list(lookahead)
+    out = buf[:len(values)]
+    last = initial
+    for i, v in enumerate(out):
+        if last is not None and v > last:
+            confirm = buf[i + 1:i + samples]
+            if len(confirm) < samples - 1 or min(confirm) <= last:
+                out[i] = last
+                continue
+        last = v
+    return array("d", out)
+
+
+class SignalConditioner:
+    """
+    Applies the conditioning steps to column dictionaries (name -> array of floats).
+
+    Call process() for each chunk with final=False and once more (possibly with
+    an empty chunk) with final=True. Because spike rejection and the debounce
+    need a few samples ahead, up to 'lookahead' rows of a chunk are held back
+    and released with the next call.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = dict(DEFAULT_CONDITIONING)
+        if settings:
+            self.settings.update(settings)
+        s = self.settings
+        self.channels = [c for c in s["channels"]]
+        self.lookahead = max(1 if s["spike_threshold"] > 0 else 0, s["debounce_samples"] - 1)
+
+        self._pending = None     # plausible rows not yet emitted (held back for lookahead)
+        self._raw_last = {}      # channel -> last raw sample already emitted
+        self._despiked = {}      # channel -> recent despiked samples (median history)
+        self._ema_last = {}      # channel -> last EMA output
+        self._req_last = None    # last debounced inj_qty_req
+
+    def process(self, columns, final=True):
+        s = self.settings
+        columns = keep_plausible(columns, s["plausible"])
+
+        if self._pending is not None:
+            columns = {name: self._pending[name] + columns[name] for name in columns}
+        n = len(next(iter(columns.values()), ()))
+        emit = n if final else max(0, n - self.lookahead)
+        self._pending = {name: values[emit:] for name, values in columns.items()}
+
+        out = {name: values[:emit] for name, values in columns.items()}
+        if emit == 0:
+            return out
+
+        for name in self.channels:
+            values = columns[name]
+            head = values[:emit]
+            after = values[emit] if emit < n else None
+            despiked = reject_spikes(head, s["spike_threshold"], self._raw_last.get(name), after)
+            self._raw_last[name] = head[-1]
+
+            history = self._despiked.get(name, ())
+            smoothed = rolling_median(despiked, s["median_window"], history)
+            keep = max(0, s["median_window"] - 1)
+            self._despiked[name] = (list(history)[-keep:] + list(despiked[-keep:]))[-keep:] if keep else []
+
+            smoothed = ema(smoothed, s["ema_alpha"], self._ema_last.get(name))
+            self._ema_last[name] = smoothed[-1]
+            out[name] = smoothed
+
+        if "inj_qty_req" in columns:
+            req = columns["inj_qty_req"]
+            debounced = debounce_rises(req[:emit], s["debounce_samples"], self._req_last, req[emit:])
+            self._req_last = debounced[-1]
+            out["inj_qty_req"] = debounced
+
+        return out
+
+
+def condition_chunks(chunks, settings=None):
+    """Generator conditioning a stream of column chunks."""
+    conditioner = SignalConditioner(settings)
+    empty = None
+    for columns in chunks:
+        if empty is None:
+            empty = {name: values[:0] for name, values in columns.items()}
+        yield conditioner.process(columns, final=False)
+    if empty is not None:
+        yield conditioner.process(empty, final=True)
+
+
+def condition_columns(columns, settings=None):
+    """Conditions a complete log in one go."""
+    return SignalConditioner(settings).process(columns, final=True)
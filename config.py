@@ -3,6 +3,8 @@ Holds all your predefined configuration values:
  row headers, column headers, default thresholds, etc.
 """
 
+import os
+
 ROW_HEADERS = [
     4242, 3990, 3507, 3003, 2499, 2247,
     2058, 1911, 1743, 1650, 1500, 1350,
@@ -17,3 +19,103 @@ COL_HEADERS = [
 
 DEFAULT_THRESHOLD1 = 100.0
 DEFAULT_THRESHOLD2 = 200.0
+
+# Watch mode: seconds between directory polls, how many polls a file size has
+# to stay unchanged before the file counts as finished, and the name of the
+# index file (kept inside the watched directory) listing processed logs.
+WATCH_POLL_INTERVAL = 2.0
+WATCH_STABLE_POLLS = 2
+WATCH_INDEX_FILE = ".n75_watch_index.json"
+
+# Signal conditioning applied before event detection (see conditioning.py).
+# Plausibility limits are per channel (min, max); rows outside are dropped.
+DEFAULT_CONDITIONING = {
+    "channels": ("spec_int", "act_int"),
+    "plausible": {
+        "eng_speed": (0.0, 8000.0),
+        "spec_int": (0.0, 4000.0),
+        "act_int": (0.0, 4000.0),
+        "inj_qty_actual": (0.0, 150.0),
+        "inj_qty_req": (0.0, 150.0)
+    },
+    "spike_threshold": 500.0,
+    "median_window": 3,
+    "ema_alpha": 0.0,
+    "debounce_samples": 2
+}
+
+# Logs are read and processed in chunks of this many rows.
+CHUNK_ROWS = 65536
+
+# Parsed logs (conditioned/resampled columns as binary arrays) and their event
+# indexes are cached here, keyed by log path, size, mtime and parse options.
+# Entries of a log that has changed since are removed; beyond CACHE_MAX_BYTES
+# the least recently used entries are evicted.
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".n75_tuner_cache")
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# What-if replay (see evaluator.py): change of the boost error (act_int - spec_int,
+# mbar) per map percent, used when the logs do not give a usable fit. A fitted
+# slope is only used if it is at least SENSITIVITY_MIN_MAGNITUDE mbar per %
+# steep and SENSITIVITY_MIN_T standard errors away from zero.
+DEFAULT_SENSITIVITY = -20.0
+SENSITIVITY_MIN_MAGNITUDE = 5.0
+SENSITIVITY_MIN_T = 3.0
+
+# Auto-tuner (see tuner.py): the threshold / gain grid it searches, and after
+# how many threshold pairs without a better map it stops early.
+TUNE_TH1_VALUES = [50.0, 75.0, 100.0, 125.0, 150.0]
+TUNE_TH2_VALUES = [150.0, 200.0, 250.0, 300.0]
+TUNE_GAINS = [0.5, 0.75, 1.0, 1.25, 1.5]
+TUNE_PATIENCE = 8
+
+# Injection quantity limiter analysis (see analyzers.py): a sample counts as
+# limited when the actual quantity is this far (mg/H) below the requested one.
+LIMITER_MARGIN = 2.0
+
+# Log header parsing (see tokenizer.py). The header block is searched in the
+# first HEADER_MAX_LINES lines. A header field names a channel if it contains
+# all words of one of the channel's entries (compared in lower case); English
+# and German VCDS channel names are covered.
+HEADER_MAX_LINES = 64
+CHANNEL_NAMES = {
+    "time": [("time",), ("zeit",)],
+    "eng_speed": [("engine speed",), ("motordrehzahl",), ("drehzahl",)],
+    "spec_int": [("pressure", "specified"), ("pressure", "spec"), ("druck", "soll")],
+    "act_int": [("pressure", "actual"), ("druck", "ist")],
+    "inj_qty_actual": [("qty", "actual"), ("quantity", "actual"), ("menge", "ist")],
+    "inj_qty_req": [("qty", "requested"), ("quantity", "requested"), ("qty", "specified"),
+                    ("quantity", "specified"), ("menge", "soll")]
+}
+
+# Local analysis service (see service.py): where it listens, how many jobs run
+# at once and how many processes parse logs (None = one per CPU).
+# With SERVICE_URL set (e.g. "http://127.0.0.1:8475" or "unix:///tmp/n75.sock")
+# the GUI sends picked logs to the service instead of parsing them itself.
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8475
+SERVICE_JOB_WORKERS = 2
+SERVICE_PARSE_WORKERS = None
+SERVICE_URL = os.environ.get("N75_SERVICE_URL")
+# Finished jobs (with their results) are kept for SERVICE_JOB_TTL seconds and
+# at most SERVICE_MAX_JOBS jobs are kept, least recently requested dropped first.
+SERVICE_JOB_TTL = 3600.0
+SERVICE_MAX_JOBS = 200
+
+# How the correction values of the logs are combined per cell (see accumulator.py):
+#   "mean"     every event counts the same (the default),
+#   "recency"  logs are weighted by age (file time), halving every RECENCY_HALF_LIFE_DAYS,
+#   "dwell"    events are weighted by how long their over- / underboost lasted,
+#   "area"     events are weighted by the pressure deviation integrated over that time,
+#   "trimmed"  the TRIM_FRACTION smallest and largest values of a cell are dropped.
+# Trimmed means come from a per-cell histogram of HISTOGRAM_BINS bins over
+# -HISTOGRAM_RANGE..HISTOGRAM_RANGE (values outside go to the end bins).
+AGGREGATION_MODES = ("mean", "recency", "dwell", "area", "trimmed")
+RECENCY_HALF_LIFE_DAYS = 14.0
+TRIM_FRACTION = 0.1
+HISTOGRAM_BINS = 40
+HISTOGRAM_RANGE = 2.0
+
+# Hovering a table cell lists at most this many of the acceleration windows
+# that contributed to it (largest share first).
+INSPECTOR_WINDOWS = 6
@@ -1,10 +1,28 @@
-import csv
+from array import array
+from itertools import chain
 from config import (
     ROW_HEADERS, 
-    COL_HEADERS
+    COL_HEADERS,
+    CHUNK_ROWS
 )
+from conditioning import condition_chunks
+from resample import resample_chunks
+from tokenizer import iter_log_chunks
+from event_table import EventTable
+from accumulator import CorrectionAccumulator
 
-def parse_csv(file_path, th1, th2):
+# Channels read from every log row, with the CSV column index used when the
+# log header does not name them (see tokenizer.py).
+COLUMNS = (
+    ("time", 1),
+    ("eng_speed", 2),
+    ("spec_int", 3),
+    ("act_int", 4),
+    ("inj_qty_actual", 8),  # Inj Qty (Actual)
+    ("inj_qty_req", 10)
+)
+
+def parse_csv(file_path, th1, th2, verbose=True, conditioning=None, resample_step=None):
     """
     Opens the CSV file at 'file_path', reads each row into a data structure,
     and then analyzes and prints a formatted table to the console.
@@ -15,36 +33,111 @@ def parse_csv(file_path, th1, th2):
       - If Actual intake press is below Spec intake press by at least a threshold => "UnderTH1" or "UnderTH2"
     
     Also prints the Inj Qty (actual).
+
+    With verbose=False nothing is printed, which keeps background and batch
+    parsing of large logs from being dominated by console output.
+    If 'conditioning' is given (a settings dict, see conditioning.py), the
+    columns are filtered before the checks run. With 'resample_step' (seconds)
+    all channels are then interpolated onto a fixed time base (see resample.py).
+    The log is processed in chunks of CHUNK_ROWS rows.
+    """
+    log = print if verbose else _silent
+
+    log(f"\n--- Parsing CSV: {file_path} ---")
+    log(f"Using Threshold1={th1}, Threshold2={th2}")
+
+    # Conditioning works on the raw samples (a spike is one logged sample),
+    # resampling afterwards puts the cleaned channels on the fixed time base.
+    chunks = iter_column_chunks(file_path)
+    if conditioning is not None:
+        chunks = condition_chunks(chunks, conditioning)
+    if resample_step:
+        chunks = resample_chunks(chunks, resample_step)
+
+    events = detect_events(iter_rows(chunks), th1, th2, log)
+
+    # Average all distributed results and print the averaged table.
+    if verbose:
+        avg_result = average_distributed_results(events, ROW_HEADERS, COL_HEADERS)
+        log("\n--- Averaged Distributed Table ---")
+        print_distributed_table(avg_result, ROW_HEADERS, COL_HEADERS)
+
+    log("--- Finished parsing CSV ---")
+    return events
+
+def iter_column_chunks(file_path, chunk_rows=CHUNK_ROWS):
+    """
+    Reads the log at 'file_path' and yields dictionaries of columns
+    (channel name -> array of floats, see COLUMNS) of up to 'chunk_rows' rows.
+    Delimiter, decimal separator and the channel columns are taken from the
+    log header (see tokenizer.py). Rows that are too short or contain
+    non-numeric values (headers, markers) are skipped.
+    """
+    return iter_log_chunks(file_path, COLUMNS, chunk_rows)
+
+def read_columns(file_path):
+    """Reads the complete log at 'file_path' into one dictionary of columns."""
+    columns = {name: array("d") for name, _ in COLUMNS}
+    for chunk in iter_column_chunks(file_path):
+        for name, values in chunk.items():
+            columns[name].extend(values)
+    return columns
+
+def iter_rows(chunks):
+    """
+    Turns a stream of column chunks into row tuples in COLUMNS order:
+    (time, eng_speed, spec_int, act_int, inj_qty_actual, inj_qty_req).
+    """
+    names = [name for name, _ in COLUMNS]
+    return chain.from_iterable(zip(*(chunk[name] for name in names)) for chunk in chunks)
+
+def detect_events(rows, th1, th2, log=None, windows=None):
     """
+    Runs the acceleration / boost threshold checks over the log rows (tuples
+    in COLUMNS order, see iter_rows) and returns the events as an EventTable
+    (see event_table.py).
+    'log' receives the per-row trace (print for the console, None for silence).
 
-    print(f"\n--- Parsing CSV: {file_path} ---")
-    print(f"Using Threshold1={th1}, Threshold2={th2}")
-
-    # First, load the CSV data into a list of dictionaries.
-    data = []
-    with open(file_path, mode="r", encoding="utf-8", errors="replace") as f:
-        reader = csv.reader(f, delimiter=",")
-        for row in reader:
-            # Ensure there are at least 11 columns (indexed 0 to 10)
-            if len(row) < 11:
-                continue
-
-            try:
-                row_data = {
-                    'time': float(row[1]),
-                    'eng_speed': float(row[2]),
-                    'spec_int': float(row[3]),
-                    'act_int': float(row[4]),
-                    'inj_qty_actual': float(row[8]),  # Inj Qty (Actual)
-                    'inj_qty_req': float(row[10])
-                }
-            except ValueError:
-                continue  # Skip rows with invalid data
-
-            data.append(row_data)
+    If a list is passed as 'windows', one dictionary per acceleration window is
+    appended to it: start/end row (end exclusive) and time, RPM range, peak
+    over- and underboost (act_int - spec_int), the cells it corrected as
+    [row_header, col_header, summed value] entries and its events as
+    [row, "TH1"/"TH2"/"UnderTH1"/"UnderTH2", weight] entries.
+    """
+    detector = EventDetector(th1, th2, log, windows)
+    detector.feed(rows)
+    return detector.finish()
+
+class EventDetector:
+    """
+    detect_events for rows that arrive in pieces (e.g. one chunk at a time
+    next to other analyzers): feed() the rows as they come, finish() returns
+    the EventTable. The checks carry their state across feed() calls.
+    """
+
+    def __init__(self, th1, th2, log=None, windows=None):
+        self.events = EventTable()
+        self._detector = _detect(th1, th2, log, windows, self.events)
+        next(self._detector)
+
+    def feed(self, rows):
+        self._detector.send(rows)
+
+    def finish(self):
+        try:
+            self._detector.send(None)
+        except StopIteration:
+            pass
+        return self.events
+
+def _detect(th1, th2, log, windows, events):
+    """Generator behind EventDetector: receives row iterables, None to finish."""
+    excursion = _Excursion(events.columns["duration"], events.columns["area"])
+    if log is None:
+        log = _silent
 
     # Print header (includes InjQtyActual as 'InjAct')
-    print(f"{'TIME':<6} {'EngSpd':<6} {'SpecInt':<8} {'ActInt':<8} {'InjAct':<8} {'InjReq':<8}  Notes")
+    log(f"{'TIME':<6} {'EngSpd':<6} {'SpecInt':<8} {'ActInt':<8} {'InjAct':<8} {'InjReq':<8}  Notes")
 
     last_inj_qty_requested = None
     last_inj_qty_actual = None
@@ -56,183 +149,271 @@ def parse_csv(file_path, th1, th2):
     last_overboost_count = 0
     last_underboost_count = 0
 
-    distributed_results = []
-
-    # Process the data structure
-    for row in data:
-        time_val       = row['time']
-        eng_speed      = row['eng_speed']
-        spec_int       = row['spec_int']
-        act_int        = row['act_int']
-        inj_qty_actual = row['inj_qty_actual']
-        inj_qty_req    = row['inj_qty_req']
-
-        notes = []
-
-        # 1) Check for acceleration start.
-        # When the current injection quantity request exceeds the previous one,
-        # mark that acceleration has begun.
-        skip_eng_speed_check = False
-        if last_inj_qty_requested is not None and not acceleration_detected:
-            if inj_qty_req > last_inj_qty_requested:
-                acceleration_detected = True
-                skip_eng_speed_check = True
-                print("--- Acceleration start detected ---")
-
-        # Check for acceleration end by comparing engine speeds.
-        if acceleration_detected and not skip_eng_speed_check:
-            if eng_speed < last_eng_speed or inj_qty_actual == 0 or inj_qty_req == 0:
-                acceleration_detected = False
-                print("--- Acceleration end detected ---")
-
-        if acceleration_detected:
-            # 2) Check the difference between actual and spec intake pressures.
-            diff = act_int - spec_int
-
-            # Overboost detection (when diff is positive)
-            if diff >= th2:
-                if last_overboost_count == 0:
-                    calculated_overboost = True
-                    notes.append("TH2 <-")
-                    notes.append("---- Calculating with actual fuel: " + str(inj_qty_actual))
-                    notes.append("---- Weight: " + str(1 + weight(th2, th1 + th2, diff)))
-                    distributed_results.append(distribute_value(eng_speed, inj_qty_actual, 1 + weight(th2, th1 + th2, diff), ROW_HEADERS, COL_HEADERS))
-                elif last_overboost_count == 1 and calculated_overboost is False:
-                    calculated_overboost = True
-                    if last_inj_qty_actual is not None and last_eng_speed is not None:
+    window = None  # acceleration window being recorded (only if 'windows' is given)
+    last_time_val = None
+    row_index = -1
+
+    def emit(event_time, event_rpm, event_fuel, event_weight, event_row, label):
+        index = events.append(event_time, event_rpm, event_fuel, event_weight, event_row, label)
+        excursion.add_event(index)
+        if window is not None:
+            cells = window["cells"]
+            for key, value in events.event_cells(index):
+                cells[key] = cells.get(key, 0) + value
+            window["events"].append([event_row, label, event_weight])
+
+    # Process the data structure, one piece of rows at a time
+    while True:
+        rows = yield
+        if rows is None:
+            break
+        for row_index, (time_val, eng_speed, spec_int, act_int, inj_qty_actual, inj_qty_req) in enumerate(rows, row_index + 1):
+            notes = []
+
+            # 1) Check for acceleration start.
+            # When the current injection quantity request exceeds the previous one,
+            # mark that acceleration has begun.
+            skip_eng_speed_check = False
+            if last_inj_qty_requested is not None and not acceleration_detected:
+                if inj_qty_req > last_inj_qty_requested:
+                    acceleration_detected = True
+                    skip_eng_speed_check = True
+                    log("--- Acceleration start detected ---")
+                    if windows is not None:
+                        window = _open_window(row_index, time_val)
+
+            # Check for acceleration end by comparing engine speeds.
+            if acceleration_detected and not skip_eng_speed_check:
+                if eng_speed < last_eng_speed or inj_qty_actual == 0 or inj_qty_req == 0:
+                    acceleration_detected = False
+                    excursion.close()
+                    log("--- Acceleration end detected ---")
+                    if window is not None:
+                        windows.append(_close_window(window, row_index, last_time_val))
+                        window = None
+
+            if acceleration_detected:
+                # 2) Check the difference between actual and spec intake pressures.
+                diff = act_int - spec_int
+                excursion.update(diff, time_val - last_time_val if last_time_val is not None else 0.0)
+                if window is not None:
+                    _update_window(window, eng_speed, diff)
+
+                # Overboost detection (when diff is positive)
+                if diff >= th2:
+                    if last_overboost_count == 0:
+                        calculated_overboost = True
                         notes.append("TH2 <-")
-                        notes.append("---- Calculating with last fuel: " + str(last_inj_qty_actual) +
-                                     " with last eng speed: " + str(last_eng_speed))
+                        notes.append("---- Calculating with actual fuel: " + str(inj_qty_actual))
                         notes.append("---- Weight: " + str(1 + weight(th2, th1 + th2, diff)))
-                        distributed_results.append(distribute_value(last_eng_speed, last_inj_qty_actual, 1 + weight(th2, th1 + th2, diff), ROW_HEADERS, COL_HEADERS))
-                else:
-                    notes.append("TH2")
-                last_overboost_count += 1
-                last_underboost_count = 0
-                calculated_underboost = False
-            elif diff >= th1:
-                if last_overboost_count == 0:
-                    notes.append("TH1 <-")
-                    calculated_overboost = True
-                    notes.append("---- Calculating with actual fuel: " + str(inj_qty_actual))
-                    notes.append("---- Weight: " + str(weight(th1, th2, diff)))
-                    distributed_results.append(distribute_value(eng_speed, inj_qty_actual, weight(th1, th2, diff), ROW_HEADERS, COL_HEADERS))
-                elif last_overboost_count == 1 and calculated_overboost is False:
-                    calculated_overboost = True
-                    notes.append("TH1 <-")
-                    if last_inj_qty_actual is not None and last_eng_speed is not None:
-                        notes.append("---- Calculating with last fuel: " + str(last_inj_qty_actual) +
-                                     " with last eng speed: " + str(last_eng_speed))
-                        notes.append("---- Weight: " + str(weight(th1, th2, diff)))
-                        distributed_results.append(distribute_value(last_eng_speed, last_inj_qty_actual, weight(th1, th2, diff), ROW_HEADERS, COL_HEADERS))
-                else:
-                    notes.append("TH1")
-                last_overboost_count += 1
-                last_underboost_count = 0
-                calculated_underboost = False
-            elif diff > 0:
-                if last_overboost_count == 0:
+                        emit(time_val, eng_speed, inj_qty_actual, 1 + weight(th2, th1 + th2, diff), row_index, "TH2")
+                    elif last_overboost_count == 1 and calculated_overboost is False:
+                        calculated_overboost = True
+                        if last_inj_qty_actual is not None and last_eng_speed is not None:
+                            notes.append("TH2 <-")
+                            notes.append("---- Calculating with last fuel: " + str(last_inj_qty_actual) +
+                                         " with last eng speed: " + str(last_eng_speed))
+                            notes.append("---- Weight: " + str(1 + weight(th2, th1 + th2, diff)))
+                            emit(last_time_val, last_eng_speed, last_inj_qty_actual, 1 + weight(th2, th1 + th2, diff), row_index - 1, "TH2")
+                    else:
+                        notes.append("TH2")
                     last_overboost_count += 1
-                    notes.append("<TH1 <-")
-                elif last_overboost_count == 1 and calculated_overboost is False:
-                    notes.append("<TH1 <-")
-                    last_overboost_count = 1
-                else:
-                    notes.append("<TH1")
+                    last_underboost_count = 0
+                    calculated_underboost = False
+                elif diff >= th1:
+                    if last_overboost_count == 0:
+                        notes.append("TH1 <-")
+                        calculated_overboost = True
+                        notes.append("---- Calculating with actual fuel: " + str(inj_qty_actual))
+                        notes.append("---- Weight: " + str(weight(th1, th2, diff)))
+                        emit(time_val, eng_speed, inj_qty_actual, weight(th1, th2, diff), row_index, "TH1")
+                    elif last_overboost_count == 1 and calculated_overboost is False:
+                        calculated_overboost = True
+                        notes.append("TH1 <-")
+                        if last_inj_qty_actual is not None and last_eng_speed is not None:
+                            notes.append("---- Calculating with last fuel: " + str(last_inj_qty_actual) +
+                                         " with last eng speed: " + str(last_eng_speed))
+                            notes.append("---- Weight: " + str(weight(th1, th2, diff)))
+                            emit(last_time_val, last_eng_speed, last_inj_qty_actual, weight(th1, th2, diff), row_index - 1, "TH1")
+                    else:
+                        notes.append("TH1")
                     last_overboost_count += 1
-                last_underboost_count = 0
-                calculated_underboost = False
-
-            # Underboost detection (when diff is negative)
-            elif diff <= -th2:
-                if last_underboost_count == 0:
-                    calculated_underboost = True
-                    notes.append("UnderTH2 <-")
-                    notes.append("---- Calculating with actual fuel: " + str(inj_qty_actual))
-                    w = weight(th2, th1 + th2, abs(diff))
-                    notes.append("---- Weight: " + str(-1 - w))
-                    distributed_results.append(distribute_value(eng_speed, inj_qty_actual, -1 - w, ROW_HEADERS, COL_HEADERS))
-                elif last_underboost_count == 1 and calculated_underboost is False:
-                    calculated_underboost = True
-                    if last_inj_qty_actual is not None and last_eng_speed is not None:
+                    last_underboost_count = 0
+                    calculated_underboost = False
+                elif diff > 0:
+                    if last_overboost_count == 0:
+                        last_overboost_count += 1
+                        notes.append("<TH1 <-")
+                    elif last_overboost_count == 1 and calculated_overboost is False:
+                        notes.append("<TH1 <-")
+                        last_overboost_count = 1
+                    else:
+                        notes.append("<TH1")
+                        last_overboost_count += 1
+                    last_underboost_count = 0
+                    calculated_underboost = False
+
+                # Underboost detection (when diff is negative)
+                elif diff <= -th2:
+                    if last_underboost_count == 0:
+                        calculated_underboost = True
                         notes.append("UnderTH2 <-")
-                        notes.append("---- Calculating with last fuel: " + str(last_inj_qty_actual) +
-                                     " with last eng speed: " + str(last_eng_speed))
+                        notes.append("---- Calculating with actual fuel: " + str(inj_qty_actual))
                         w = weight(th2, th1 + th2, abs(diff))
                         notes.append("---- Weight: " + str(-1 - w))
-                        distributed_results.append(distribute_value(last_eng_speed, last_inj_qty_actual, -1 - w, ROW_HEADERS, COL_HEADERS))
-                else:
-                    notes.append("UnderTH2")
-                last_underboost_count += 1
-                last_overboost_count = 0
-                calculated_overboost = False
-            elif diff <= -th1:
-                if last_underboost_count == 0:
-                    calculated_underboost = True
-                    notes.append("UnderTH1 <-")
-                    notes.append("---- Calculating with actual fuel: " + str(inj_qty_actual))
-                    w = weight(th1, th2, abs(diff))
-                    notes.append("---- Weight: " + str(-w))
-                    distributed_results.append(distribute_value(eng_speed, inj_qty_actual, -w, ROW_HEADERS, COL_HEADERS))
-                elif last_underboost_count == 1 and calculated_underboost is False:
-                    calculated_underboost = True
-                    if last_inj_qty_actual is not None and last_eng_speed is not None:
+                        emit(time_val, eng_speed, inj_qty_actual, -1 - w, row_index, "UnderTH2")
+                    elif last_underboost_count == 1 and calculated_underboost is False:
+                        calculated_underboost = True
+                        if last_inj_qty_actual is not None and last_eng_speed is not None:
+                            notes.append("UnderTH2 <-")
+                            notes.append("---- Calculating with last fuel: " + str(last_inj_qty_actual) +
+                                         " with last eng speed: " + str(last_eng_speed))
+                            w = weight(th2, th1 + th2, abs(diff))
+                            notes.append("---- Weight: " + str(-1 - w))
+                            emit(last_time_val, last_eng_speed, last_inj_qty_actual, -1 - w, row_index - 1, "UnderTH2")
+                    else:
+                        notes.append("UnderTH2")
+                    last_underboost_count += 1
+                    last_overboost_count = 0
+                    calculated_overboost = False
+                elif diff <= -th1:
+                    if last_underboost_count == 0:
+                        calculated_underboost = True
                         notes.append("UnderTH1 <-")
-                        notes.append("---- Calculating with last fuel: " + str(last_inj_qty_actual) +
-                                     " with last eng speed: " + str(last_eng_speed))
+                        notes.append("---- Calculating with actual fuel: " + str(inj_qty_actual))
                         w = weight(th1, th2, abs(diff))
                         notes.append("---- Weight: " + str(-w))
-                        distributed_results.append(distribute_value(last_eng_speed, last_inj_qty_actual, -w, ROW_HEADERS, COL_HEADERS))
-                else:
-                    notes.append("UnderTH1")
-                last_underboost_count += 1
-                last_overboost_count = 0
-                calculated_overboost = False
-            elif diff < 0:
-                if last_underboost_count == 0:
+                        emit(time_val, eng_speed, inj_qty_actual, -w, row_index, "UnderTH1")
+                    elif last_underboost_count == 1 and calculated_underboost is False:
+                        calculated_underboost = True
+                        if last_inj_qty_actual is not None and last_eng_speed is not None:
+                            notes.append("UnderTH1 <-")
+                            notes.append("---- Calculating with last fuel: " + str(last_inj_qty_actual) +
+                                         " with last eng speed: " + str(last_eng_speed))
+                            w = weight(th1, th2, abs(diff))
+                            notes.append("---- Weight: " + str(-w))
+                            emit(last_time_val, last_eng_speed, last_inj_qty_actual, -w, row_index - 1, "UnderTH1")
+                    else:
+                        notes.append("UnderTH1")
                     last_underboost_count += 1
-                    notes.append("<UnderTH1 <-")
-                elif last_underboost_count == 1 and calculated_underboost is False:
-                    notes.append("<UnderTH1 <-")
-                    last_underboost_count = 1
+                    last_overboost_count = 0
+                    calculated_overboost = False
+                elif diff < 0:
+                    if last_underboost_count == 0:
+                        last_underboost_count += 1
+                        notes.append("<UnderTH1 <-")
+                    elif last_underboost_count == 1 and calculated_underboost is False:
+                        notes.append("<UnderTH1 <-")
+                        last_underboost_count = 1
+                    else:
+                        notes.append("<UnderTH1")
+                        last_underboost_count += 1
+                    last_overboost_count = 0
+                    calculated_overboost = False
                 else:
-                    notes.append("<UnderTH1")
-                    last_underboost_count += 1
-                last_overboost_count = 0
-                calculated_overboost = False
+                    # No boost condition detected; reset both counters.
+                    last_overboost_count = 0
+                    last_underboost_count = 0
+                    calculated_overboost = False
+                    calculated_underboost = False
+
+                # Print the formatted row with boost notes.
+                log(
+                    f"{time_val:<6.2f} "
+                    f"{int(eng_speed):<6} "
+                    f"{spec_int:<8.1f} "
+                    f"{act_int:<8.1f} "
+                    f"{inj_qty_actual:<8.1f} "
+                    f"{inj_qty_req:<8.1f}  "
+                    + " ".join(notes)
+                )
             else:
-                # No boost condition detected; reset both counters.
+                # When not accelerating, reset boost counters.
                 last_overboost_count = 0
                 last_underboost_count = 0
-                calculated_overboost = False
-                calculated_underboost = False
-
-            # Print the formatted row with boost notes.
-            print(
-                f"{time_val:<6.2f} "
-                f"{int(eng_speed):<6} "
-                f"{spec_int:<8.1f} "
-                f"{act_int:<8.1f} "
-                f"{inj_qty_actual:<8.1f} "
-                f"{inj_qty_req:<8.1f}  "
-                + " ".join(notes)
-            )
-        else:
-            # When not accelerating, reset boost counters.
-            last_overboost_count = 0
-            last_underboost_count = 0
-
-        last_inj_qty_requested = inj_qty_req
-        last_eng_speed = eng_speed
-        last_inj_qty_actual = inj_qty_actual
-    
-    # Average all distributed results and print the averaged table.
-    avg_result = average_distributed_results(distributed_results, ROW_HEADERS, COL_HEADERS)
-    print("\n--- Averaged Distributed Table ---")
-    print_distributed_table(avg_result, ROW_HEADERS, COL_HEADERS)
 
-    print("--- Finished parsing CSV ---")
-    return distributed_results
+            last_inj_qty_requested = inj_qty_req
+            last_eng_speed = eng_speed
+            last_inj_qty_actual = inj_qty_actual
+            last_time_val = time_val
+
+    excursion.close()
+    if window is not None:
+        # Log ended while still accelerating.
+        windows.append(_close_window(window, row_index + 1, last_time_val))
+
+
+class _Excursion:
+    """
+    Tracks the current over- or underboost excursion (consecutive samples with
+    the deviation on the same side of the spec) and, once it ends, credits
+    its duration and area to the events emitted during it.
+    """
+
+    def __init__(self, durations, areas):
+        """:param durations, areas: the event table columns to fill in."""
+        self.durations = durations
+        self.areas = areas
+        self.direction = 0
+        self.duration = 0.0
+        self.area = 0.0
+        self.events = []
+
+    def add_event(self, index):
+        self.events.append(index)
+
+    def update(self, diff, interval):
+        """Takes one accelerating sample; 'interval' is the time since the previous sample."""
+        direction = (diff > 0) - (diff < 0)
+        if direction != self.direction:
+            self.close()
+            self.direction = direction
+        if direction:
+            interval = max(0.0, interval)
+            self.duration += interval
+            self.area += abs(diff) * interval
+
+    def close(self):
+        for index in self.events:
+            self.durations[index] = self.duration
+            self.areas[index] = self.area
+        self.direction = 0
+        self.duration = 0.0
+        self.area = 0.0
+        self.events = []
+
+def _open_window(start_row, start_time):
+    return {
+        "start_row": start_row,
+        "start_time": start_time,
+        "rpm_min": None,
+        "rpm_max": None,
+        "peak_over": 0.0,
+        "peak_under": 0.0,
+        "cells": {},
+        "events": []
+    }
+
+def _update_window(window, eng_speed, diff):
+    if window["rpm_min"] is None or eng_speed < window["rpm_min"]:
+        window["rpm_min"] = eng_speed
+    if window["rpm_max"] is None or eng_speed > window["rpm_max"]:
+        window["rpm_max"] = eng_speed
+    if diff > window["peak_over"]:
+        window["peak_over"] = diff
+    elif diff < window["peak_under"]:
+        window["peak_under"] = diff
+
+def _close_window(window, end_row, end_time):
+    """Finishes a window; cells become a JSON friendly list."""
+    window["end_row"] = end_row
+    window["end_time"] = end_time
+    window["cells"] = [[r, c, v] for (r, c), v in window["cells"].items()]
+    return window
+
+def _silent(*args, **kwargs):
+    """Stand-in for print() when parse_csv runs with verbose=False."""
+    pass
 
 def weight(lower, upper, value):
     """
@@ -329,34 +510,20 @@ def distribute_value(input_row, input_col, value, row_headers, col_headers):
 
     return distributed
 
-def average_distributed_results(distributed_results, row_headers, col_headers):
+def average_distributed_results(events, row_headers, col_headers):
     """
-    Averages the distributed values across all dictionaries in distributed_results.
+    Averages the distributed values of the events (an EventTable) per cell.
     
     For each cell (row_header, col_header) defined by the provided row and column headers,
-    this function calculates the average value using only non-zero values from the distributed
-    results. If all values for a cell are 0, the averaged result will be 0.
-    
-    Parameters:
-      distributed_results (list): List of dictionaries (from distribute_value) to average.
-      row_headers (list): List of row header values.
-      col_headers (list): List of column header strings.
+    this function calculates the average value using only the non-zero shares of the
+    events in that cell. If a cell got no share, the averaged result will be 0.
     
     Returns:
       dict: A dictionary with keys (row_header, col_header) and the averaged non-zero values.
     """
-    avg_distributed = {}
-    
-    for row in row_headers:
-        for col in col_headers:
-            # Collect only non-zero values for the current cell.
-            non_zero_values = [result.get((row, col), 0) for result in distributed_results
-                                 if result.get((row, col), 0) != 0]
-            if non_zero_values:
-                avg_distributed[(row, col)] = sum(non_zero_values) / len(non_zero_values)
-            else:
-                avg_distributed[(row, col)] = 0
-    return avg_distributed
+    acc = CorrectionAccumulator(row_headers, col_headers)
+    acc.add(events)
+    return acc.averaged()
 
 def print_distributed_table(distributed, row_headers, col_headers):
     """
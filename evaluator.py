@@ -0,0 +1,251 @@
+"""
+What-if evaluation of candidate maps by replaying the cached logs.
+
+For every logged sample inside an acceleration window the map value at that
+sample's RPM / injection quantity is looked up by bilinear interpolation
+(the same four cells distribute_value spreads a correction over). A linear
+sensitivity model predicts how the boost error changes with the map value:
+
+    predicted error = (act_int - spec_int) + k * (candidate - original at the sample)
+
+Its sum of squares over all samples is a quadratic in the per-cell map change
+delta:
+
+    SSE(delta) = E + 2k * b.delta + k^2 * delta.G.delta
+
+with E = sum(e^2), b = sum(e * w) and G = sum(w * w^T) over the samples
+(w = the four interpolation weights). Those sums are collected once, so
+scoring a map afterwards only touches the few hundred non-zero entries of G,
+no matter how long the logs are, and hundreds of candidates can be scored in
+one go.
+
+k can be given; otherwise it is fitted by least squares of the error against
+the original map value at each sample. That fit mixes the differences
+between cells with the map's actual effect, so it is only trusted if the
+slope is negative, at least SENSITIVITY_MIN_MAGNITUDE steep and significant
+(|t| >= SENSITIVITY_MIN_T); otherwise DEFAULT_SENSITIVITY is used.
+"""
+
+import math
+from bisect import bisect_right
+from operator import mul
+
+from config import (
+    ROW_HEADERS,
+    COL_HEADERS,
+    DEFAULT_SENSITIVITY,
+    SENSITIVITY_MIN_MAGNITUDE,
+    SENSITIVITY_MIN_T
+)
+
+
+def _axis_lookup(values, x):
+    """
+    Position of x on an ascending axis as (lower index, upper index, weight of
+    the lower index), clamped to the ends like distribute_value.
+    """
+    if x <= values[0]:
+        return 0, 0, 1.0
+    if x >= values[-1]:
+        last = len(values) - 1
+        return last, last, 1.0
+    hi = bisect_right(values, x)
+    lo = hi - 1
+    span = values[hi] - values[lo]
+    return lo, hi, (values[hi] - x) / span if span else 1.0
+
+
+class ReplayEvaluator:
+    def __init__(self, original, row_headers=ROW_HEADERS, col_headers=COL_HEADERS, sensitivity=None):
+        """
+        :param original: the map the logs were recorded with (2D list of floats,
+                         rows follow row_headers, columns follow col_headers).
+        :param sensitivity: k in mbar per map percent; fitted from the logs if None.
+        """
+        self.original = original
+        self.row_headers = row_headers
+        self.col_headers = col_headers
+        self._rows_ascending = sorted(row_headers)
+        self._row_index = {value: row_headers.index(value) for value in row_headers}
+        self._col_values = [float(s.replace(",", ".")) for s in col_headers]
+        self.samples = 0
+        self.error_sum = 0.0
+        self.error_squares = 0.0
+        # (i0, i1, j0, j1) -> [sum w (4), sum e*w (4), sum w_p*w_q (10)]
+        self._patches = {}
+        self._cells = None     # per-cell sums, built from _patches when needed
+        self.fixed_sensitivity = sensitivity
+        self._sensitivity = None
+
+    # -----------------------
+    # Collecting samples
+    # -----------------------
+    def add_samples(self, rpm, iq, error):
+        """
+        Adds samples given as three equally long sequences: engine speed,
+        actual injection quantity and boost error (act_int - spec_int).
+        """
+        groups = {}
+        for r, q, e in zip(rpm, iq, error):
+            i0, i1, fr = _axis_lookup(self._rows_ascending, r)
+            j0, j1, fc = _axis_lookup(self._col_values, q)
+            group = groups.get((i0, i1, j0, j1))
+            if group is None:
+                group = groups[(i0, i1, j0, j1)] = ([], [], [])
+            group[0].append(fr)
+            group[1].append(fc)
+            group[2].append(e)
+
+        for key, (fr, fc, e) in groups.items():
+            fr_rest = [1.0 - f for f in fr]
+            fc_rest = [1.0 - f for f in fc]
+            # Corner weights in the order (i0, j0), (i0, j1), (i1, j0), (i1, j1).
+            corners = (
+                list(map(mul, fr, fc)),
+                list(map(mul, fr, fc_rest)),
+                list(map(mul, fr_rest, fc)),
+                list(map(mul, fr_rest, fc_rest))
+            )
+            sums = [sum(w) for w in corners]
+            sums += [sum(map(mul, e, w)) for w in corners]
+            sums += [sum(map(mul, corners[p], corners[q])) for p in range(4) for q in range(p, 4)]
+            patch = self._patches.get(key)
+            if patch is None:
+                self._patches[key] = sums
+            else:
+                self._patches[key] = list(map(float.__add__, patch, sums))
+            self.samples += len(e)
+            self.error_sum += sum(e)
+            self.error_squares += sum(map(mul, e, e))
+        self._cells = None
+        self._sensitivity = None
+
+    def add_columns(self, columns, ranges=None):
+        """
+        Adds the rows of a set of log columns (see csv_handler.COLUMNS), either
+        all of them or only those in the given (start, end) row ranges.
+        """
+        if ranges is None:
+            ranges = [(0, len(columns["time"]))]
+        rpm, iq, spec, act = [], [], [], []
+        for start, end in ranges:
+            rpm.extend(columns["eng_speed"][start:end])
+            iq.extend(columns["inj_qty_actual"][start:end])
+            spec.extend(columns["spec_int"][start:end])
+            act.extend(columns["act_int"][start:end])
+        self.add_samples(rpm, iq, list(map(float.__sub__, act, spec)))
+
+    def add_log(self, cached, windows):
+        """Adds the samples of every acceleration window of a cached log (see log_cache)."""
+        self.add_columns(cached.map_columns(),
+                         [(window["start_row"], window["end_row"]) for window in windows])
+
+    # -----------------------
+    # Per-cell statistics
+    # -----------------------
+    def _cell(self, i_ascending, j):
+        """Flat cell index of an ascending row position and a column index."""
+        row = self._row_index[self._rows_ascending[i_ascending]]
+        return row * len(self.col_headers) + j
+
+    def _cell_stats(self):
+        """
+        Returns (s, b, G): per-cell sum of weights and of error * weight, and
+        the non-zero entries of G as {(p, q): value} with p <= q.
+        """
+        if self._cells is not None:
+            return self._cells
+        s = {}
+        b = {}
+        g = {}
+        pairs = [(p, q) for p in range(4) for q in range(p, 4)]
+        for (i0, i1, j0, j1), sums in self._patches.items():
+            cells = (self._cell(i0, j0), self._cell(i0, j1), self._cell(i1, j0), self._cell(i1, j1))
+            for corner, cell in enumerate(cells):
+                s[cell] = s.get(cell, 0.0) + sums[corner]
+                b[cell] = b.get(cell, 0.0) + sums[4 + corner]
+            for (p, q), value in zip(pairs, sums[8:]):
+                cp, cq = cells[p], cells[q]
+                if cp == cq:
+                    # Clamped corners share a cell: both orderings land on the diagonal.
+                    value = value if p == q else 2 * value
+                elif cp > cq:
+                    cp, cq = cq, cp
+                g[(cp, cq)] = g.get((cp, cq), 0.0) + value
+        self._cells = (s, b, g)
+        return self._cells
+
+    def _flatten(self, values):
+        return [value for row in values for value in row]
+
+    def _quadratic(self, x, y):
+        """x^T G y over the non-zero entries of G."""
+        _, _, g = self._cell_stats()
+        total = 0.0
+        for (p, q), value in g.items():
+            if p == q:
+                total += value * x[p] * y[p]
+            else:
+                total += value * (x[p] * y[q] + x[q] * y[p])
+        return total
+
+    @property
+    def sensitivity(self):
+        """Change of the boost error (mbar) per map percent."""
+        if self.fixed_sensitivity is not None:
+            return self.fixed_sensitivity
+        if self._sensitivity is None:
+            self._sensitivity = self._fit_sensitivity()
+        return self._sensitivity
+
+    def _fit_sensitivity(self):
+        n = self.samples
+        if n < 3:
+            return DEFAULT_SENSITIVITY
+        s, b, _ = self._cell_stats()
+        original = self._flatten(self.original)
+        sum_d = sum(value * original[cell] for cell, value in s.items())
+        sum_de = sum(value * original[cell] for cell, value in b.items())
+        sum_dd = self._quadratic(original, original)
+        # Centered sums of squares / products of map value d and error e.
+        s_dd = sum_dd - sum_d * sum_d / n
+        s_de = sum_de - sum_d * self.error_sum / n
+        s_ee = self.error_squares - self.error_sum * self.error_sum / n
+        if s_dd <= 1e-9 * n:
+            return DEFAULT_SENSITIVITY
+        k = s_de / s_dd
+        residual = max(0.0, s_ee - k * s_de) / (n - 2)
+        standard_error = math.sqrt(residual / s_dd)
+        if k > -SENSITIVITY_MIN_MAGNITUDE or (standard_error > 0 and -k / standard_error < SENSITIVITY_MIN_T):
+            return DEFAULT_SENSITIVITY
+        return k
+
+    # -----------------------
+    # Scoring
+    # -----------------------
+    def baseline_rms(self):
+        """RMS boost error of the logs as recorded (with the original map)."""
+        return math.sqrt(self.error_squares / self.samples) if self.samples else 0.0
+
+    def score(self, candidate):
+        """
+        Predicted RMS boost error if the logs had been driven with 'candidate'.
+        Returns a dictionary with rms, baseline_rms and improvement (baseline - rms).
+        """
+        baseline = self.baseline_rms()
+        if not self.samples:
+            return {"rms": 0.0, "baseline_rms": 0.0, "improvement": 0.0}
+        _, b, _ = self._cell_stats()
+        k = self.sensitivity
+        delta = list(map(float.__sub__,
+                         map(float, self._flatten(candidate)),
+                         map(float, self._flatten(self.original))))
+        linear = sum(value * delta[cell] for cell, value in b.items())
+        sse = self.error_squares + 2 * k * linear + k * k * self._quadratic(delta, delta)
+        rms = math.sqrt(max(0.0, sse) / self.samples)
+        return {"rms": rms, "baseline_rms": baseline, "improvement": baseline - rms}
+
+    def score_many(self, candidates):
+        """Scores a batch of candidate maps; returns one score dictionary per map."""
+        self._cell_stats()
+        return [self.score(candidate) for candidate in candidates]
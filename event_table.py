@@ -0,0 +1,258 @@
+"""
+Boost correction events as a column table.
+
+Every event found by csv_handler.EventDetector used to become a dictionary
+of up to four (row_header, col_header) keys (see distribute_value). The
+EventTable keeps one typed array per field instead, so an event costs a few
+dozen bytes and no Python object:
+
+  time, rpm, fuel   the sample the correction is taken at
+  weight            the signed correction (1 + x for TH2, x for TH1, negative below spec)
+  sign, level       +1 / -1 (over- / underboost) and 1 / 2 (TH1 / TH2)
+  file_id           index into 'files' (tables of several logs can be combined)
+  row               the log row of the sample
+  row_a, row_b,     the map cells the weight is spread over (row / column
+  col_a, col_b      indices into the headers; a == b at the edges of the map)
+  row_frac,         share of row_a / col_a, row_b / col_b get the rest
+  col_frac          (NaN if rpm or fuel is not finite: the event has no cells)
+  duration, area    length (s) and integrated deviation (mbar * s) of the
+                    over- or underboost excursion the event belongs to
+
+Tables can be written to a compact binary file and to CSV.
+"""
+
+import csv
+import json
+import math
+import sys
+from array import array
+
+from config import ROW_HEADERS, COL_HEADERS
+
+FIELDS = (
+    ("time", "d"),
+    ("rpm", "d"),
+    ("fuel", "d"),
+    ("weight", "d"),
+    ("sign", "b"),
+    ("level", "B"),
+    ("file_id", "H"),
+    ("row", "i"),
+    ("row_a", "B"),
+    ("row_b", "B"),
+    ("col_a", "B"),
+    ("col_b", "B"),
+    ("row_frac", "d"),
+    ("col_frac", "d"),
+    ("duration", "d"),
+    ("area", "d")
+)
+
+LABELS = {"TH1": (1, 1), "TH2": (1, 2), "UnderTH1": (-1, 1), "UnderTH2": (-1, 2)}
+
+BINARY_MAGIC = b"N75EVENTS1\n"
+
+
+def cell_fractions(input_row, input_col, row_headers, col_values):
+    """
+    (row_a, row_b, row_frac, col_a, col_b, col_frac) for a sample: the same
+    bilinear split as csv_handler.distribute_value, as header indices.
+    'row_headers' are descending, 'col_values' the ascending column values.
+    Returns None if a value is not finite (like distribute_value, which
+    gives such a sample no cells).
+    """
+    if not (math.isfinite(input_row) and math.isfinite(input_col)):
+        return None
+    if input_row >= row_headers[0]:
+        row_a = row_b = 0
+        row_frac = 1.0
+    elif input_row <= row_headers[-1]:
+        row_a = row_b = len(row_headers) - 1
+        row_frac = 1.0
+    else:
+        row_a = row_b = 0
+        row_frac = 1.0
+        for i in range(len(row_headers) - 1):
+            if row_headers[i] >= input_row >= row_headers[i + 1]:
+                row_a, row_b = i, i + 1
+                span = row_headers[i] - row_headers[i + 1]
+                row_frac = (input_row - row_headers[i + 1]) / span if span else 1.0
+                break
+
+    if input_col <= col_values[0]:
+        col_a = col_b = 0
+        col_frac = 1.0
+    elif input_col >= col_values[-1]:
+        col_a = col_b = len(col_values) - 1
+        col_frac = 1.0
+    else:
+        col_a = col_b = 0
+        col_frac = 1.0
+        for j in range(len(col_values) - 1):
+            if col_values[j] <= input_col <= col_values[j + 1]:
+                col_a, col_b = j, j + 1
+                span = col_values[j + 1] - col_values[j]
+                col_frac = (col_values[j + 1] - input_col) / span if span else 1.0
+                break
+
+    return row_a, row_b, row_frac, col_a, col_b, col_frac
+
+
+class EventTable:
+    def __init__(self, row_headers=ROW_HEADERS, col_headers=COL_HEADERS):
+        self.row_headers = row_headers
+        self.col_headers = col_headers
+        self.columns = {name: array(code) for name, code in FIELDS}
+        self.files = []   # file id -> log path
+        self._col_values = [float(s.replace(",", ".")) for s in col_headers]
+
+    def __len__(self):
+        return len(self.columns["weight"])
+
+    def nbytes(self):
+        return sum(values.itemsize * len(values) for values in self.columns.values())
+
+    # -----------------------
+    # Building
+    # -----------------------
+    def add_file(self, path):
+        """File id for a log path (added if new)."""
+        if path not in self.files:
+            self.files.append(path)
+        return self.files.index(path)
+
+    def append(self, time, rpm, fuel, weight, row, label, file_id=0):
+        """Adds one event ('label' is "TH1", "TH2", "UnderTH1" or "UnderTH2"); returns its index."""
+        sign, level = LABELS[label]
+        fractions = cell_fractions(rpm, fuel, self.row_headers, self._col_values)
+        if fractions is None:
+            fractions = (0, 0, math.nan, 0, 0, math.nan)
+        row_a, row_b, row_frac, col_a, col_b, col_frac = fractions
+        for name, value in (("time", time), ("rpm", rpm), ("fuel", fuel), ("weight", weight),
+                            ("sign", sign), ("level", level), ("file_id", file_id), ("row", row),
+                            ("row_a", row_a), ("row_b", row_b), ("col_a", col_a), ("col_b", col_b),
+                            ("row_frac", row_frac), ("col_frac", col_frac),
+                            ("duration", 0.0), ("area", 0.0)):
+            self.columns[name].append(value)
+        return len(self) - 1
+
+    def extend(self, other, path=None):
+        """
+        Appends the events of another table (e.g. of one log). With 'path',
+        all of them get that log's file id; otherwise the logs of 'other'
+        are added to 'files' and its file ids mapped accordingly.
+        """
+        if path is not None:
+            file_ids = array("H", [self.add_file(path)]) * len(other)
+        else:
+            mapping = [self.add_file(p) for p in other.files]
+            file_ids = array("H", (mapping[f] if f < len(mapping) else f for f in other.columns["file_id"]))
+        for name, values in other.columns.items():
+            self.columns[name].extend(file_ids if name == "file_id" else values)
+
+    # -----------------------
+    # Reading
+    # -----------------------
+    def indices(self, file_id=None):
+        """Event indices, all or those of one log."""
+        if file_id is None:
+            return range(len(self))
+        return [i for i, f in enumerate(self.columns["file_id"]) if f == file_id]
+
+    def shares(self, file_id=None):
+        """
+        Yields (event index, cell number, value) for every non-zero share of
+        an event's weight in a map cell; cell number = row index * columns + column index.
+        """
+        for i in self.indices(file_id):
+            yield from self._event_shares(i)
+
+    def cell_key(self, cell):
+        """(row_header, col_header) of a cell number."""
+        r, c = divmod(cell, len(self.col_headers))
+        return self.row_headers[r], self.col_headers[c]
+
+    def event_cells(self, index):
+        """[((row_header, col_header), value)] of one event."""
+        return [(self.cell_key(cell), value) for _, cell, value in self._event_shares(index)]
+
+    def _event_shares(self, index):
+        c = self.columns
+        col_count = len(self.col_headers)
+        weight = c["weight"][index]
+        row_frac = c["row_frac"][index]
+        col_frac = c["col_frac"][index]
+        if math.isnan(row_frac):
+            return
+        for r, r_weight in ((c["row_a"][index], row_frac), (c["row_b"][index], 1 - row_frac)):
+            for col, c_weight in ((c["col_a"][index], col_frac), (c["col_b"][index], 1 - col_frac)):
+                value = weight * r_weight * c_weight
+                if value != 0:
+                    yield index, r * col_count + col, value
+
+    def file_stats(self):
+        """Per log: number of events, over- / underboost events, mean weight and excursion time."""
+        stats = [{"path": path, "events": 0, "over": 0, "under": 0, "weight": 0.0, "duration": 0.0}
+                 for path in self.files or [None]]
+        c = self.columns
+        for file_id, sign, weight, duration in zip(c["file_id"], c["sign"], c["weight"], c["duration"]):
+            entry = stats[file_id]
+            entry["events"] += 1
+            entry["over" if sign > 0 else "under"] += 1
+            entry["weight"] += weight
+            entry["duration"] += duration
+        for entry in stats:
+            if entry["events"]:
+                entry["weight"] /= entry["events"]
+        return stats
+
+    # -----------------------
+    # Export
+    # -----------------------
+    def save_binary(self, path):
+        """
+        Writes a JSON header line (fields, event count, files, headers) after
+        BINARY_MAGIC, followed by the raw column arrays in FIELDS order.
+        """
+        header = {
+            "fields": [[name, code] for name, code in FIELDS],
+            "count": len(self),
+            "files": self.files,
+            "row_headers": self.row_headers,
+            "col_headers": self.col_headers,
+            "byteorder": sys.byteorder
+        }
+        with open(path, mode="wb") as f:
+            f.write(BINARY_MAGIC)
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            for name, _ in FIELDS:
+                self.columns[name].tofile(f)
+
+    @classmethod
+    def load_binary(cls, path):
+        with open(path, mode="rb") as f:
+            if f.readline() != BINARY_MAGIC:
+                raise ValueError(f"{path} is not an event table.")
+            header = json.loads(f.readline().decode("utf-8"))
+            table = cls(header["row_headers"], header["col_headers"])
+            table.files = header["files"]
+            for name, code in header["fields"]:
+                values = array(code)
+                values.fromfile(f, header["count"])
+                if header["byteorder"] != sys.byteorder:
+                    values.byteswap()
+                table.columns[name] = values
+        return table
+
+    def save_csv(self, path):
+        """One line per event; file ids are written as the log path."""
+        names = [name for name, _ in FIELDS]
+        with open(path, mode="w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["file" if name == "file_id" else name for name in names])
+            files = self.files
+            for values in zip(*(self.columns[name] for name in names)):
+                row = list(values)
+                file_id = row[names.index("file_id")]
+                row[names.index("file_id")] = files[file_id] if file_id < len(files) else file_id
+                writer.writerow(row)
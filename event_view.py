@@ -0,0 +1,105 @@
+"""
+Window listing the indexed acceleration windows of the loaded logs.
+
+The list comes from the event index in the parse cache; selecting a window
+loads only that window's samples from the cached columns.
+"""
+
+import os
+import tkinter as tk
+
+from log_cache import get_windows, filter_windows
+
+
+class EventWindow(tk.Toplevel):
+    def __init__(self, parent, log_paths, th1, th2, options=None, on_select=None):
+        """
+        :param log_paths: the logs to choose from.
+        :param on_select: optional callback(cached_log, window) when a window is selected.
+        """
+        super().__init__(parent)
+        self.title("Acceleration windows")
+        self.geometry("900x600")
+        self.th1 = th1
+        self.th2 = th2
+        self.options = options
+        self.on_select = on_select
+        self.paths = {os.path.basename(p): p for p in log_paths}
+        self.cached = None
+        self.windows = []
+        self.shown = []
+
+        # --- Log selection and filters ---
+        filters = tk.Frame(self)
+        filters.pack(fill=tk.X)
+        self.log_var = tk.StringVar(value=next(iter(self.paths), ""))
+        self.log_var.trace_add("write", lambda *args: self.load_log())
+        tk.OptionMenu(filters, self.log_var, *(self.paths or [""])).pack(side=tk.LEFT)
+
+        self.rpm_min_var = tk.StringVar()
+        self.rpm_max_var = tk.StringVar()
+        self.min_dev_var = tk.StringVar()
+        for text, var in (("RPM from", self.rpm_min_var), ("to", self.rpm_max_var),
+                          ("Min deviation", self.min_dev_var)):
+            tk.Label(filters, text=text).pack(side=tk.LEFT, padx=(10, 2))
+            tk.Entry(filters, textvariable=var, width=7).pack(side=tk.LEFT)
+        tk.Button(filters, text="Filter", command=self.apply_filter).pack(side=tk.LEFT, padx=10)
+
+        # --- Window list (top) and samples of the selected window (bottom) ---
+        self.listbox = tk.Listbox(self, font=("courier", "9", "normal"), height=12)
+        self.listbox.pack(fill=tk.BOTH, expand=True)
+        self.listbox.bind("<<ListboxSelect>>", self.window_selected)
+        self.samples = tk.Text(self, font=("courier", "9", "normal"), height=14)
+        self.samples.pack(fill=tk.BOTH, expand=True)
+
+        self.load_log()
+
+    def load_log(self):
+        path = self.paths.get(self.log_var.get())
+        if path is None:
+            return
+        self.cached, self.windows = get_windows(path, self.th1, self.th2, self.options)
+        self.apply_filter()
+
+    def apply_filter(self):
+        self.shown = filter_windows(
+            self.windows,
+            _to_float(self.rpm_min_var.get()),
+            _to_float(self.rpm_max_var.get()),
+            _to_float(self.min_dev_var.get())
+        )
+        self.listbox.delete(0, tk.END)
+        for window in self.shown:
+            self.listbox.insert(tk.END, (
+                f"{window['start_time']:>9.2f}-{window['end_time']:<9.2f} "
+                f"rpm {window['rpm_min']:>5.0f}-{window['rpm_max']:<5.0f} "
+                f"over {window['peak_over']:>7.1f} under {window['peak_under']:>7.1f} "
+                f"cells {len(window['cells'])}"
+            ))
+
+    def window_selected(self, event=None):
+        selection = self.listbox.curselection()
+        if not selection:
+            return
+        window = self.shown[selection[0]]
+        columns = self.cached.read_window(window["start_row"], window["end_row"])
+        names = list(columns)
+
+        self.samples.delete("1.0", tk.END)
+        for row, label, value in window["events"]:
+            self.samples.insert(tk.END, f"row {row}: {label} ({value:+.3f})\n")
+        for r, c, value in window["cells"]:
+            self.samples.insert(tk.END, f"{r:>5} / {c:>6}: {value:+.3f}\n")
+        self.samples.insert(tk.END, "".join(f"{name:>16}" for name in names) + "\n")
+        for row in zip(*(columns[name] for name in names)):
+            self.samples.insert(tk.END, "".join(f"{value:>16.2f}" for value in row) + "\n")
+
+        if self.on_select is not None:
+            self.on_select(self.cached, window)
+
+
+def _to_float(text):
+    try:
+        return float(text.replace(",", "."))
+    except ValueError:
+        return None
@@ -0,0 +1,369 @@
+"""
+On-disk cache of parsed logs and their acceleration window index.
+
+Every log (per set of parse options) gets a directory in CACHE_DIR holding
+  - one binary file per channel (array of doubles, row i at byte offset 8 * i),
+    i.e. the columns after conditioning / resampling
+  - meta.json with the source path, size, mtime, options and row count
+  - events-<th1>-<th2>.json: the acceleration windows found with th1/th2
+
+Because the columns are fixed-width, the samples of any window can be read
+by seeking, without touching the rest of the log or the original CSV.
+
+Opening an entry marks it as used (directory mtime). Building an entry
+removes the entries of older versions of the same log and then evicts the
+least recently used entries while the cache exceeds CACHE_MAX_BYTES.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import threading
+from array import array
+
+from config import CACHE_DIR, CACHE_MAX_BYTES, CHUNK_ROWS
+from csv_handler import COLUMNS, iter_column_chunks
+from analyzers import CorrectionAnalyzer, run_analyzers, needed_columns
+from conditioning import condition_chunks
+from resample import resample_chunks
+
+CACHE_VERSION = 3
+ITEM_SIZE = array("d").itemsize
+
+
+def _source_stamp(file_path):
+    stat = os.stat(file_path)
+    return {"path": os.path.abspath(file_path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def _tmp_suffix():
+    """Suffix for files being written, unique per process and thread."""
+    return f".tmp{os.getpid()}-{threading.get_ident()}"
+
+
+def cache_key(file_path, options=None):
+    """Key of a log's cache entry: changes whenever the file or the parse options change."""
+    stamp = _source_stamp(file_path)
+    raw = json.dumps([CACHE_VERSION, stamp, options or {}], sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class CachedLog:
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), mode="r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.rows = self.meta["rows"]
+        self.names = [name for name, _ in COLUMNS]
+
+    def _column_path(self, name):
+        return os.path.join(self.directory, name + ".bin")
+
+    def read_window(self, start_row, end_row):
+        """Returns the columns of rows [start_row, end_row) by seeking into the column files."""
+        start_row = max(0, start_row)
+        end_row = min(self.rows, end_row)
+        columns = {}
+        for name in self.names:
+            values = array("d")
+            if end_row > start_row:
+                with open(self._column_path(name), mode="rb") as f:
+                    f.seek(start_row * ITEM_SIZE)
+                    values.fromfile(f, end_row - start_row)
+            columns[name] = values
+        return columns
+
+    def iter_chunks(self, chunk_rows=CHUNK_ROWS, names=None):
+        """
+        Yields the cached columns in chunks of 'chunk_rows' rows; only the
+        channels in 'names' if given.
+        """
+        files = {name: open(self._column_path(name), mode="rb") for name in (names or self.names)}
+        try:
+            remaining = self.rows
+            while remaining > 0:
+                count = min(chunk_rows, remaining)
+                chunk = {}
+                for name, f in files.items():
+                    values = array("d")
+                    values.fromfile(f, count)
+                    chunk[name] = values
+                remaining -= count
+                yield chunk
+        finally:
+            for f in files.values():
+                f.close()
+
+    def load_columns(self):
+        """Returns all cached columns."""
+        return self.read_window(0, self.rows)
+
+    def map_columns(self):
+        """
+        Returns the cached columns as read-only memoryviews of doubles backed by
+        mmap, so even very long logs can be indexed and sliced without loading
+        them into memory.
+        """
+        columns = {}
+        for name in self.names:
+            if self.rows == 0:
+                columns[name] = memoryview(array("d"))
+                continue
+            with open(self._column_path(name), mode="rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            columns[name] = memoryview(mapped).cast("d")
+        return columns
+
+    # -----------------------
+    # Event index
+    # -----------------------
+    def _events_path(self, th1, th2):
+        # One file per threshold pair, so indexing with other thresholds
+        # never replaces (or half-writes) the windows another caller reads.
+        return os.path.join(self.directory, f"events-{float(th1)!r}-{float(th2)!r}.json")
+
+    def load_events(self, th1, th2):
+        """Returns the acceleration windows found with th1/th2, or None if not indexed yet."""
+        try:
+            with open(self._events_path(th1, th2), mode="r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if index.get("th1") != th1 or index.get("th2") != th2:
+            return None
+        return index["windows"]
+
+    def save_events(self, th1, th2, windows):
+        path = self._events_path(th1, th2)
+        tmp_path = path + _tmp_suffix()
+        with open(tmp_path, mode="w", encoding="utf-8") as f:
+            json.dump({"th1": th1, "th2": th2, "windows": windows}, f)
+        os.replace(tmp_path, path)
+
+
+def open_cached(file_path, options=None, cache_dir=CACHE_DIR):
+    """Returns the CachedLog for file_path/options, or None if it is not cached (or stale)."""
+    cached = _open_directory(os.path.join(cache_dir, cache_key(file_path, options)))
+    if cached is not None:
+        _touch(cached.directory)
+    return cached
+
+
+def _touch(directory):
+    # The directory mtime is the entry's last use, for the LRU eviction.
+    try:
+        os.utime(directory)
+    except OSError:
+        pass
+
+
+def _open_directory(directory):
+    if not os.path.isfile(os.path.join(directory, "meta.json")):
+        return None
+    try:
+        return CachedLog(directory)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def build_cache(file_path, options=None, cache_dir=CACHE_DIR):
+    """
+    Reads the log once (streamed in chunks, with the conditioning/resampling
+    from 'options') and writes the resulting columns to the cache.
+    """
+    options = options or {}
+    key = cache_key(file_path, options)
+    directory = os.path.join(cache_dir, key)
+    # Per process and thread, so parallel workers building the same entry do not collide.
+    tmp_directory = directory + _tmp_suffix()
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    os.makedirs(tmp_directory)
+
+    chunks = iter_column_chunks(file_path)
+    if options.get("conditioning") is not None:
+        chunks = condition_chunks(chunks, options["conditioning"])
+    if options.get("resample_step"):
+        chunks = resample_chunks(chunks, options["resample_step"])
+
+    names = [name for name, _ in COLUMNS]
+    files = {name: open(os.path.join(tmp_directory, name + ".bin"), mode="wb") for name in names}
+    rows = 0
+    try:
+        for chunk in chunks:
+            for name in names:
+                chunk[name].tofile(files[name])
+            rows += len(chunk[names[0]])
+    finally:
+        for f in files.values():
+            f.close()
+
+    meta = dict(_source_stamp(file_path), options=options, rows=rows, version=CACHE_VERSION)
+    with open(os.path.join(tmp_directory, "meta.json"), mode="w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    # Entries that are in place may be open (or mapped) by other processes,
+    # so they are never deleted in place: a valid one wins, a broken one
+    # (no readable meta.json) is first renamed aside.
+    existing = _open_directory(directory)
+    if existing is not None:
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        return existing
+    if os.path.isdir(directory) and _open_directory(directory) is None:
+        _remove_entry(directory)
+    try:
+        os.rename(tmp_directory, directory)
+    except OSError:
+        # Another process finished the same entry first; use that one.
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+    evict_entries(cache_dir, keep=directory)
+    return CachedLog(directory)
+
+
+def _remove_entry(directory):
+    """Renames an entry aside (atomically, it may be in use) and deletes it."""
+    removed_directory = directory + ".stale" + _tmp_suffix()
+    try:
+        os.rename(directory, removed_directory)
+    except OSError:
+        return  # Already removed by another process.
+    shutil.rmtree(removed_directory, ignore_errors=True)
+
+
+def evict_entries(cache_dir=CACHE_DIR, keep=None, max_bytes=CACHE_MAX_BYTES):
+    """
+    Removes the entries of logs that have changed (or disappeared) since they
+    were cached, then the least recently used entries while the cache holds
+    more than max_bytes. The entry 'keep' is never removed.
+    """
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return
+    entries = []  # (last use, size, directory)
+    for name in names:
+        directory = os.path.join(cache_dir, name)
+        if ".tmp" in name or ".stale" in name or not os.path.isdir(directory):
+            continue  # Being built or removed by some process.
+        cached = _open_directory(directory)
+        if cached is None:
+            continue
+        meta = cached.meta
+        if directory != keep:
+            try:
+                current = _source_stamp(meta["path"])
+            except OSError:
+                current = None
+            if current is None or (current["size"], current["mtime"]) != (meta["size"], meta["mtime"]):
+                _remove_entry(directory)
+                continue
+        try:
+            size = sum(entry.stat().st_size for entry in os.scandir(directory))
+            entries.append((os.stat(directory).st_mtime, size, directory))
+        except OSError:
+            continue
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, directory in sorted(entries):
+        if total <= max_bytes:
+            break
+        if directory != keep:
+            _remove_entry(directory)
+            total -= size
+
+
+def get_cached(file_path, options=None, cache_dir=CACHE_DIR):
+    """Returns the CachedLog for a log, building the cache entry first if needed."""
+    cached = open_cached(file_path, options, cache_dir)
+    if cached is None:
+        cached = build_cache(file_path, options, cache_dir)
+    return cached
+
+
+def ingest(file_path, th1, th2, options=None, verbose=False, cache_dir=CACHE_DIR, analyzers=()):
+    """
+    Analyzes a log through the cache: the CSV is only parsed if there is no
+    cache entry yet, and the acceleration window index for th1/th2 is written
+    next to the cached columns. Returns (CorrectionAnalyzer, CachedLog); the
+    analyzer holds the EventTable (with the log as its only file) and the
+    accumulated grid.
+    Additional 'analyzers' (see analyzers.py) run in the same pass.
+    """
+    log = print if verbose else None
+    cached = open_cached(file_path, options, cache_dir)
+    if verbose:
+        print(f"\n--- Parsing CSV: {file_path}{' (cached)' if cached is not None else ''} ---")
+    if cached is None:
+        cached = build_cache(file_path, options, cache_dir)
+    if verbose:
+        print(f"Using Threshold1={th1}, Threshold2={th2}")
+
+    windows = []
+    correction = CorrectionAnalyzer(th1, th2, log=log, windows=windows)
+    run_analyzers(cached.iter_chunks(), [correction] + list(analyzers))
+    if cached.load_events(th1, th2) is None:
+        cached.save_events(th1, th2, windows)
+    correction.events.add_file(os.path.abspath(file_path))
+    return correction, cached
+
+
+def analyze(file_path, analyzers, options=None, cache_dir=CACHE_DIR):
+    """
+    Runs the analyzers over a log in one pass over its cached columns, reading
+    only the channels they need. Returns the CachedLog.
+    """
+    cached = get_cached(file_path, options, cache_dir)
+    run_analyzers(cached.iter_chunks(names=needed_columns(analyzers)), analyzers)
+    return cached
+
+
+def get_windows(file_path, th1, th2, options=None, cache_dir=CACHE_DIR):
+    """
+    Returns (CachedLog, windows) with the acceleration windows for th1/th2,
+    indexing the cached columns first if the log was indexed with other thresholds.
+    """
+    cached = get_cached(file_path, options, cache_dir)
+    windows = cached.load_events(th1, th2)
+    if windows is None:
+        _, cached = ingest(file_path, th1, th2, options, cache_dir=cache_dir)
+        windows = cached.load_events(th1, th2)
+    return cached, windows
+
+
+def cell_window_index(file_paths, th1, th2, options=None, cache_dir=CACHE_DIR):
+    """
+    Maps every cell (row_header, col_header) to [(log path, window, share)]:
+    the windows of the logs that have a share in it. Logs whose windows
+    cannot be read are reported and left out.
+    """
+    index = {}
+    for path in file_paths:
+        try:
+            _, windows = get_windows(path, th1, th2, options, cache_dir)
+        except (OSError, ValueError) as e:
+            print(f"No windows for {path}: {e}")
+            continue
+        for window in windows:
+            for row, col, share in window["cells"]:
+                index.setdefault((row, col), []).append((path, window, share))
+    return index
+
+
+def filter_windows(windows, rpm_min=None, rpm_max=None, min_deviation=None):
+    """
+    Returns the windows whose RPM range overlaps [rpm_min, rpm_max] and whose
+    largest over- or underboost is at least min_deviation.
+    """
+    result = []
+    for window in windows:
+        if window["rpm_min"] is None:
+            continue  # Window without any accelerating sample.
+        if rpm_min is not None and window["rpm_max"] < rpm_min:
+            continue
+        if rpm_max is not None and window["rpm_min"] > rpm_max:
+            continue
+        if min_deviation is not None and max(window["peak_over"], -window["peak_under"]) < min_deviation:
+            continue
+        result.append(window)
+    return result
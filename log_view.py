@@ -0,0 +1,137 @@
+"""
+Window listing the loaded logs with an on/off toggle and a deviation heatmap per log.
+
+Everything is drawn on a single Canvas (instead of a row of widgets per log), so
+the list stays responsive with hundreds of logs loaded.
+"""
+
+import os
+import tkinter as tk
+
+CELL_PX = 4          # size of one heatmap cell
+ROW_PAD = 6          # vertical gap between two logs
+NAME_X = 28          # x position of the file name
+HEATMAP_X = 300      # x position of the heatmap
+NO_DATA_COLOR = "#d0d0d0"
+
+
+def deviation_color(value, max_abs):
+    """0 → green, positive → red, negative → blue (same scheme as the CSV color mode)."""
+    if value is None:
+        return NO_DATA_COLOR
+    fraction = min(1.0, abs(value) / max_abs) if max_abs else 0.0
+    strength = int(255 * fraction)
+    if value > 0:
+        return f"#{strength:02x}{255 - strength:02x}00"
+    return f"#00{255 - strength:02x}{strength:02x}"
+
+
+class LogListWindow(tk.Toplevel):
+    def __init__(self, parent, log_set, on_change):
+        """
+        :param log_set: the LogSet to display.
+        :param on_change: called after a log was toggled, to refresh the main table.
+        """
+        super().__init__(parent)
+        self.title("Logs")
+        self.geometry("520x600")
+        self.log_set = log_set
+        self.on_change = on_change
+
+        top = tk.Frame(self)
+        top.pack(fill=tk.X)
+        self.summary_label = tk.Label(top, anchor="w")
+        self.summary_label.pack(side=tk.LEFT, padx=5)
+        tk.Button(top, text="Sort by deviation", command=self.sort_by_deviation).pack(side=tk.RIGHT)
+        tk.Button(top, text="All", command=lambda: self.set_all(True)).pack(side=tk.RIGHT)
+        tk.Button(top, text="None", command=lambda: self.set_all(False)).pack(side=tk.RIGHT)
+
+        self.canvas = tk.Canvas(self, bg="white")
+        scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.canvas.bind("<MouseWheel>", self._on_wheel)
+        self.canvas.bind("<Button-4>", lambda e: self.canvas.yview_scroll(-3, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.canvas.yview_scroll(3, "units"))
+
+        self.order = []
+        self.items = {}   # path -> (toggle item, rms item, {cell key: rect item})
+        self.rebuild()
+
+    def _on_wheel(self, event):
+        self.canvas.yview_scroll(-1 if event.delta > 0 else 1, "units")
+
+    def rebuild(self, order=None):
+        """Redraws the whole list (used when logs were added or re-ordered)."""
+        self.canvas.delete("all")
+        self.items.clear()
+        self.order = order if order is not None else self.log_set.paths()
+
+        row_headers = self.log_set.row_headers
+        col_headers = self.log_set.col_headers
+        row_height = max(CELL_PX * len(row_headers), 16) + ROW_PAD
+
+        for n, path in enumerate(self.order):
+            y = n * row_height + ROW_PAD
+            toggle = self.canvas.create_text(8, y, anchor="nw", font=("tahoma", "10", "bold"))
+            self.canvas.create_text(NAME_X, y, anchor="nw", text=os.path.basename(path),
+                                    font=("tahoma", "8", "normal"), width=HEATMAP_X - NAME_X - 60)
+            rms = self.canvas.create_text(HEATMAP_X - 8, y, anchor="ne", font=("tahoma", "8", "normal"))
+            rects = {}
+            for i, row_header in enumerate(row_headers):
+                for j, col_header in enumerate(col_headers):
+                    x0 = HEATMAP_X + j * CELL_PX
+                    y0 = y + i * CELL_PX
+                    rects[(row_header, col_header)] = self.canvas.create_rectangle(
+                        x0, y0, x0 + CELL_PX, y0 + CELL_PX, width=0)
+            self.canvas.tag_bind(toggle, "<Button-1>", lambda e, p=path: self.toggle(p))
+            self.items[path] = (toggle, rms, rects)
+
+        height = len(self.order) * row_height + ROW_PAD
+        self.canvas.configure(scrollregion=(0, 0, HEATMAP_X + CELL_PX * len(col_headers) + 8, height))
+        self.refresh()
+
+    def refresh(self):
+        """Recolors the heatmaps against the current aggregate."""
+        if set(self.order) != set(self.log_set.paths()):
+            self.rebuild()
+            return
+
+        aggregate = self.log_set.averaged()
+        deviations = {path: self.log_set.deviation(path, aggregate) for path in self.order}
+        max_abs = max(
+            (abs(v) for grid, _ in deviations.values() for v in grid.values() if v is not None),
+            default=0
+        )
+        for path in self.order:
+            toggle, rms_item, rects = self.items[path]
+            grid, rms = deviations[path]
+            enabled = self.log_set.is_enabled(path)
+            self.canvas.itemconfig(toggle, text="☑" if enabled else "☐")
+            self.canvas.itemconfig(rms_item, text=f"{rms:.3f}", fill="black" if enabled else "#888888")
+            for key, rect in rects.items():
+                self.canvas.itemconfig(rect, fill=deviation_color(grid[key], max_abs))
+
+        self.summary_label.config(
+            text=f"{len(self.log_set.enabled)} of {len(self.log_set)} logs enabled "
+                 f"(max deviation {max_abs:.3f})"
+        )
+
+    def toggle(self, path):
+        self.log_set.set_enabled(path, not self.log_set.is_enabled(path))
+        self.refresh()
+        self.on_change()
+
+    def set_all(self, enabled):
+        for path in self.order:
+            self.log_set.set_enabled(path, enabled)
+        self.refresh()
+        self.on_change()
+
+    def sort_by_deviation(self):
+        """Puts the logs furthest from the aggregate at the top."""
+        aggregate = self.log_set.averaged()
+        order = sorted(self.log_set.paths(),
+                       key=lambda p: self.log_set.deviation(p, aggregate)[1], reverse=True)
+        self.rebuild(order)
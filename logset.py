@@ -0,0 +1,195 @@
+"""
+Keeps one correction grid per log file next to the aggregate over all of them.
+
+Each log is parsed once (several logs in parallel worker processes) into its own
+CorrectionAccumulator. Switching a log on or off only adds or subtracts its
+totals from the aggregate, so nothing has to be parsed again. The same holds
+for changing the aggregation mode (see accumulator.py).
+
+Recency weighting is kept up to date the same way: every log is weighted
+against a fixed reference time (the weight doubles every half-life after it),
+so switching a log adds or subtracts its weighted sums once, and averaging
+only rescales them to the newest enabled log.
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config import ROW_HEADERS, COL_HEADERS, RECENCY_HALF_LIFE_DAYS
+from accumulator import CorrectionAccumulator
+from log_cache import ingest
+
+
+def parse_log_totals(file_path, th1, th2, verbose=False, options=None):
+    """
+    Parses a single log and returns its CorrectionAccumulator (runs in a worker process).
+    'options' holds extra parse_csv keyword arguments (conditioning, resample_step).
+    The log goes through the parse cache, which also indexes its acceleration windows.
+    """
+    correction, _ = ingest(file_path, th1, th2, options, verbose)
+    acc = correction.grid
+    acc.timestamp = os.path.getmtime(file_path)
+    return acc
+
+
+def parse_logs_parallel(file_paths, th1, th2, on_result, max_workers=None, verbose=False,
+                        options=None):
+    """
+    Parses all file_paths in a process pool and calls on_result(file_path, accumulator)
+    as each one finishes. Files that cannot be read are reported and skipped.
+    """
+    if len(file_paths) == 1:
+        # Not worth starting a pool for a single log.
+        path = file_paths[0]
+        try:
+            acc = parse_log_totals(path, th1, th2, verbose, options)
+        except (OSError, ValueError) as e:
+            print(f"Skipping {path}: {e}")
+            return
+        on_result(path, acc)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(parse_log_totals, path, th1, th2, verbose, options): path
+            for path in file_paths
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                acc = future.result()
+            except (OSError, ValueError) as e:
+                print(f"Skipping {path}: {e}")
+                continue
+            on_result(path, acc)
+
+
+class LogSet:
+    def __init__(self, row_headers=ROW_HEADERS, col_headers=COL_HEADERS):
+        self.row_headers = row_headers
+        self.col_headers = col_headers
+        self.logs = {}        # file path -> CorrectionAccumulator (insertion ordered)
+        self.tables = {}      # file path -> averaged table of that log alone (in the set's mode)
+        self.enabled = set()
+        self.total = CorrectionAccumulator(row_headers, col_headers)
+        self.mode = "mean"    # aggregation mode, see AGGREGATION_MODES and set_mode
+        # Recency weighting: per-cell sums of values and counts of the enabled
+        # logs, weighted against _reference for logs with a timestamp, plain for the others.
+        self._reference = None
+        self.recency_sums = {}
+        self.recency_weights = {}
+        self.untimed_sums = {}
+        self.untimed_counts = {}
+
+    def __len__(self):
+        return len(self.logs)
+
+    def paths(self):
+        return list(self.logs)
+
+    def add(self, path, acc, enabled=True):
+        """Adds (or replaces) the grid of one log file."""
+        if path in self.logs:
+            self.set_enabled(path, False)
+        self.logs[path] = acc
+        self.tables[path] = self._log_table(acc)
+        if enabled:
+            self.set_enabled(path, True)
+
+    def set_mode(self, mode):
+        """Switches the aggregation mode; the per-log tables are recomputed in it."""
+        self.mode = mode
+        for path, acc in self.logs.items():
+            self.tables[path] = self._log_table(acc)
+
+    def _log_table(self, acc):
+        # A single log has no other logs to be weighted against, so "recency" is the plain mean.
+        return acc.averaged("mean" if self.mode == "recency" else self.mode)
+
+    def set_enabled(self, path, enabled):
+        if enabled and path not in self.enabled:
+            self.enabled.add(path)
+            self.total.merge(self.logs[path])
+            self._add_recency(self.logs[path], 1)
+        elif not enabled and path in self.enabled:
+            self.enabled.discard(path)
+            self.total.subtract(self.logs[path])
+            if self.enabled:
+                self._add_recency(self.logs[path], -1)
+            else:
+                # Start over, so no rounding residue is left behind.
+                self._reference = None
+                for sums in (self.recency_sums, self.recency_weights, self.untimed_sums, self.untimed_counts):
+                    sums.clear()
+
+    def _add_recency(self, acc, sign):
+        """Adds (sign 1) or removes (sign -1) the recency weighted sums of one log."""
+        if acc.timestamp is None:
+            sums, weights, factor = self.untimed_sums, self.untimed_counts, sign
+        else:
+            if self._reference is None:
+                self._reference = acc.timestamp
+            sums, weights, factor = self.recency_sums, self.recency_weights, sign * self._recency_factor(acc.timestamp)
+        for key, count in acc.counts.items():
+            sums[key] = sums.get(key, 0) + factor * acc.sums[key]
+            weights[key] = weights.get(key, 0) + factor * count
+
+    def _recency_factor(self, timestamp):
+        return 2.0 ** ((timestamp - self._reference) / (RECENCY_HALF_LIFE_DAYS * 86400.0))
+
+    def is_enabled(self, path):
+        return path in self.enabled
+
+    def averaged(self, mode=None):
+        """Averaged table over all enabled logs, with the given (default: the set's) aggregation mode."""
+        mode = mode or self.mode
+        if mode == "recency":
+            return self._recency_averaged()
+        return self.total.averaged(mode)
+
+    def _recency_averaged(self):
+        """
+        Mean over the enabled logs with every log weighted by its age relative
+        to the newest one: the weight halves every RECENCY_HALF_LIFE_DAYS.
+        Logs without a timestamp count fully.
+        """
+        newest = max((self.logs[path].timestamp for path in self.enabled
+                      if self.logs[path].timestamp is not None), default=None)
+        scale = 1.0 / self._recency_factor(newest) if newest is not None else 0.0
+        table = {}
+        for row in self.row_headers:
+            for col in self.col_headers:
+                key = (row, col)
+                if not self.total.counts.get(key):
+                    table[key] = 0
+                    continue
+                weight = scale * self.recency_weights.get(key, 0) + self.untimed_counts.get(key, 0)
+                value = scale * self.recency_sums.get(key, 0) + self.untimed_sums.get(key, 0)
+                table[key] = value / weight if weight > 0 else 0
+        return table
+
+    def deviation(self, path, aggregate=None):
+        """
+        Returns (grid, rms) for one log: grid maps (row_header, col_header) to
+        the log's value minus the aggregate, or None where the log has no data;
+        rms is the root mean square over the cells that have data. Both
+        tables are in the set's aggregation mode.
+        """
+        if aggregate is None:
+            aggregate = self.averaged()
+        acc = self.logs[path]
+        table = self.tables[path]
+        grid = {}
+        squares = 0.0
+        cells = 0
+        for key, value in table.items():
+            if acc.counts.get(key, 0):
+                diff = value - aggregate.get(key, 0)
+                grid[key] = diff
+                squares += diff * diff
+                cells += 1
+            else:
+                grid[key] = None
+        rms = math.sqrt(squares / cells) if cells else 0.0
+        return grid, rms
@@ -1,9 +1,15 @@
 #!/usr/bin/env python3
 
-from ui import VAGEDCSuiteDataViewer
+import sys
 
 def main():
-    """Entry point for the application."""
+    """Entry point for the application. Any arguments select the headless runner."""
+    if len(sys.argv) > 1:
+        import cli
+        cli.main(sys.argv[1:])
+        return
+
+    from ui import VAGEDCSuiteDataViewer
     app = VAGEDCSuiteDataViewer()
     app.mainloop()
 
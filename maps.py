@@ -0,0 +1,110 @@
+"""
+Map values and the VAGEDCSuite clipboard format, independent of the Tk table.
+
+Maps are 2D lists (rows follow ROW_HEADERS, columns follow COL_HEADERS).
+Cell texts look like "45,50%"; numeric maps hold the same values as floats.
+"""
+
+from config import ROW_HEADERS, COL_HEADERS
+
+
+def parse_percent(text, default=0.0):
+    """Turns a cell text like '45,50%' (or '45,50') into a float."""
+    try:
+        return float(text.rstrip("%").replace(",", "."))
+    except ValueError:
+        return default
+
+
+def format_percent(value):
+    """Formats a value as XX,XX%."""
+    return f"{value:.2f}".replace(".", ",") + "%"
+
+
+def parse_vagedcsuite(data_str, row_count=len(ROW_HEADERS), col_count=len(COL_HEADERS)):
+    """
+    Parses the VAGEDCSuite clipboard format ("2col:row:val:~...~") into a
+    matrix of cell texts. Returns None if the data is not in that format.
+    """
+    data_str = data_str.strip()
+    if not (data_str.startswith("2") and data_str.endswith("~")):
+        return None
+
+    data_str = data_str[1:].strip()  # remove leading '2'
+    chunks = data_str.split(':~')
+    chunks = [c.strip() for c in chunks if c.strip()]
+
+    data_matrix = [
+        ["" for _ in range(col_count)]
+        for __ in range(row_count)
+    ]
+
+    for chunk in chunks:
+        parts = chunk.split(':')
+        if len(parts) != 3:
+            continue
+        col_str, row_str, val_str = parts
+        try:
+            col = int(col_str)
+            row = int(row_str)
+            val = int(val_str)
+        except ValueError:
+            continue
+
+        if 0 <= row < row_count and 0 <= col < col_count:
+            num_value = (10000 - val) / 100.0
+            data_matrix[row][col] = format_percent(num_value)
+    return data_matrix
+
+
+def format_vagedcsuite(values):
+    """
+    Converts a numeric map back into the VAGEDCSuite clipboard format
+    (the reverse of parse_vagedcsuite). Cells set to None are left out.
+    """
+    chunks = []
+    for i, row in enumerate(values):
+        for j, num_value in enumerate(row):
+            if num_value is None:
+                continue
+            # pasted: num_value = (10000 - val) / 100  ==>  val = 10000 - num_value * 100
+            val_int = int(round(10000 - num_value * 100))
+            chunks.append(f"{j}:{i}:{val_int}")
+    if not chunks:
+        return None
+    # Join chunks with ":~", prefix with "2" and suffix with "~"
+    return "2" + ":~".join(chunks) + "~"
+
+
+def map_values(text_matrix):
+    """Numeric map from a matrix of cell texts (unparsable cells become 0)."""
+    return [[parse_percent(text) for text in row] for row in text_matrix]
+
+
+def updated_map(values, csv_table, gain=1.0, row_headers=ROW_HEADERS, col_headers=COL_HEADERS):
+    """Adds the (optionally scaled) averaged correction table to a numeric map."""
+    return [
+        [value + gain * csv_table.get((row_headers[i], col_headers[j]), 0)
+         for j, value in enumerate(row)]
+        for i, row in enumerate(values)
+    ]
+
+
+def fix_map(values, apply_column_fix=True):
+    """
+    Returns (rounded, fixed) for a numeric map:
+      1. every cell is rounded to a whole number,
+      2. if apply_column_fix is True, for each column (iterating from bottom to top),
+         if the cell above is not at least 1 greater than the cell below, it is
+         raised to exactly 1 more. Only cells with values above 20 take part.
+    """
+    num_rows = len(values)
+    rounded = [[round(v) for v in row] for row in values]
+    fixed = [list(row) for row in rounded]
+    if apply_column_fix:
+        for j in range(len(fixed[0]) if fixed else 0):
+            for i in range(num_rows - 1, 0, -1):
+                if fixed[i][j] > 20 and fixed[i-1][j] > 20:
+                    if fixed[i-1][j] < fixed[i][j] + 1:
+                        fixed[i-1][j] = fixed[i][j] + 1
+    return rounded, fixed
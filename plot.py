@@ -0,0 +1,371 @@
+"""
+Boost trace plot: spec/actual intake pressure, engine speed and injection
+quantity of one log, with the TH1/TH2 events marked.
+
+Only as many points as there are pixels are ever drawn:
+  - few samples visible: the raw samples
+  - up to LTTB_MAX_SAMPLES visible: Largest-Triangle-Three-Buckets decimation
+  - more: per-pixel min/max, taken from a pyramid of precomputed bucket
+    minima/maxima so the cost depends on the canvas width, not the log length
+The decimation is redone on every zoom or pan. The pyramids are built in a
+background thread when a log is shown; until they are ready, long ranges
+are drawn from every n-th sample.
+"""
+
+import queue
+import threading
+import tkinter as tk
+from bisect import bisect_left
+
+LTTB_MAX_SAMPLES = 50000
+PYRAMID_BASE = 64          # samples per bucket on the lowest pyramid level
+MARGIN_LEFT = 60
+MARGIN_RIGHT = 10
+LANE_GAP = 14
+EVENT_COLORS = {
+    "TH1": "#ff9900",
+    "TH2": "#ff0000",
+    "UnderTH1": "#3399ff",
+    "UnderTH2": "#0000ff"
+}
+
+# Lanes from top to bottom: (title, [(channel, color), ...])
+LANES = (
+    ("Intake pressure (mbar)", [("spec_int", "#008800"), ("act_int", "#cc0000")]),
+    ("Engine speed (/min)", [("eng_speed", "#000000")]),
+    ("Inj. quantity (mg/H)", [("inj_qty_req", "#8800cc"), ("inj_qty_actual", "#0077cc")])
+)
+
+
+def lttb(values, start, end, threshold):
+    """
+    Largest-Triangle-Three-Buckets over values[start:end] (x = sample index).
+    Returns (indices, values) with at most 'threshold' points.
+    """
+    n = end - start
+    if threshold >= n or threshold < 3:
+        return list(range(start, end)), list(values[start:end])
+
+    indices = [start]
+    every = (n - 2) / (threshold - 2)
+    a = start
+    for i in range(threshold - 2):
+        # Average point of the next bucket.
+        next_lo = start + int((i + 1) * every) + 1
+        next_hi = min(start + int((i + 2) * every) + 1, end)
+        avg_x = (next_lo + next_hi - 1) / 2
+        avg_y = sum(values[next_lo:next_hi]) / (next_hi - next_lo)
+
+        # Point of this bucket forming the largest triangle with a and the average.
+        lo = start + int(i * every) + 1
+        hi = start + int((i + 1) * every) + 1
+        ax = a
+        ay = values[a]
+        best = lo
+        best_area = -1.0
+        for j in range(lo, hi):
+            area = abs((ax - avg_x) * (values[j] - ay) - (ax - j) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        indices.append(best)
+        a = best
+    indices.append(end - 1)
+    return indices, [values[i] for i in indices]
+
+
+class MinMaxPyramid:
+    """
+    Bucket minima and maxima of a channel at PYRAMID_BASE, 2 * PYRAMID_BASE,
+    4 * PYRAMID_BASE, ... samples per bucket.
+    """
+
+    def __init__(self, values, base=PYRAMID_BASE):
+        self.values = values
+        self.base = base
+        n = len(values)
+        mins = [min(values[i:i + base]) for i in range(0, n, base)]
+        maxs = [max(values[i:i + base]) for i in range(0, n, base)]
+        self.levels = [(mins, maxs)]
+        while len(mins) > 1:
+            if len(mins) % 2:
+                mins = mins + mins[-1:]
+                maxs = maxs + maxs[-1:]
+            mins = list(map(min, mins[0::2], mins[1::2]))
+            maxs = list(map(max, maxs[0::2], maxs[1::2]))
+            self.levels.append((mins, maxs))
+
+    def query(self, start, end, buckets):
+        """
+        Splits [start, end) into 'buckets' equal parts and returns
+        (centers, mins, maxs), one entry per part.
+        """
+        span = (end - start) / buckets
+        # Coarsest level whose buckets fit at least twice into one output
+        # bucket; below that (level -1) the raw samples are used.
+        level = -1
+        while level + 1 < len(self.levels) and (self.base << (level + 1)) * 2 <= span:
+            level += 1
+        size = self.base << level if level >= 0 else 1
+
+        centers, mins, maxs = [], [], []
+        for b in range(buckets):
+            lo = start + int(b * span)
+            hi = max(lo + 1, min(end, start + int((b + 1) * span)))
+            if level < 0:
+                chunk = self.values[lo:hi]
+                mins.append(min(chunk))
+                maxs.append(max(chunk))
+            else:
+                level_mins, level_maxs = self.levels[level]
+                mins.append(min(level_mins[lo // size:max(lo // size + 1, hi // size)]))
+                maxs.append(max(level_maxs[lo // size:max(lo // size + 1, hi // size)]))
+            centers.append((lo + hi - 1) / 2)
+        return centers, mins, maxs
+
+
+class TracePlot(tk.Frame):
+    def __init__(self, parent, on_choose_log=None, height=260):
+        """
+        :param on_choose_log: called with the file path picked in the log selector.
+        """
+        super().__init__(parent)
+        self.on_choose_log = on_choose_log
+        self.columns = None
+        self.pyramids = {}
+        # Pyramids built in the background arrive here as (log version, pyramids).
+        self.pyramid_queue = queue.Queue()
+        self.log_version = 0
+        self._receiving = False
+        self.events = []     # (row, label), sorted by row
+        self.rows = 0
+        self.log_title = ""
+        self.view = (0, 0)   # visible sample range [start, end)
+        self._redraw_pending = False
+        self._drag_x = None
+
+        header = tk.Frame(self)
+        header.pack(fill=tk.X)
+        self.log_var = tk.StringVar(value="")
+        self.log_menu = tk.OptionMenu(header, self.log_var, "")
+        self.log_menu.pack(side=tk.LEFT)
+        self.info_label = tk.Label(header, text="No log loaded", anchor="w")
+        self.info_label.pack(side=tk.LEFT, fill=tk.X)
+        self.canvas = tk.Canvas(self, bg="white", height=height)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+
+        self.canvas.bind("<Configure>", lambda e: self.schedule_redraw())
+        self.canvas.bind("<MouseWheel>", lambda e: self.zoom(e.x, 0.8 if e.delta > 0 else 1.25))
+        self.canvas.bind("<Button-4>", lambda e: self.zoom(e.x, 0.8))
+        self.canvas.bind("<Button-5>", lambda e: self.zoom(e.x, 1.25))
+        self.canvas.bind("<ButtonPress-1>", self._start_drag)
+        self.canvas.bind("<B1-Motion>", self._drag)
+        self.canvas.bind("<Double-Button-1>", lambda e: self.reset_zoom())
+
+    def set_log_choices(self, paths):
+        """Fills the log selector with the given file paths."""
+        menu = self.log_menu["menu"]
+        menu.delete(0, tk.END)
+        for path in paths:
+            menu.add_command(label=path, command=lambda p=path: self._choose(p))
+
+    def _choose(self, path):
+        self.log_var.set(path)
+        if self.on_choose_log is not None:
+            self.on_choose_log(path)
+
+    def set_log(self, cached, windows=None, title=""):
+        """
+        Shows a cached log (see log_cache.CachedLog). 'windows' is its event
+        index; the events of all windows are marked on the plot.
+        """
+        self.columns = cached.map_columns()
+        self.rows = cached.rows
+        self.pyramids = {}
+        self.log_version += 1
+        version = self.log_version
+        columns = self.columns
+
+        def build():
+            pyramids = {}
+            try:
+                pyramids = {
+                    channel: MinMaxPyramid(columns[channel])
+                    for _, channels in LANES for channel, _ in channels
+                }
+            finally:
+                self.pyramid_queue.put((version, pyramids))
+
+        threading.Thread(target=build, daemon=True).start()
+        if not self._receiving:
+            self._receiving = True
+            self.after(100, self._receive_pyramids)
+        self.events = sorted(
+            (row, label) for window in (windows or []) for row, label, _ in window["events"]
+        )
+        self.log_title = title
+        self.reset_zoom()
+
+    def _receive_pyramids(self):
+        """Takes over the pyramids of the shown log once built (polled via after())."""
+        while True:
+            try:
+                version, pyramids = self.pyramid_queue.get_nowait()
+            except queue.Empty:
+                self.after(100, self._receive_pyramids)
+                return
+            if version == self.log_version:
+                break
+            # Built for a log shown earlier; keep waiting.
+        self._receiving = False
+        self.pyramids = pyramids
+        self.schedule_redraw()
+
+    def show_range(self, start, end):
+        """Zooms to the samples [start, end), e.g. one acceleration window."""
+        if not self.rows:
+            return
+        start = max(0, min(start, self.rows - 1))
+        end = max(start + 2, min(end, self.rows))
+        self.view = (start, min(end, self.rows))
+        self.schedule_redraw()
+
+    def reset_zoom(self):
+        self.show_range(0, self.rows)
+
+    # -----------------------
+    # Mouse handling
+    # -----------------------
+    def _plot_width(self):
+        return max(1, self.canvas.winfo_width() - MARGIN_LEFT - MARGIN_RIGHT)
+
+    def _x_to_row(self, x):
+        start, end = self.view
+        return start + (x - MARGIN_LEFT) / self._plot_width() * (end - start)
+
+    def zoom(self, x, factor):
+        if not self.rows:
+            return
+        start, end = self.view
+        center = min(max(self._x_to_row(x), start), end)
+        new_start = int(center - (center - start) * factor)
+        new_end = int(center + (end - center) * factor) + 1
+        self.show_range(max(0, new_start), min(self.rows, new_end))
+
+    def _start_drag(self, event):
+        self._drag_x = event.x
+
+    def _drag(self, event):
+        if self._drag_x is None or not self.rows:
+            return
+        start, end = self.view
+        shift = int((self._drag_x - event.x) / self._plot_width() * (end - start))
+        if shift:
+            shift = max(-start, min(shift, self.rows - end))
+            self._drag_x = event.x
+            self.view = (start + shift, end + shift)
+            self.schedule_redraw()
+
+    # -----------------------
+    # Drawing
+    # -----------------------
+    def schedule_redraw(self):
+        """Coalesces redraw requests (e.g. a burst of wheel events) into one redraw."""
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.after_idle(self.redraw)
+
+    def redraw(self):
+        self._redraw_pending = False
+        canvas = self.canvas
+        canvas.delete("all")
+        if not self.rows:
+            return
+
+        width = self._plot_width()
+        height = max(60, canvas.winfo_height())
+        lane_height = (height - LANE_GAP * (len(LANES) + 1)) / len(LANES)
+        start, end = self.view
+        visible = end - start
+
+        def to_x(row):
+            return MARGIN_LEFT + (row - start) / max(1, visible - 1) * width
+
+        # Decimated points per channel.
+        series = {}
+        for _, channels in LANES:
+            for channel, _ in channels:
+                series[channel] = self._decimate(channel, start, end, width)
+
+        for lane, (title, channels) in enumerate(LANES):
+            top = LANE_GAP + lane * (lane_height + LANE_GAP)
+            bottom = top + lane_height
+            low = min(min(series[c][1]) for c, _ in channels)
+            high = max(max(series[c][1]) for c, _ in channels)
+            if high == low:
+                high = low + 1
+
+            def to_y(value):
+                return bottom - (value - low) / (high - low) * lane_height
+
+            canvas.create_rectangle(MARGIN_LEFT, top, MARGIN_LEFT + width, bottom, outline="#cccccc")
+            canvas.create_text(MARGIN_LEFT + 4, top + 2, text=title, anchor="nw", fill="#555555")
+            canvas.create_text(MARGIN_LEFT - 4, top, text=f"{high:.0f}", anchor="ne", fill="#555555")
+            canvas.create_text(MARGIN_LEFT - 4, bottom, text=f"{low:.0f}", anchor="se", fill="#555555")
+
+            for channel, color in channels:
+                rows, values = series[channel]
+                coords = []
+                for row, value in zip(rows, values):
+                    coords.append(to_x(row))
+                    coords.append(to_y(value))
+                if len(coords) >= 4:
+                    canvas.create_line(*coords, fill=color)
+
+        # Event markers across all lanes.
+        for row, label in self._visible_events(start, end, width):
+            x = to_x(row)
+            canvas.create_line(x, LANE_GAP, x, height - LANE_GAP,
+                               fill=EVENT_COLORS.get(label, "#999999"), dash=(2, 2))
+
+        times = self.columns["time"]
+        self.info_label.config(text=(
+            f"{self.log_title}  {times[start]:.2f}s - {times[end - 1]:.2f}s  "
+            f"({visible} of {self.rows} samples)  "
+            "wheel: zoom, drag: pan, double click: reset"
+        ))
+
+    def _decimate(self, channel, start, end, width):
+        """Returns (rows, values) to draw for one channel."""
+        values = self.columns[channel]
+        visible = end - start
+        if visible <= 2 * width:
+            return list(range(start, end)), list(values[start:end])
+        if visible <= LTTB_MAX_SAMPLES:
+            return lttb(values, start, end, 2 * width)
+
+        pyramid = self.pyramids.get(channel)
+        if pyramid is None:
+            # Pyramid still being built: every n-th sample, about two per pixel.
+            step = -(-visible // (2 * width))
+            return list(range(start, end, step)), list(values[start:end:step])
+
+        # Per pixel min and max, drawn as a zig-zag so the envelope is filled.
+        centers, mins, maxs = pyramid.query(start, end, width)
+        rows, points = [], []
+        for center, low, high in zip(centers, mins, maxs):
+            rows.extend((center, center))
+            points.extend((low, high))
+        return rows, points
+
+    def _visible_events(self, start, end, width):
+        """Events inside the view, at most one per pixel column and label."""
+        first = bisect_left(self.events, (start, ""))
+        last = bisect_left(self.events, (end, ""))
+        seen = set()
+        visible = end - start
+        for row, label in self.events[first:last]:
+            pixel = int((row - start) / visible * width)
+            if (pixel, label) not in seen:
+                seen.add((pixel, label))
+                yield row, label
@@ -0,0 +1,101 @@
+"""
+Resampling of the log columns onto a fixed time base.
+
+VCDS logs are sampled at whatever rate the selected groups allow and the
+intervals are not even constant. The event checks in csv_handler count
+samples ("first/second sample of a run"), so they behave differently at 5 Hz
+than at 20 Hz. Resampling every channel onto t0, t0 + step, t0 + 2*step, ...
+by linear interpolation makes those checks run on consistent time steps.
+
+Resampler works chunk by chunk: it only keeps the last input row of the
+previous chunk, so long logs never need a second full copy in memory.
+"""
+
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, compress
+from operator import gt
+
+
+class Resampler:
+    def __init__(self, step, time_column="time"):
+        if step <= 0:
+            raise ValueError("Resample step must be positive.")
+        self.step = step
+        self.time_column = time_column
+        self._t0 = None        # time of the first grid point
+        self._next_k = 0       # index of the next grid point to emit
+        self._prev = None      # last input row of the previous chunk (name -> value)
+
+    def process(self, columns):
+        """
+        Returns the columns of one chunk resampled onto the time grid.
+        Rows whose time does not increase (logger hiccups) are dropped first.
+        """
+        times = columns[self.time_column]
+        names = list(columns)
+        out = {name: array("d") for name in names}
+        if not times:
+            return out
+
+        # Keep only rows with strictly increasing time (also across chunks).
+        last_time = self._prev[self.time_column] if self._prev is not None else float("-inf")
+        running_max = accumulate(times, max, initial=last_time)
+        mask = list(map(gt, times, running_max))
+        if not all(mask):
+            columns = {name: array("d", compress(values, mask)) for name, values in columns.items()}
+            times = columns[self.time_column]
+            if not times:
+                return out
+
+        # Segment end points: the carried-over row followed by this chunk.
+        if self._prev is not None:
+            seg = {name: [self._prev[name]] + list(columns[name]) for name in names}
+        else:
+            seg = {name: list(columns[name]) for name in names}
+            self._t0 = times[0]
+        seg_times = seg[self.time_column]
+        self._prev = {name: values[-1] for name, values in seg.items()}
+
+        # Grid points inside [seg_times[0], seg_times[-1]].
+        last_k = int((seg_times[-1] - self._t0) / self.step + 1e-9)
+        if last_k < self._next_k:
+            return out
+        grid = [self._t0 + k * self.step for k in range(self._next_k, last_k + 1)]
+        self._next_k = last_k + 1
+
+        # For every grid point the index of the segment it falls into and
+        # the fraction along that segment.
+        last_segment = len(seg_times) - 2
+        index = []
+        frac = []
+        j = 0
+        for g in grid:
+            j = min(max(bisect_right(seg_times, g, j) - 1, 0), max(last_segment, 0))
+            t_lo = seg_times[j]
+            span = seg_times[j + 1] - t_lo if last_segment >= 0 else 0
+            index.append(j)
+            frac.append((g - t_lo) / span if span else 0.0)
+
+        for name in names:
+            if name == self.time_column:
+                out[name].extend(grid)
+                continue
+            values = seg[name]
+            if last_segment < 0:
+                out[name].extend(values[0] for _ in grid)
+                continue
+            out[name].extend(
+                values[j] + f * (values[j + 1] - values[j])
+                for j, f in zip(index, frac)
+            )
+        return out
+
+
+def resample_chunks(chunks, step):
+    """Generator resampling a stream of column chunks (see Resampler)."""
+    resampler = Resampler(step)
+    for columns in chunks:
+        resampled = resampler.process(columns)
+        if resampled[resampler.time_column]:
+            yield resampled
@@ -0,0 +1,106 @@
+"""
+Window listing the map revisions (see revisions.py).
+
+Double-click (or "Show") switches the main table to a revision; revisions not
+made from the one listed above them say which one they come from. Selecting two
+revisions and pressing "Diff" shows the second one colored by its change
+against the first. The history can be saved to and loaded from a file.
+"""
+
+import os
+import time
+import tkinter as tk
+from tkinter import filedialog
+
+
+class RevisionWindow(tk.Toplevel):
+    def __init__(self, parent, store, on_show, on_diff, on_load):
+        """
+        :param store: the RevisionStore to display.
+        :param on_show: callback(number) to show a revision.
+        :param on_diff: callback(a, b) to show the difference of revision b against a.
+        :param on_load: callback(store) when a saved history was loaded.
+        """
+        super().__init__(parent)
+        self.title("Map revisions")
+        self.geometry("700x400")
+        self.store = store
+        self.on_show = on_show
+        self.on_diff = on_diff
+        self.on_load = on_load
+
+        top = tk.Frame(self)
+        top.pack(fill=tk.X)
+        self.summary_label = tk.Label(top, anchor="w")
+        self.summary_label.pack(side=tk.LEFT, padx=5)
+        tk.Button(top, text="Diff", command=self.diff_selected).pack(side=tk.RIGHT)
+        tk.Button(top, text="Show", command=self.show_selected).pack(side=tk.RIGHT)
+        tk.Button(top, text="Load", command=self.load).pack(side=tk.RIGHT)
+        tk.Button(top, text="Save", command=self.save).pack(side=tk.RIGHT)
+
+        self.listbox = tk.Listbox(self, font=("courier", "9", "normal"), selectmode=tk.EXTENDED)
+        self.listbox.pack(fill=tk.BOTH, expand=True)
+        self.listbox.bind("<Double-Button-1>", lambda e: self.show_selected())
+
+        self.refresh()
+
+    def refresh(self):
+        """Re-lists the revisions (after one was added, or the current one changed)."""
+        self.listbox.delete(0, tk.END)
+        for number in range(len(self.store)):
+            meta = self.store.meta(number)
+            parent = self.store.revisions[number].parent
+            details = []
+            if parent is not None and parent != number - 1:
+                details.append(f"from {parent}")
+            if "th1" in meta:
+                details.append(f"th {meta['th1']:g}/{meta['th2']:g}")
+            if "gain" in meta:
+                details.append(f"gain {meta['gain']:g}")
+            if meta.get("column_fix"):
+                details.append("column fix")
+            if meta.get("logs"):
+                names = ", ".join(os.path.basename(p) for p in meta["logs"][:3])
+                more = len(meta["logs"]) - 3
+                details.append(f"logs {names}" + (f" +{more}" if more > 0 else ""))
+            marker = ">" if number == self.store.current else " "
+            self.listbox.insert(tk.END, (
+                f"{marker}{number:>4} {time.strftime('%H:%M:%S', time.localtime(meta['time']))} "
+                f"{meta['kind']:<9} {'  '.join(details)}"
+            ))
+        self.summary_label.config(
+            text=f"{len(self.store)} revisions, {self.store.size() / 1024:.1f} kB"
+        )
+
+    def show_selected(self):
+        selection = self.listbox.curselection()
+        if selection:
+            self.on_show(selection[0])
+            self.refresh()
+
+    def diff_selected(self):
+        selection = self.listbox.curselection()
+        if len(selection) < 2:
+            print("Select two revisions to compare.")
+            return
+        self.on_diff(selection[0], selection[-1])
+
+    def save(self):
+        path = filedialog.asksaveasfilename(defaultextension=".json",
+                                            filetypes=[("Revision history", "*.json")])
+        if path:
+            self.store.save(path)
+            print(f"Saved {len(self.store)} revisions to {path}.")
+
+    def load(self):
+        path = filedialog.askopenfilename(filetypes=[("Revision history", "*.json")])
+        if not path:
+            return
+        try:
+            store = type(self.store).load(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Cannot load revisions: {e}")
+            return
+        self.store = store
+        self.on_load(store)
+        self.refresh()
@@ -0,0 +1,244 @@
+"""
+Revision history of the map: every pasted map, analysis result, fixed and
+auto-tuned map is kept, with undo/redo and switching to or diffing any two
+revisions.
+
+The history is a tree: every revision records the one it was made from
+(its parent). Undo goes to the parent, redo to the most recent revision
+made from the current one, so after an undo and a new change the abandoned
+branch is kept (and can still be shown) but undo/redo never wander into it.
+
+Revisions are stored compactly:
+  - values are stored as hundredths (the maps are shown with two decimals),
+    as 16 bit integers where they fit,
+  - a revision only stores the cells that differ from its parent (cell
+    numbers plus values),
+  - a revision that changes more than KEYFRAME_FRACTION of the cells, or
+    whose parent is already MAX_DELTA_CHAIN deltas away from a full copy,
+    becomes a base (a full copy of the map).
+So a map is rebuilt from one base and at most MAX_DELTA_CHAIN deltas, and
+hundreds of revisions take a few kilobytes to some tens of kilobytes,
+depending on how many cells each one changes.
+"""
+
+import base64
+import json
+import time
+import zlib
+from array import array
+
+KEYFRAME_FRACTION = 0.5
+MAX_DELTA_CHAIN = 16
+
+
+def _encode_values(hundredths):
+    """array('h') of the hundredths if they all fit 16 bits, else array('i')."""
+    if all(-32768 <= h <= 32767 for h in hundredths):
+        return array("h", hundredths)
+    return array("i", hundredths)
+
+
+class Revision:
+    def __init__(self, number, base, cells, values, meta, parent=None):
+        """
+        :param base: number of the revision the cells are stored against
+                     (the parent, or itself for a base).
+        :param parent: number of the revision this one was made from (None for the first).
+        :param cells: array of the cell numbers stored (empty for a base, which stores all cells).
+        :param values: the values of those cells in hundredths (see _encode_values).
+        """
+        self.number = number
+        self.base = base
+        self.cells = cells
+        self.values = values
+        self.meta = meta
+        self.parent = parent
+        self.depth = 0      # deltas between this revision and its base copy
+
+    def size(self):
+        return (self.cells.itemsize * len(self.cells)
+                + self.values.itemsize * len(self.values))
+
+
+class RevisionStore:
+    def __init__(self, row_count, col_count):
+        self.row_count = row_count
+        self.col_count = col_count
+        self.revisions = []
+        self.current = -1       # number of the revision shown, -1 if none
+        self.paths = []         # log paths referenced by the revisions' metadata
+
+    def __len__(self):
+        return len(self.revisions)
+
+    # -----------------------
+    # Adding revisions
+    # -----------------------
+    def add(self, values, kind, amend=False, logs=None, **meta):
+        """
+        Stores a map (2D list) as a new revision and makes it the current one.
+        'kind' says where it came from ("original", "updated", "fixed", "tuned");
+        'logs' are the log paths it is based on, further keyword arguments
+        (thresholds, options, ...) are kept as metadata.
+        The new revision's parent is the current one.
+        With amend=True the current revision is replaced instead if it is the
+        latest one and of the same kind (e.g. an analysis that is still growing).
+        Revisions after an undo are kept as a branch of their own.
+        Returns the revision number.
+        """
+        flat = [round(float(v) * 100) for row in values for v in row]
+        meta = dict(meta, kind=kind, time=time.time())
+        if logs is not None:
+            meta["logs"] = [self._path_index(p) for p in logs]
+
+        parent = self.current if self.current >= 0 else None
+        if (amend and self.revisions and self.current == len(self.revisions) - 1
+                and self.revisions[-1].meta["kind"] == kind):
+            parent = self.revisions.pop().parent
+        elif self.current >= 0 and self._flat(self.current) == flat and self.revisions[self.current].meta["kind"] == kind:
+            return self.current  # Nothing changed.
+
+        number = len(self.revisions)
+        cells = None
+        if parent is not None and self.revisions[parent].depth < MAX_DELTA_CHAIN:
+            parent_values = self._flat(parent)
+            cells = [i for i, (a, b) in enumerate(zip(parent_values, flat)) if a != b]
+        if cells is None or len(cells) > KEYFRAME_FRACTION * len(flat):
+            revision = Revision(number, number, array("B"), _encode_values(flat), meta, parent)
+        else:
+            cell_type = "B" if len(flat) <= 256 else "H"
+            revision = Revision(number, parent, array(cell_type, cells),
+                                _encode_values([flat[i] for i in cells]), meta, parent)
+            revision.depth = self.revisions[parent].depth + 1
+        self.revisions.append(revision)
+        self.current = number
+        return number
+
+    def _path_index(self, path):
+        try:
+            return self.paths.index(path)
+        except ValueError:
+            self.paths.append(path)
+            return len(self.paths) - 1
+
+    # -----------------------
+    # Reading revisions
+    # -----------------------
+    def _flat(self, number):
+        """The values of a revision in hundredths, rebuilt from its base copy and the deltas since."""
+        chain = []
+        revision = self.revisions[number]
+        while revision.base != revision.number:
+            chain.append(revision)
+            revision = self.revisions[revision.base]
+        flat = list(revision.values)
+        for revision in reversed(chain):
+            for cell, value in zip(revision.cells, revision.values):
+                flat[cell] = value
+        return flat
+
+    def map(self, number):
+        """The map of a revision as a 2D list."""
+        flat = [h / 100 for h in self._flat(number)]
+        return [flat[i * self.col_count:(i + 1) * self.col_count] for i in range(self.row_count)]
+
+    def meta(self, number):
+        """Metadata of a revision, with the log paths resolved."""
+        meta = dict(self.revisions[number].meta)
+        if "logs" in meta:
+            meta["logs"] = [self.paths[i] for i in meta["logs"]]
+        return meta
+
+    def diff(self, a, b):
+        """Cells that differ between revisions a and b: {(row, col): (value in a, value in b)}."""
+        flat_a = self._flat(a)
+        flat_b = self._flat(b)
+        return {
+            divmod(i, self.col_count): (va / 100, vb / 100)
+            for i, (va, vb) in enumerate(zip(flat_a, flat_b)) if va != vb
+        }
+
+    def size(self):
+        """Bytes used by the stored map values."""
+        return sum(revision.size() for revision in self.revisions)
+
+    # -----------------------
+    # Navigation
+    # -----------------------
+    def checkout(self, number):
+        """Makes a revision the current one and returns its map."""
+        if not 0 <= number < len(self.revisions):
+            raise IndexError(f"No revision {number}.")
+        self.current = number
+        return self.map(number)
+
+    def undo(self):
+        """Steps back to the parent revision; returns its number, or None at the start."""
+        if self.current < 0 or self.revisions[self.current].parent is None:
+            return None
+        self.current = self.revisions[self.current].parent
+        return self.current
+
+    def redo(self):
+        """
+        Steps forward to the most recent revision made from the current one;
+        returns its number, or None if there is none.
+        """
+        if self.current < 0:
+            return None
+        children = [r.number for r in self.revisions[self.current + 1:] if r.parent == self.current]
+        if not children:
+            return None
+        self.current = children[-1]
+        return self.current
+
+    # -----------------------
+    # Saving
+    # -----------------------
+    def to_dict(self):
+        """JSON serializable form; the arrays of all revisions are stored as one zlib compressed blob."""
+        blob = b"".join(r.cells.tobytes() + r.values.tobytes() for r in self.revisions)
+        return {
+            "rows": self.row_count,
+            "cols": self.col_count,
+            "current": self.current,
+            "paths": self.paths,
+            "revisions": [
+                [r.base, r.cells.typecode, len(r.cells), r.values.typecode, len(r.values), r.meta, r.parent]
+                for r in self.revisions
+            ],
+            "data": base64.b64encode(zlib.compress(blob, 9)).decode("ascii")
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        blob = zlib.decompress(base64.b64decode(data["data"]))
+        offset = 0
+
+        def take(typecode, count):
+            nonlocal offset
+            values = array(typecode)
+            size = values.itemsize * count
+            values.frombytes(blob[offset:offset + size])
+            offset += size
+            return values
+
+        store = cls(data["rows"], data["cols"])
+        store.paths = data["paths"]
+        for number, (base, cell_type, cell_count, value_type, value_count, meta, parent) in enumerate(data["revisions"]):
+            cells = take(cell_type, cell_count)
+            revision = Revision(number, base, cells, take(value_type, value_count), meta, parent)
+            if base != number:
+                revision.depth = store.revisions[base].depth + 1
+            store.revisions.append(revision)
+        store.current = data["current"]
+        return store
+
+    def save(self, path):
+        with open(path, mode="w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, mode="r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
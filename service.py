@@ -0,0 +1,335 @@
+"""
+Local analysis service, so several tuners on one workstation share the
+parsing work instead of each GUI parsing the same logs again.
+
+  POST /jobs        {"logs": [paths], "th1": 100, "th2": 200, "options": {...},
+                     "map": "<VAGEDCSuite clipboard text>", "column_fix": false,
+                     "aggregation": "mean"}
+                    -> the job (id and status)
+  GET  /jobs/<id>   -> the job; once "done" with its result: the per-log grids,
+                       the averaged correction table and, if a map was sent,
+                       the updated and fixed map
+  GET  /health
+
+Jobs run on a bounded thread pool; their logs are parsed in a shared process
+pool through the parse cache (see log_cache.py). Identical requests (same
+logs, unchanged on disk, same settings) map to the same job, and a log
+that several jobs need with the same settings at the same time is parsed
+only once. Finished jobs expire after SERVICE_JOB_TTL seconds, or earlier
+once more than SERVICE_MAX_JOBS are kept.
+
+Listens on TCP (localhost by default) or on a Unix socket.
+"""
+
+import hashlib
+import http.client
+import json
+import os
+import socket
+import stat
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from urllib.parse import urlparse
+
+from config import (
+    DEFAULT_THRESHOLD1,
+    DEFAULT_THRESHOLD2,
+    AGGREGATION_MODES,
+    SERVICE_HOST,
+    SERVICE_PORT,
+    SERVICE_JOB_WORKERS,
+    SERVICE_PARSE_WORKERS,
+    SERVICE_JOB_TTL,
+    SERVICE_MAX_JOBS
+)
+from accumulator import CorrectionAccumulator
+from logset import LogSet, parse_log_totals
+from log_cache import cache_key
+from maps import parse_vagedcsuite, format_vagedcsuite, map_values, updated_map, fix_map
+
+
+class AnalysisService:
+    def __init__(self, parse_workers=SERVICE_PARSE_WORKERS, job_workers=SERVICE_JOB_WORKERS):
+        self.parse_pool = ProcessPoolExecutor(max_workers=parse_workers)
+        self.job_pool = ThreadPoolExecutor(max_workers=job_workers)
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()   # job id -> job dictionary, least recently requested first
+        self.parses = {}            # (cache key, th1, th2) -> Future of a CorrectionAccumulator (while running)
+
+    def shutdown(self):
+        self.job_pool.shutdown(wait=False, cancel_futures=True)
+        self.parse_pool.shutdown(wait=False, cancel_futures=True)
+
+    # -----------------------
+    # Jobs
+    # -----------------------
+    def submit(self, request):
+        """
+        Queues a job for the request (or returns the existing job for an
+        identical request). Raises ValueError for an invalid request.
+        """
+        logs = request.get("logs")
+        if not logs or not isinstance(logs, list):
+            raise ValueError("'logs' must be a non-empty list of file paths.")
+        th1 = float(request.get("th1", DEFAULT_THRESHOLD1))
+        th2 = float(request.get("th2", DEFAULT_THRESHOLD2))
+        options = request.get("options") or {}
+        map_string = request.get("map")
+        if map_string is not None and parse_vagedcsuite(map_string) is None:
+            raise ValueError("'map' is not VAGEDCSuite clipboard data.")
+        aggregation = request.get("aggregation", "mean")
+        if aggregation not in AGGREGATION_MODES:
+            raise ValueError(f"'aggregation' must be one of {', '.join(AGGREGATION_MODES)}.")
+        try:
+            # The cache keys change whenever a log changes on disk.
+            keys = [cache_key(path, options) for path in logs]
+        except OSError as e:
+            raise ValueError(f"Cannot read log: {e}")
+
+        job_id = hashlib.sha1(json.dumps(
+            [keys, th1, th2, options, map_string, bool(request.get("column_fix")), aggregation],
+            sort_keys=True
+        ).encode("utf-8")).hexdigest()[:16]
+        with self.lock:
+            self._evict_jobs()
+            job = self.jobs.get(job_id)
+            if job is not None and job["status"] != "failed":
+                self.jobs.move_to_end(job_id)
+                return dict(job)
+            job = {"id": job_id, "status": "queued", "submitted": time.time()}
+            self.jobs[job_id] = job
+            self.jobs.move_to_end(job_id)
+        self.job_pool.submit(self._run, job, logs, keys, th1, th2, options, map_string,
+                             bool(request.get("column_fix")), aggregation)
+        return dict(job)
+
+    def job(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            self.jobs.move_to_end(job_id)
+            return dict(job)
+
+    def _evict_jobs(self):
+        """
+        Drops finished jobs older than SERVICE_JOB_TTL and, beyond SERVICE_MAX_JOBS,
+        the least recently requested finished ones. Called with the lock held.
+        """
+        now = time.time()
+        excess = len(self.jobs) - SERVICE_MAX_JOBS
+        for job_id, job in list(self.jobs.items()):
+            if job["status"] not in ("done", "failed"):
+                continue
+            if excess > 0 or now - job["finished"] > SERVICE_JOB_TTL:
+                del self.jobs[job_id]
+                excess -= 1
+
+    def _parse(self, path, key, th1, th2, options):
+        """Future of a log's accumulator, shared by all jobs needing the same parse."""
+        parse_key = (key, th1, th2)
+        with self.lock:
+            future = self.parses.get(parse_key)
+            if future is not None and not (future.done() and future.exception() is not None):
+                return future
+            future = self.parse_pool.submit(parse_log_totals, path, th1, th2, False, options)
+            self.parses[parse_key] = future
+        # Once parsed, the log is in the parse cache; later jobs read it from there.
+        future.add_done_callback(lambda done: self._forget_parse(parse_key, done))
+        return future
+
+    def _forget_parse(self, parse_key, future):
+        with self.lock:
+            if self.parses.get(parse_key) is future:
+                del self.parses[parse_key]
+
+    def _update(self, job, **fields):
+        with self.lock:
+            job.update(fields)
+
+    def _run(self, job, logs, keys, th1, th2, options, map_string, column_fix, aggregation):
+        self._update(job, status="running")
+        try:
+            futures = [self._parse(path, key, th1, th2, options) for path, key in zip(logs, keys)]
+            log_set = LogSet()
+            log_set.set_mode(aggregation)
+            for path, future in zip(logs, futures):
+                log_set.add(path, future.result())
+            table = log_set.averaged()
+            result = {
+                "logs": {path: log_set.logs[path].to_dict() for path in log_set.paths()},
+                "correction": {f"{r}|{c}": value for (r, c), value in table.items()},
+                "deviation": {path: log_set.deviation(path, table)[1] for path in log_set.paths()}
+            }
+            if map_string is not None:
+                original = map_values(parse_vagedcsuite(map_string))
+                updated = updated_map(original, table)
+                rounded, fixed = fix_map(updated, column_fix)
+                result.update(updated=updated, rounded=rounded, fixed=fixed,
+                              fixed_map=format_vagedcsuite(fixed))
+            self._update(job, status="done", result=result, finished=time.time())
+        except Exception as e:
+            # Reported to the client; the next identical request runs again.
+            self._update(job, status="failed", error=str(e), finished=time.time())
+        with self.lock:
+            self._evict_jobs()
+
+
+# -----------------------
+# HTTP front end
+# -----------------------
+class ServiceHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/health":
+            self._send(200, {"status": "ok", "jobs": len(service.jobs)})
+        elif self.path.startswith("/jobs/"):
+            job = service.job(self.path[len("/jobs/"):])
+            if job is None:
+                self._send(404, {"error": "unknown job"})
+            else:
+                self._send(200, job)
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/jobs":
+            self._send(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length).decode("utf-8"))
+            job = self.server.service.submit(request)
+        except (ValueError, TypeError, AttributeError) as e:
+            self._send(400, {"error": str(e)})
+            return
+        self._send(202, job)
+
+    def _send(self, code, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        # Unix socket clients have no address; the request log wants one.
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+
+def make_server(service, host=SERVICE_HOST, port=SERVICE_PORT, socket_path=None):
+    """
+    HTTP server for 'service', on a Unix socket if socket_path is given, else on host:port.
+    A socket left over at socket_path is replaced; any other file there is an error.
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                raise FileExistsError(f"{socket_path} exists and is not a socket.")
+            os.remove(socket_path)
+        server = ThreadingUnixHTTPServer(socket_path, ServiceHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ServiceHandler)
+        server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def serve(host=SERVICE_HOST, port=SERVICE_PORT, socket_path=None,
+          parse_workers=SERVICE_PARSE_WORKERS, job_workers=SERVICE_JOB_WORKERS):
+    """Runs the service until interrupted."""
+    service = AnalysisService(parse_workers, job_workers)
+    try:
+        server = make_server(service, host, port, socket_path)
+    except OSError:
+        service.shutdown()
+        raise
+    where = socket_path or f"http://{host}:{server.server_address[1]}"
+    print(f"Analysis service listening on {where}. Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping service.")
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+# -----------------------
+# Client
+# -----------------------
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ServiceClient:
+    def __init__(self, url, timeout=30):
+        """:param url: "http://host:port" or "unix:///path/to/socket"."""
+        self.url = urlparse(url)
+        self.timeout = timeout
+
+    def _connection(self):
+        if self.url.scheme == "unix":
+            return _UnixHTTPConnection(self.url.path, self.timeout)
+        return http.client.HTTPConnection(self.url.hostname, self.url.port or 80, timeout=self.timeout)
+
+    def _request(self, method, path, data=None):
+        connection = self._connection()
+        try:
+            body = json.dumps(data).encode("utf-8") if data is not None else None
+            headers = {"Content-Type": "application/json"} if body is not None else {}
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            result = json.loads(response.read().decode("utf-8"))
+        finally:
+            connection.close()
+        if response.status >= 400:
+            raise ValueError(result.get("error", f"HTTP {response.status}"))
+        return result
+
+    def health(self):
+        return self._request("GET", "/health")
+
+    def submit(self, logs, th1, th2, options=None, map_string=None, column_fix=False,
+               aggregation="mean"):
+        request = {"logs": [os.path.abspath(p) for p in logs], "th1": th1, "th2": th2,
+                   "options": options or {}, "column_fix": column_fix, "aggregation": aggregation}
+        if map_string is not None:
+            request["map"] = map_string
+        return self._request("POST", "/jobs", request)
+
+    def job(self, job_id):
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def wait(self, job_id, poll_interval=0.2, timeout=None):
+        """Polls until the job is done or failed; returns the job."""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            job = self.job(job_id)
+            if job["status"] in ("done", "failed"):
+                return job
+            if deadline is not None and time.time() > deadline:
+                return job
+            time.sleep(poll_interval)
+
+
+def accumulators_from_result(result):
+    """The per-log grids of a finished job as [(path, CorrectionAccumulator)]."""
+    return [(path, CorrectionAccumulator.from_dict(data)) for path, data in result["logs"].items()]
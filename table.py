@@ -4,64 +4,87 @@ Manages the table layout and per-cell coloring logic.
 
 import tkinter as tk
 from config import ROW_HEADERS, COL_HEADERS
+from maps import parse_percent, format_percent, fix_map
 
 # -----------------------
-# Tooltip helper class
+# Cell inspector
 # -----------------------
-class ToolTip:
+class CellInspector:
     """
-    A simple tooltip for a widget.
+    One tooltip window shared by all cells of a table. It is created on the
+    first hover and afterwards only moved, refilled and hidden. The text comes
+    from describe(r, c) and is only built when the pointer enters another cell.
     """
-    def __init__(self, widget, text='tooltip text'):
+    def __init__(self, widget, describe):
         self.widget = widget
-        self.text = text
+        self.describe = describe
         self.tipwindow = None
-        self.widget.bind("<Enter>", self.enter)
-        self.widget.bind("<Leave>", self.leave)
+        self.label = None
+        self.cell = None  # (r, c) shown, None while hidden
 
-    def enter(self, event=None):
-        self.showtip()
+    def show(self, cell, x, y):
+        if cell != self.cell:
+            text = self.describe(*cell)
+            if not text:
+                self.hide()
+                return
+            if self.tipwindow is None:
+                self.tipwindow = tk.Toplevel(self.widget)
+                self.tipwindow.wm_overrideredirect(1)
+                self.label = tk.Label(self.tipwindow, justify=tk.LEFT,
+                                      background="#ffffe0", relief=tk.SOLID, borderwidth=1,
+                                      font=("tahoma", "8", "normal"))
+                self.label.pack(ipadx=1)
+            self.label.config(text=text)
+            if self.cell is None:
+                self.tipwindow.deiconify()
+            self.cell = cell
+        self.tipwindow.wm_geometry(f"+{x + 20}+{y + 20}")
 
-    def leave(self, event=None):
-        self.hidetip()
+    def refresh(self):
+        """Rebuilds the text of the cell shown, e.g. after more details became available."""
+        if self.cell is not None:
+            text = self.describe(*self.cell)
+            if text:
+                self.label.config(text=text)
 
-    def showtip(self):
-        if self.tipwindow or not self.text:
-            return
-        x, y, _, _ = self.widget.bbox("insert") if self.widget.bbox("insert") else (0, 0, 0, 0)
-        x = x + self.widget.winfo_rootx() + 20
-        y = y + self.widget.winfo_rooty() + 20
-        self.tipwindow = tw = tk.Toplevel(self.widget)
-        tw.wm_overrideredirect(1)
-        tw.wm_geometry(f"+{x}+{y}")
-        label = tk.Label(tw, text=self.text, justify=tk.LEFT,
-                         background="#ffffe0", relief=tk.SOLID, borderwidth=1,
-                         font=("tahoma", "8", "normal"))
-        label.pack(ipadx=1)
-
-    def hidetip(self):
-        if self.tipwindow:
-            self.tipwindow.destroy()
-        self.tipwindow = None
-
-    def update_text(self, text):
-        self.text = text
+    def hide(self):
+        if self.tipwindow is not None and self.cell is not None:
+            self.tipwindow.withdraw()
+        self.cell = None
 
 # -----------------------
 # DataTable class
 # -----------------------
 class DataTable:
-    def __init__(self, parent):
+    # Bind tag shared by the data cells, so one pair of handlers serves the whole grid.
+    CELL_TAG = "N75Cell"
+
+    def __init__(self, parent, cell_details=None):
         """
         :param parent: A parent widget (Frame) where the table should live.
+        :param cell_details: optional callback(row_header, col_header) returning
+                             further lines for the cell inspector (samples, events).
         """
         self.parent = parent
         self.row_headers = ROW_HEADERS
         self.col_headers = COL_HEADERS
+        self.cell_details = cell_details
 
         self.cell_labels = []  # 2D list of tk.Label references
+        self.cell_positions = {}  # tk.Label -> (r, c)
+        # The values behind the shown cells (2D lists, None where a stage was not computed):
+        # pasted -> updated by the logs -> rounded -> fixed.
+        self.old_values = None
+        self.new_values = None
+        self.rounded_values = None
+        self.fixed_values = None
+
         self.table_frame = tk.Frame(self.parent)
         self.table_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.inspector = CellInspector(self.table_frame, self.describe_cell)
+        self.table_frame.bind_class(self.CELL_TAG, "<Motion>", self.cell_motion)
+        self.table_frame.bind_class(self.CELL_TAG, "<Leave>", self.cell_left)
 
         self.build_table()
 
@@ -80,6 +103,7 @@ class DataTable:
 
         # -- Row Headers + Data Cells --
         self.cell_labels.clear()
+        self.cell_positions.clear()
         for r, row_text in enumerate(self.row_headers):
             row_label = tk.Label(
                 self.table_frame, text=row_text,
@@ -94,7 +118,9 @@ class DataTable:
                     width=10, bd=1, relief="solid", anchor="center"
                 )
                 cell.grid(row=r+1, column=c+1, sticky="nsew")
+                cell.bindtags((self.CELL_TAG,) + cell.bindtags())
                 row_cells.append(cell)
+                self.cell_positions[cell] = (r, c)
             self.cell_labels.append(row_cells)
 
         self.table_frame.grid_rowconfigure(0, weight=0)
@@ -104,25 +130,59 @@ class DataTable:
         for c in range(1, 1 + len(self.col_headers)):
             self.table_frame.grid_columnconfigure(c, weight=1)
 
+    # -----------------------
+    # Cell inspector
+    # -----------------------
+    def cell_motion(self, event):
+        cell = self.cell_positions.get(event.widget)
+        if cell is not None:
+            self.inspector.show(cell, event.x_root, event.y_root)
+
+    def cell_left(self, event):
+        # Moving straight onto the next cell keeps the window up.
+        if event.widget.winfo_containing(event.x_root, event.y_root) not in self.cell_positions:
+            self.inspector.hide()
+
+    def set_values(self, old=None, new=None, rounded=None, fixed=None):
+        """Stores the values behind the shown cells; the inspector shows them on the next hover."""
+        self.old_values = old
+        self.new_values = new
+        self.rounded_values = rounded
+        self.fixed_values = fixed
+        self.inspector.hide()
+
+    def describe_cell(self, r, c):
+        """Inspector text of one cell: its value stages, then the lines from cell_details."""
+        row_header = self.row_headers[r]
+        col_header = self.col_headers[c]
+        lines = [f"{row_header} RPM / {col_header}"]
+        stages = [(name, values[r][c]) for name, values in (
+            ("original", self.old_values), ("updated", self.new_values),
+            ("rounded", self.rounded_values), ("fixed", self.fixed_values)
+        ) if values is not None]
+        if stages:
+            lines.append(" -> ".join(name for name, _ in stages))
+            lines.append(" -> ".join(format_percent(value) for _, value in stages))
+        else:
+            text = self.cell_labels[r][c].cget("text")
+            if not text:
+                return ""
+            lines.append(text)
+        if self.cell_details is not None:
+            lines.extend(self.cell_details(row_header, col_header))
+        return "\n".join(lines)
+
     def update_table(self, data_matrix):
         """
         Update each cell with the corresponding string.
         Applies the default color scheme (if the text ends with '%', a linear mapping from 20 to 80 is used).
         """
+        self.set_values()
         for r in range(len(self.row_headers)):
             for c in range(len(self.col_headers)):
                 cell_text = data_matrix[r][c]
                 lbl = self.cell_labels[r][c]
                 lbl.config(text=cell_text)
-                # Remove any previous tooltip.
-                if hasattr(lbl, "tooltip"):
-                    lbl.tooltip.hidetip()
-                    del lbl.tooltip
-                # Clear any stored attributes.
-                if hasattr(lbl, "old_value"):
-                    del lbl.old_value
-                if hasattr(lbl, "new_value"):
-                    del lbl.new_value
 
                 if cell_text.endswith("%"):
                     try:
@@ -175,45 +235,31 @@ class DataTable:
 
     def update_table_with_sum(self, pasted_data, csv_table, use_csv_color=False):
         """
-        For each cell, parses the original (pasted) value and adds the CSV value,
-        updates the cell text to show the updated value, and attaches a tooltip showing
-        "old value -> new value". Also stores the parsed old and new values in the label.
+        For each cell, parses the original (pasted) value and adds the CSV value
+        and updates the cell text to show the updated value. The parsed old and
+        new values are kept for fix_table and the cell inspector.
         If use_csv_color is False, the default color mapping is applied.
         If True, the CSV color mapping (via update_colors_from_csv) is used.
         """
         num_rows = len(pasted_data)
         num_cols = len(self.col_headers)
+        old_values = [[0 for _ in range(num_cols)] for _ in range(num_rows)]
+        new_values = [[0 for _ in range(num_cols)] for _ in range(num_rows)]
         for i in range(num_rows):
             for j in range(num_cols):
-                old_text = pasted_data[i][j]
                 lbl = self.cell_labels[i][j]
                 # Parse the old value.
-                if old_text.endswith("%"):
-                    try:
-                        old_value = float(old_text[:-1].replace(",", "."))
-                    except ValueError:
-                        old_value = 0
-                else:
-                    try:
-                        old_value = float(old_text.replace(",", "."))
-                    except ValueError:
-                        old_value = 0
+                old_value = parse_percent(pasted_data[i][j])
                 # Lookup the CSV value.
                 row_header = self.row_headers[i]
                 col_header = self.col_headers[j]
                 csv_value = csv_table.get((row_header, col_header), 0)
                 new_value = old_value + csv_value
-                # Store these values for later use.
-                lbl.old_value = old_value
-                lbl.new_value = new_value
-
-                new_text = f"{new_value:.2f}".replace(".", ",") + "%"
-                lbl.config(text=new_text)
-                tooltip_text = f"{old_text} -> {new_text}"
-                if hasattr(lbl, "tooltip"):
-                    lbl.tooltip.update_text(tooltip_text)
-                else:
-                    lbl.tooltip = ToolTip(lbl, tooltip_text)
+                old_values[i][j] = old_value
+                new_values[i][j] = new_value
+                lbl.config(text=format_percent(new_value))
+        # Store these values for later use.
+        self.set_values(old_values, new_values)
 
         # Now update colors.
         if not use_csv_color:
@@ -249,58 +295,19 @@ class DataTable:
           2. Then, if apply_column_fix is True, for each column (iterating from bottom to top),
              if the cell above is not at least 1 greater than the cell below, adjust it to be exactly 1 more.
              (This column-fixing is applied only to cells with values above 20; cells with value 20 or below are ignored.)
-        After fixing, each cell’s tooltip is updated to show:
+        The fixed values are displayed as XX,XX%; the cell inspector shows
           "old value -> new value -> new value rounded -> fixed value"
-        The fixed values are displayed as XX,XX%.
         """
-        num_rows = len(self.row_headers)
-        num_cols = len(self.col_headers)
-        # Create matrices for the rounded and fixed values.
-        rounded = [[0 for _ in range(num_cols)] for _ in range(num_rows)]
-        fixed = [[0 for _ in range(num_cols)] for _ in range(num_rows)]
-
-        # First, for each cell, get the updated value (from lbl.new_value) and round it.
-        for i in range(num_rows):
-            for j in range(num_cols):
-                lbl = self.cell_labels[i][j]
-                if hasattr(lbl, "new_value"):
-                    new_val = lbl.new_value
-                else:
-                    try:
-                        text = lbl.cget("text")
-                        new_val = float(text.replace(",", ".").rstrip("%"))
-                    except:
-                        new_val = 0
-                rounded[i][j] = round(new_val)
-                fixed[i][j] = rounded[i][j]
+        # First, get the updated values (as stored by update_table_with_sum, else from the cell texts).
+        updated = self.new_values
+        if updated is None:
+            updated = [[parse_percent(lbl.cget("text")) for lbl in row] for row in self.cell_labels]
 
-        # Then, if column adjustment is enabled, for each column, from bottom to top,
-        # adjust only cells with values above 20.
-        if apply_column_fix:
-            for j in range(num_cols):
-                for i in range(num_rows - 1, 0, -1):
-                    if fixed[i][j] > 20 and fixed[i-1][j] > 20:
-                        if fixed[i-1][j] < fixed[i][j] + 1:
-                            fixed[i-1][j] = fixed[i][j] + 1
-        # Otherwise, fixed remains equal to rounded.
+        # Then round it and, if column adjustment is enabled, fix the columns.
+        rounded, fixed = fix_map(updated, apply_column_fix)
 
-        # Update each cell's text and tooltip.
-        for i in range(num_rows):
-            for j in range(num_cols):
-                lbl = self.cell_labels[i][j]
-                old_val = lbl.old_value if hasattr(lbl, "old_value") else 0
-                new_val = lbl.new_value if hasattr(lbl, "new_value") else 0
-                new_rounded = rounded[i][j]
-                fixed_val = fixed[i][j]
-                # Format each value as XX,XX%
-                old_text = f"{old_val:.2f}".replace(".", ",") + "%"
-                new_text = f"{new_val:.2f}".replace(".", ",") + "%"
-                new_rounded_text = f"{new_rounded:.2f}".replace(".", ",") + "%"
-                fixed_text = f"{fixed_val:.2f}".replace(".", ",") + "%"
-                # Update the cell's text to the fixed value.
-                lbl.config(text=fixed_text)
-                tooltip_text = f"{old_text} -> {new_text} -> {new_rounded_text} -> {fixed_text}"
-                if hasattr(lbl, "tooltip"):
-                    lbl.tooltip.update_text(tooltip_text)
-                else:
-                    lbl.tooltip = ToolTip(lbl, tooltip_text)
+        # Update each cell's text to the fixed value (formatted as XX,XX%).
+        for i, row in enumerate(fixed):
+            for j, fixed_val in enumerate(row):
+                self.cell_labels[i][j].config(text=format_percent(fixed_val))
+        self.set_values(self.old_values, updated, rounded, fixed)
@@ -0,0 +1,16 @@
+"""Events at a non-finite engine speed or fuel quantity get no map cells."""
+
+import math
+
+from event_table import EventTable
+
+
+def test_non_finite_samples_have_no_cells():
+    table = EventTable()
+    table.append(0.0, math.nan, 10.0, 1.0, 0, "TH1")
+    table.append(0.1, 2000.0, math.inf, 1.0, 1, "TH2")
+    kept = table.append(0.2, 2000.0, 10.0, 1.0, 2, "UnderTH1")
+    assert len(table) == 3
+    assert table.event_cells(0) == table.event_cells(1) == []
+    assert {index for index, _, _ in table.shares()} == {kept}
+    assert math.isclose(sum(value for _, _, value in table.shares()), 1.0)
@@ -0,0 +1,37 @@
+"""Recency weighting stays right while logs are switched on and off."""
+
+import math
+
+from accumulator import CorrectionAccumulator
+from config import ROW_HEADERS, COL_HEADERS, RECENCY_HALF_LIFE_DAYS
+from logset import LogSet
+
+CELL = (ROW_HEADERS[0], COL_HEADERS[0])
+HALF_LIFE = RECENCY_HALF_LIFE_DAYS * 86400.0
+
+
+def log(value, timestamp):
+    acc = CorrectionAccumulator()
+    acc.sums[CELL] = value
+    acc.counts[CELL] = 1
+    acc.timestamp = timestamp
+    return acc
+
+
+def test_recency_weights_follow_the_newest_log():
+    logs = LogSet()
+    logs.add("old", log(4.0, 1.7e9))
+    logs.add("new", log(1.0, 1.7e9 + HALF_LIFE))
+    logs.add("untimed", log(2.0, None))
+    # Weights 0.5, 1 and 1 (untimed logs count fully).
+    assert math.isclose(logs.averaged("recency")[CELL], (0.5 * 4.0 + 1.0 + 2.0) / 2.5)
+
+    logs.set_enabled("new", False)
+    # "old" is the newest enabled log now.
+    assert math.isclose(logs.averaged("recency")[CELL], 3.0)
+    logs.set_enabled("untimed", False)
+    logs.set_enabled("old", False)
+    assert logs.averaged("recency")[CELL] == 0
+    logs.set_enabled("new", True)
+    logs.set_enabled("old", True)
+    assert math.isclose(logs.averaged("recency")[CELL], (0.5 * 4.0 + 1.0) / 1.5)
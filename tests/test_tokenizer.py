@@ -0,0 +1,72 @@
+"""
+Logs in the formats VCDS and other tools write: quoted fields, no header,
+semicolons with a decimal comma. Every data row must come through, also when
+an earlier log left a schema in the cache.
+"""
+
+import tokenizer
+from csv_handler import COLUMNS
+
+CHANNELS = [name for name, _ in COLUMNS]
+
+HEADER = (
+    ",TIME,Engine speed,Intake Pressure (specified),Intake Pressure (actual),x,"
+    "TIME,x,Inj. Qty (actual),x,Inj. Qty (requested)\n"
+)
+ROWS = [
+    (0.0, 1000, 1400.0, 1450.5, 10.0, 12.5),
+    (0.2, 1500, 1600.0, 1700.0, 20.0, 22.5),
+    (0.4, 2000, 1800.0, 1790.25, 30.0, 30.0),
+]
+
+
+def fields(row, decimal="."):
+    time, rpm, spec, act, iq_act, iq_req = row
+    values = ["", time, rpm, spec, act, 0, time, 0, iq_act, 0, iq_req]
+    return [str(value).replace(".", decimal) if value != "" else "" for value in values]
+
+
+def write(tmp_path, name, lines):
+    path = tmp_path / name
+    path.write_text("".join(lines), encoding="utf-8")
+    return str(path)
+
+
+def read(path):
+    columns = {name: [] for name in CHANNELS}
+    for chunk in tokenizer.iter_log_chunks(path, COLUMNS, 1000):
+        for name in CHANNELS:
+            columns[name].extend(chunk[name])
+    return columns
+
+
+def assert_rows(columns):
+    assert columns["time"] == [row[0] for row in ROWS]
+    assert columns["eng_speed"] == [row[1] for row in ROWS]
+    assert columns["act_int"] == [row[3] for row in ROWS]
+    assert columns["inj_qty_req"] == [row[5] for row in ROWS]
+
+
+def test_quoted_fields(tmp_path):
+    lines = [HEADER] + [",".join(f'"{value}"' for value in fields(row)) + "\n" for row in ROWS]
+    assert_rows(read(write(tmp_path, "quoted.csv", lines)))
+
+
+def test_headerless(tmp_path):
+    tokenizer._schemas.clear()
+    # A digits-only preamble line leaves the same (empty) header signature.
+    preamble = write(tmp_path, "preamble.csv", ["12345\n"] + [",".join(fields(row)) + "\n" for row in ROWS])
+    bare = write(tmp_path, "bare.csv", [",".join(fields(row)) + "\n" for row in ROWS])
+    assert_rows(read(preamble))
+    assert_rows(read(bare))
+    assert_rows(read(preamble))
+
+
+def test_decimal_comma(tmp_path):
+    tokenizer._schemas.clear()
+    header = HEADER.replace(",", ";")
+    dot = write(tmp_path, "dot.csv", [header] + [";".join(fields(row)) + "\n" for row in ROWS])
+    comma = write(tmp_path, "comma.csv", [header] + [";".join(fields(row, ",")) + "\n" for row in ROWS])
+    assert_rows(read(dot))
+    assert_rows(read(comma))
+    assert_rows(read(dot))
@@ -0,0 +1,59 @@
+"""
+The replay must tell candidate maps apart: a map closer to the one the logs
+ask for ranks ahead of the original, as tuner.tune() sorts them.
+"""
+
+import random
+
+from config import ROW_HEADERS, COL_HEADERS, DEFAULT_SENSITIVITY
+from evaluator import ReplayEvaluator
+from maps import updated_map
+
+COLUMNS = [float(text.replace(",", ".")) for text in COL_HEADERS]
+
+
+def make_samples(original, target, count=20000, seed=1):
+    """
+    Samples on the map points whose boost error follows k = DEFAULT_SENSITIVITY
+    from the target map, plus an offset between cells that confounds the fit.
+    """
+    rnd = random.Random(seed)
+    rpm, iq, error = [], [], []
+    for _ in range(count):
+        i = rnd.randrange(len(ROW_HEADERS))
+        j = rnd.randrange(len(COLUMNS))
+        rpm.append(ROW_HEADERS[i])
+        iq.append(COLUMNS[j])
+        error.append(DEFAULT_SENSITIVITY * (original[i][j] - target[i][j])
+                     + 0.6 * (target[i][j] - 40) + rnd.gauss(0, 30))
+    return rpm, iq, error
+
+
+def test_closer_map_ranks_first():
+    rnd = random.Random(0)
+    target = [[30 + 2 * i + rnd.uniform(-8, 8) for _ in COLUMNS] for i in range(len(ROW_HEADERS))]
+    original = [[value + rnd.uniform(-3, 3) for value in row] for row in target]
+    correction = {
+        (row_header, col_header): target[i][j] - original[i][j]
+        for i, row_header in enumerate(ROW_HEADERS)
+        for j, col_header in enumerate(COL_HEADERS)
+    }
+
+    evaluator = ReplayEvaluator(original)
+    evaluator.add_samples(*make_samples(original, target))
+    # The confounded slope is flat, so the fit must not be used.
+    assert evaluator.sensitivity == DEFAULT_SENSITIVITY
+
+    gains = [0.0, 0.25, 0.5, 1.0, 1.5]
+    scores = evaluator.score_many([updated_map(original, correction, gain) for gain in gains])
+    ranked = sorted(zip(gains, scores), key=lambda entry: entry[1]["rms"])
+    assert ranked[0][0] == 1.0
+    assert ranked[-1][0] == 0.0
+    assert ranked[0][1]["improvement"] > 0
+
+
+def test_sensitivity_override():
+    original = [[40.0] * len(COLUMNS) for _ in ROW_HEADERS]
+    evaluator = ReplayEvaluator(original, sensitivity=-12.5)
+    evaluator.add_samples([ROW_HEADERS[0]] * 3, [COLUMNS[0]] * 3, [10.0, 20.0, 30.0])
+    assert evaluator.sensitivity == -12.5
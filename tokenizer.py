@@ -0,0 +1,234 @@
+"""
+Log tokenizer that works out the layout of a log from its header block.
+
+VCDS logs differ between versions and locales: the delimiter may be a comma,
+semicolon or tab, numbers may use a decimal comma, and which column holds
+which channel depends on the selected measuring groups. The first
+HEADER_MAX_LINES lines (more if they hold no data line yet) are inspected
+once per log to find
+
+  - the delimiter and decimal separator,
+  - the column of every channel, by its name in the header (CHANNEL_NAMES),
+    falling back to the fixed csv_handler.COLUMNS indices,
+  - the first data line.
+
+The resulting LogSchema is cached per log format, keyed by the header lines
+without digits (channel names, units) and the delimiter, so logs of a known
+format skip the detection. A cached schema is only used if the first lines
+of the log agree with it (data starts on the same line, with the same decimal
+mark); headerless logs all share an empty signature. The data body is then
+read with a numeric-only fast path: a block of lines is split and every
+needed column is converted with map(float, ...) in one go; blocks with
+quoted fields are split with csv.reader, and only blocks containing a
+malformed line (marker, truncated row) are parsed row by row.
+"""
+
+import csv
+from array import array
+from operator import itemgetter
+
+from config import CHANNEL_NAMES, HEADER_MAX_LINES
+
+DELIMITERS = (";", "\t", ",")
+READ_BLOCK_BYTES = 1 << 20
+
+_schemas = {}   # (header signature, channels, delimiter) -> LogSchema
+
+
+class LogSchema:
+    def __init__(self, delimiter, decimal, indices, data_start):
+        """
+        :param indices: column index per channel, in the order of the channel list.
+        :param data_start: number of lines before the first data line (None if not found).
+        """
+        self.delimiter = delimiter
+        self.decimal = decimal
+        self.indices = indices
+        self.data_start = data_start
+
+    def __repr__(self):
+        return (f"LogSchema(delimiter={self.delimiter!r}, decimal={self.decimal!r}, "
+                f"indices={self.indices}, data_start={self.data_start})")
+
+
+def header_signature(lines):
+    """The lines describing the log format: those without digits (names, units)."""
+    return "\n".join(line.strip() for line in lines if not any(ch.isdigit() for ch in line))
+
+
+def _detect_delimiter(lines):
+    lines = [line for line in lines if line.strip()]
+    for delimiter in DELIMITERS[:-1]:
+        if sum(delimiter in line for line in lines) * 2 >= len(lines):
+            return delimiter
+    return DELIMITERS[-1]
+
+
+def _match_channels(fields, channels):
+    """Column index per channel by header name, or None if not all channels are named."""
+    names = [field.strip().strip("'\"").lower() for field in fields]
+    taken = set()
+    indices = []
+    for channel, _ in channels:
+        entries = CHANNEL_NAMES.get(channel, [])
+        found = None
+        # Exact names first (so "time" does not pick up e.g. "injection time").
+        for exact in (True, False):
+            for index, name in enumerate(names):
+                if index in taken or not name:
+                    continue
+                for words in entries:
+                    if (name == " ".join(words)) if exact else all(word in name for word in words):
+                        found = index
+                        break
+                if found is not None:
+                    break
+            if found is not None:
+                break
+        if found is None:
+            return None
+        taken.add(found)
+        indices.append(found)
+    return indices
+
+
+def _parse_number(text, decimal):
+    if decimal != ".":
+        text = text.replace(decimal, ".")
+    return float(text)
+
+
+def _is_data_row(fields, indices, decimal):
+    if len(fields) <= max(indices):
+        return False
+    try:
+        for index in indices:
+            _parse_number(fields[index], decimal)
+    except ValueError:
+        return False
+    return True
+
+
+def _schema_fits(schema, lines):
+    """Whether the first data line of 'lines' is where 'schema' says, with its decimal mark."""
+    if schema.data_start is None or schema.data_start >= len(lines):
+        return False
+    rows = list(csv.reader(lines[:schema.data_start + 1], delimiter=schema.delimiter))
+    if not _is_data_row(rows[-1], schema.indices, schema.decimal):
+        return False
+    if schema.decimal == "." and schema.delimiter != ",":
+        # A decimal comma in the first data line means another format.
+        if any("," in rows[-1][index] for index in schema.indices):
+            return False
+    decimals = (".", ",") if schema.delimiter != "," else (".",)
+    return not any(_is_data_row(fields, schema.indices, decimal)
+                   for fields in rows[:-1] for decimal in decimals)
+
+
+def detect_schema(lines, channels):
+    """
+    Works out the LogSchema from the first lines of a log.
+    'channels' is a sequence of (channel name, default column index).
+    data_start is None if none of the lines is a data line.
+    """
+    delimiter = _detect_delimiter(lines)
+    rows = list(csv.reader(lines, delimiter=delimiter))
+
+    indices = None
+    for fields in rows:
+        indices = _match_channels(fields, channels)
+        if indices is not None:
+            break
+    if indices is None:
+        indices = [index for _, index in channels]
+
+    # With a delimiter other than the comma, numbers may use a decimal comma.
+    decimals = (".", ",") if delimiter != "," else (".",)
+    data_start = None
+    for line_number, fields in enumerate(rows):
+        if any(_is_data_row(fields, indices, decimal) for decimal in decimals):
+            data_start = line_number
+            break
+    if data_start is None:
+        return LogSchema(delimiter, ".", indices, None)
+
+    decimal = "."
+    if delimiter != ",":
+        for fields in rows[data_start:]:
+            if any("," in fields[index] for index in indices if index < len(fields)):
+                decimal = ","
+                break
+    return LogSchema(delimiter, decimal, indices, data_start)
+
+
+def get_schema(lines, channels):
+    """detect_schema, cached per log format (see header_signature) if the lines fit the cached schema."""
+    key = (header_signature(lines), tuple(channels), _detect_delimiter(lines))
+    schema = _schemas.get(key)
+    if schema is None or not _schema_fits(schema, lines):
+        schema = detect_schema(lines, channels)
+        if schema.data_start is not None:
+            _schemas[key] = schema
+    return schema
+
+
+def _parse_block(lines, schema, columns):
+    """Appends the values of a block of data lines to 'columns' (one array per channel)."""
+    if schema.decimal != ".":
+        lines = [line.replace(schema.decimal, ".") for line in lines]
+    if any('"' in line for line in lines):
+        split = list(csv.reader(lines, delimiter=schema.delimiter))
+    else:
+        split = [line.split(schema.delimiter) for line in lines]
+    needed = max(schema.indices) + 1
+    try:
+        converted = [array("d", map(float, map(itemgetter(index), split))) for index in schema.indices]
+    except (ValueError, IndexError):
+        # Some line is not a data row; go through the block row by row.
+        converted = [array("d") for _ in schema.indices]
+        getter = itemgetter(*schema.indices)
+        for fields in split:
+            if len(fields) < needed:
+                continue
+            try:
+                values = [float(value) for value in getter(fields)]
+            except ValueError:
+                continue
+            for values_of_column, value in zip(converted, values):
+                values_of_column.append(value)
+    for column, values in zip(columns, converted):
+        column.extend(values)
+
+
+def iter_log_chunks(file_path, channels, chunk_rows):
+    """
+    Yields dictionaries of columns (channel name -> array of floats) of up to
+    'chunk_rows' rows, for the channels given as (name, default index) pairs.
+    Raises ValueError if the log has no data line.
+    """
+    names = [name for name, _ in channels]
+    with open(file_path, mode="r", encoding="utf-8", errors="replace") as f:
+        head = []
+        for line in f:
+            head.append(line)
+            if len(head) == HEADER_MAX_LINES:
+                break
+        schema = get_schema(head, channels)
+        # A preamble longer than the head: keep reading until a data line shows up.
+        while schema.data_start is None:
+            more = f.readlines(READ_BLOCK_BYTES)
+            if not more:
+                raise ValueError(f"No data lines found in {file_path}.")
+            head.extend(more)
+            schema = detect_schema(head, channels)
+
+        columns = [array("d") for _ in names]
+        block = head[schema.data_start:] or f.readlines(READ_BLOCK_BYTES)
+        while block:
+            _parse_block(block, schema, columns)
+            while len(columns[0]) >= chunk_rows:
+                yield {name: values[:chunk_rows] for name, values in zip(names, columns)}
+                columns = [values[chunk_rows:] for values in columns]
+            block = f.readlines(READ_BLOCK_BYTES)
+        if len(columns[0]):
+            yield dict(zip(names, columns))
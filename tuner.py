@@ -0,0 +1,125 @@
+"""
+Auto-tuner: searches Threshold 1/2, a global correction gain and the column
+fix for the map that the what-if replay (see evaluator.py) scores best.
+
+  - The correction table is computed from the training logs once per
+    threshold pair, in a process pool, by running the event detection over
+    the cached columns (the CSVs are only read if a log is not cached yet).
+  - Every (gain, column fix) variant of a table is cheap: it is scored on the
+    held-out logs with the replay evaluator in the parent process.
+  - Once TUNE_PATIENCE threshold pairs in a row brought no better map, the
+    pairs not started yet are cancelled.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config import (
+    TUNE_TH1_VALUES,
+    TUNE_TH2_VALUES,
+    TUNE_GAINS,
+    TUNE_PATIENCE
+)
+from accumulator import CorrectionAccumulator
+from analyzers import CorrectionAnalyzer
+from log_cache import get_cached, get_windows, analyze
+from maps import updated_map, fix_map
+from evaluator import ReplayEvaluator
+
+
+def threshold_table(file_paths, th1, th2, options=None):
+    """Averaged correction table of the (cached) logs for one threshold pair (runs in a worker process)."""
+    acc = CorrectionAccumulator()
+    for path in file_paths:
+        correction = CorrectionAnalyzer(th1, th2)
+        analyze(path, [correction], options)
+        acc.merge(correction.grid)
+    return acc.averaged()
+
+
+def split_logs(file_paths, holdout_every=4):
+    """
+    Splits the logs into (training, held-out): every holdout_every-th log is
+    held out. With a single log, it is used for both.
+    """
+    if len(file_paths) < 2:
+        return list(file_paths), list(file_paths)
+    held_out = file_paths[holdout_every - 1::holdout_every] or file_paths[-1:]
+    training = [p for p in file_paths if p not in held_out]
+    return training, held_out
+
+
+def threshold_pairs(th1_values=TUNE_TH1_VALUES, th2_values=TUNE_TH2_VALUES):
+    """All (th1, th2) combinations with th1 < th2."""
+    return [(th1, th2) for th1 in th1_values for th2 in th2_values if th1 < th2]
+
+
+def tune(original, training, held_out, options=None, pairs=None, gains=TUNE_GAINS,
+         column_fix=(False, True), patience=TUNE_PATIENCE, max_workers=None,
+         window_thresholds=None, sensitivity=None, on_progress=None):
+    """
+    Searches the candidate grid and returns the ranked list of candidates
+    (best first). Each entry is a dictionary with th1, th2, gain, column_fix,
+    rms, baseline_rms, improvement and the resulting (fixed) map.
+    'window_thresholds' are the (th1, th2) the held-out logs are already
+    indexed with, if any, so their window index is not rebuilt.
+    'sensitivity' fixes k of the replay (mbar per map percent) instead of
+    fitting it from the held-out logs.
+    'on_progress' is called with (pairs done, pairs total, best entry so far).
+    Raises ValueError if there are no training logs.
+    """
+    if not training:
+        raise ValueError("No training logs: every log is held out.")
+    pairs = pairs if pairs is not None else threshold_pairs()
+    ranked = []
+    if not pairs:
+        return ranked
+
+    # The acceleration windows do not depend on the thresholds, so the
+    # held-out samples are the same for every candidate.
+    th1, th2 = window_thresholds or pairs[0]
+    evaluator = ReplayEvaluator(original, sensitivity=sensitivity)
+    for path in held_out:
+        evaluator.add_log(*get_windows(path, th1, th2, options))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        # Make sure every training log is cached before the pairs start reading it.
+        for future in [pool.submit(get_cached, path, options) for path in training]:
+            future.result()
+
+        futures = {
+            pool.submit(threshold_table, training, th1, th2, options): (th1, th2)
+            for th1, th2 in pairs
+        }
+        best = None
+        since_best = 0
+        done = 0
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            th1, th2 = futures[future]
+            table = future.result()
+            done += 1
+
+            candidates = []
+            for gain in gains:
+                updated = updated_map(original, table, gain)
+                for fix in column_fix:
+                    candidates.append((gain, fix, fix_map(updated, fix)[1]))
+            scores = evaluator.score_many([candidate for _, _, candidate in candidates])
+            for (gain, fix, candidate), score in zip(candidates, scores):
+                ranked.append(dict(score, th1=th1, th2=th2, gain=gain, column_fix=fix, map=candidate))
+
+            pair_best = min(scores, key=lambda s: s["rms"])
+            if best is None or pair_best["rms"] < best["rms"]:
+                best = pair_best
+                since_best = 0
+            else:
+                since_best += 1
+            if on_progress is not None:
+                on_progress(done, len(pairs), min(ranked, key=lambda entry: entry["rms"]))
+            if since_best >= patience:
+                for pending in futures:
+                    pending.cancel()
+
+    ranked.sort(key=lambda entry: entry["rms"])
+    return ranked
@@ -1,4 +1,7 @@
 #!/usr/bin/env python3
+import os
+import queue
+import threading
 import tkinter as tk
 from tkinter import filedialog
 
@@ -6,21 +9,41 @@ from config import (
     ROW_HEADERS, 
     COL_HEADERS, 
     DEFAULT_THRESHOLD1, 
-    DEFAULT_THRESHOLD2
+    DEFAULT_THRESHOLD2,
+    DEFAULT_CONDITIONING,
+    AGGREGATION_MODES,
+    INSPECTOR_WINDOWS,
+    SERVICE_URL
 )
 from table import DataTable
-from csv_handler import (
-    parse_csv,
-    average_distributed_results,
-    print_distributed_table
+from maps import (
+    parse_vagedcsuite,
+    format_vagedcsuite,
+    parse_percent,
+    format_percent,
+    map_values,
+    updated_map,
+    fix_map
 )
+from csv_handler import print_distributed_table
+from logset import LogSet, parse_logs_parallel
+from log_view import LogListWindow
+from event_view import EventWindow
+from plot import TracePlot
+from log_cache import get_windows, cell_window_index
+from watcher import LogWatcher
+from evaluator import ReplayEvaluator
+from tuner import tune, split_logs
+from service import ServiceClient, accumulators_from_result
+from revisions import RevisionStore
+from revision_view import RevisionWindow
 
 class VAGEDCSuiteDataViewer(tk.Tk):
     def __init__(self):
         super().__init__()
 
         self.title("VAGEDCSuite Data Viewer")
-        self.geometry("1200x500")
+        self.geometry("1200x800")
 
         # Main frame to hold left toolbar & the table
         main_frame = tk.Frame(self)
@@ -46,6 +69,23 @@ class VAGEDCSuiteDataViewer(tk.Tk):
         th2_entry = tk.Entry(toolbar_frame, textvariable=self.th2_var, width=10)
         th2_entry.pack(anchor="w", pady=(0, 10))
 
+        # Signal conditioning (spike rejection, median filter, debounce)
+        self.condition_var = tk.BooleanVar(value=False)
+        condition_checkbox = tk.Checkbutton(
+            toolbar_frame,
+            text="Condition signals",
+            variable=self.condition_var,
+            bg="#f0f0f0"
+        )
+        condition_checkbox.pack(anchor="w", pady=(0, 10))
+
+        # Resample step in seconds (empty = use the logged samples as they are)
+        resample_label = tk.Label(toolbar_frame, text="Resample step (s):")
+        resample_label.pack(anchor="w")
+        self.resample_var = tk.StringVar(value="")
+        resample_entry = tk.Entry(toolbar_frame, textvariable=self.resample_var, width=10)
+        resample_entry.pack(anchor="w", pady=(0, 10))
+
         # Button: "Paste from VAGEDCSuite"
         paste_button = tk.Button(
             toolbar_frame, 
@@ -62,6 +102,58 @@ class VAGEDCSuiteDataViewer(tk.Tk):
         )
         pick_csv_button.pack(pady=10, fill=tk.X)
 
+        # Button: "Watch Folder" (toggles watch mode)
+        self.watch_button = tk.Button(
+            toolbar_frame,
+            text="Watch Folder",
+            command=self.toggle_watch
+        )
+        self.watch_button.pack(pady=(0, 10), fill=tk.X)
+
+        # Button: "Show Logs" (per-log toggles and deviation heatmap)
+        logs_button = tk.Button(
+            toolbar_frame,
+            text="Show Logs",
+            command=self.show_logs
+        )
+        logs_button.pack(pady=(0, 10), fill=tk.X)
+
+        # Button: "Show Events" (indexed acceleration windows of the loaded logs)
+        events_button = tk.Button(
+            toolbar_frame,
+            text="Show Events",
+            command=self.show_events
+        )
+        events_button.pack(pady=(0, 10), fill=tk.X)
+
+        # Button: "Evaluate Maps" (replays the loaded logs against original/updated/fixed map)
+        evaluate_button = tk.Button(
+            toolbar_frame,
+            text="Evaluate Maps",
+            command=self.evaluate_maps
+        )
+        evaluate_button.pack(pady=(0, 10), fill=tk.X)
+
+        # Button: "Auto-Tune" (searches thresholds and gain for the best map)
+        self.tune_button = tk.Button(
+            toolbar_frame,
+            text="Auto-Tune",
+            command=self.auto_tune
+        )
+        self.tune_button.pack(pady=(0, 10), fill=tk.X)
+
+        # Buttons: "Undo" / "Redo" step through the map revisions, "Revisions" lists them
+        history_frame = tk.Frame(toolbar_frame, bg="#f0f0f0")
+        history_frame.pack(pady=(0, 10), fill=tk.X)
+        tk.Button(history_frame, text="Undo", command=self.undo).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        tk.Button(history_frame, text="Redo", command=self.redo).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        revisions_button = tk.Button(
+            toolbar_frame,
+            text="Revisions",
+            command=self.show_revisions
+        )
+        revisions_button.pack(pady=(0, 10), fill=tk.X)
+
         # --- Mode Selector ---
         mode_label = tk.Label(toolbar_frame, text="Display Mode:")
         mode_label.pack(anchor="w")
@@ -84,6 +176,18 @@ class VAGEDCSuiteDataViewer(tk.Tk):
         )
         mode_menu.pack(anchor="w", pady=(0, 10))
 
+        # --- Aggregation of the log corrections (switching needs no re-parsing) ---
+        aggregation_label = tk.Label(toolbar_frame, text="Aggregation:")
+        aggregation_label.pack(anchor="w")
+        self.aggregation_var = tk.StringVar(value=AGGREGATION_MODES[0])
+        self.aggregation_var.trace_add("write", self.aggregation_changed)
+        aggregation_menu = tk.OptionMenu(
+            toolbar_frame,
+            self.aggregation_var,
+            *AGGREGATION_MODES
+        )
+        aggregation_menu.pack(anchor="w", pady=(0, 10))
+
         # --- Checkbox to toggle column adjustment ---
         self.apply_column_fix_var = tk.BooleanVar(value=False)
         column_fix_checkbox = tk.Checkbutton(
@@ -102,12 +206,45 @@ class VAGEDCSuiteDataViewer(tk.Tk):
         copy_button = tk.Button(toolbar_frame, text="Copy to VAGEDCSuite", command=self.copy_to_vagedcsuite)
         copy_button.pack(pady=10, fill=tk.X)
 
-        # --- The Table (right side) ---
-        self.data_table = DataTable(main_frame)
+        # --- Right side: the table above the boost trace plot ---
+        right_pane = tk.PanedWindow(main_frame, orient=tk.VERTICAL, sashrelief=tk.RAISED)
+        right_pane.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        table_frame = tk.Frame(right_pane)
+        right_pane.add(table_frame, stretch="always")
+
+        # --- The Table ---
+        self.data_table = DataTable(table_frame, cell_details=self.cell_details)
+
+        # --- The Plot ---
+        self.trace_plot = TracePlot(right_pane, on_choose_log=self.plot_log)
+        right_pane.add(self.trace_plot, stretch="always")
 
         # Store the last pasted table (a 2D list of strings) and CSV result.
         self.last_pasted_data = None
         self.color_table = None
+        # Per-log grids behind color_table; watch mode keeps adding to it.
+        self.log_set = LogSet()
+        self.log_window = None
+        # Thresholds and parse options the loaded logs were analyzed with.
+        self.log_params = None
+        self.plotted_path = None
+        # (row_header, col_header) -> [(log path, window, share)] for the cell inspector,
+        # built in the background on the first hover after the logs changed.
+        self.cell_windows = None
+        self.cell_windows_version = 0
+        self.indexing_version = None
+        self.window_queue = queue.Queue()
+        # Every pasted, updated, fixed and tuned map, for undo/redo and diffs.
+        self.revisions = RevisionStore(len(ROW_HEADERS), len(COL_HEADERS))
+        self.revision_window = None
+
+        # Background parsing (picked CSVs and watch mode) hands finished
+        # batches of (file_path, CorrectionAccumulator) over via this queue.
+        self.watcher = None
+        self.result_queue = queue.Queue()
+        # The auto-tuner hands its ranked candidates over the same way.
+        self.tune_queue = queue.Queue()
+        self.after(200, self.drain_results)
 
     def paste_from_clipboard(self):
         """Reads specialized data format from clipboard and updates the table."""
@@ -117,46 +254,21 @@ class VAGEDCSuiteDataViewer(tk.Tk):
             print("No valid clipboard data.")
             return
 
-        if not (data_str.startswith("2") and data_str.endswith("~")):
+        data_matrix = parse_vagedcsuite(data_str)
+        if data_matrix is None:
             print("Invalid data pasted!")
             return
 
-        data_str = data_str[1:].strip()  # remove leading '2'
-        chunks = data_str.split(':~')
-        chunks = [c.strip() for c in chunks if c.strip()]
-
-        row_count = len(ROW_HEADERS)
-        col_count = len(COL_HEADERS)
-        data_matrix = [
-            ["" for _ in range(col_count)] 
-            for __ in range(row_count)
-        ]
-
-        for chunk in chunks:
-            parts = chunk.split(':')
-            if len(parts) != 3:
-                continue
-            col_str, row_str, val_str = parts
-            try:
-                col = int(col_str)
-                row = int(row_str)
-                val = int(val_str)
-            except ValueError:
-                continue
-
-            if 0 <= row < row_count and 0 <= col < col_count:
-                num_value = (10000 - val) / 100.0
-                cell_text = f"{num_value:.2f}".replace('.', ',') + "%"
-                data_matrix[row][col] = cell_text
-
         self.last_pasted_data = data_matrix
+        self.add_revision(map_values(data_matrix), "original")
         # Update the display based on the current mode.
         self.mode_changed()
 
     def pick_csv_file(self):
         """
-        Opens a file dialog to pick one or more CSV files, parses each one,
-        and stores the averaged result from all CSV files.
+        Opens a file dialog to pick one or more CSV files and parses them in
+        parallel in the background. Each file keeps its own grid; the averaged
+        result over all of them is shown as they come in.
         """
         # Use askopenfilenames (note the plural) to allow multiple file selection.
         file_paths = filedialog.askopenfilenames(
@@ -166,6 +278,51 @@ class VAGEDCSuiteDataViewer(tk.Tk):
         if not file_paths:
             return
 
+        th1, th2 = self.get_thresholds()
+        options = self.get_parse_options()
+
+        # Picking files starts a new set of logs.
+        log_set = LogSet()
+        log_set.set_mode(self.aggregation_var.get())
+        self.log_set = log_set
+        self.log_params = (th1, th2, options)
+        if self.log_window is not None:
+            self.log_window.log_set = log_set
+
+        def on_result(path, acc):
+            self.result_queue.put((log_set, [(path, acc)]))
+
+        if SERVICE_URL:
+            threading.Thread(
+                target=self.parse_with_service,
+                args=(list(file_paths), th1, th2, options, log_set),
+                daemon=True
+            ).start()
+            return
+
+        # Only a single log prints its full trace; parallel output would interleave.
+        threading.Thread(
+            target=parse_logs_parallel,
+            args=(list(file_paths), th1, th2, on_result),
+            kwargs={"verbose": len(file_paths) == 1, "options": options},
+            daemon=True
+        ).start()
+
+    def parse_with_service(self, file_paths, th1, th2, options, log_set):
+        """Has the analysis service (see service.py) parse the logs; runs in a background thread."""
+        client = ServiceClient(SERVICE_URL)
+        try:
+            job = client.wait(client.submit(file_paths, th1, th2, options)["id"])
+        except (OSError, ValueError) as e:
+            print(f"Analysis service not available ({e}).")
+            return
+        if job["status"] != "done":
+            print(f"Analysis service job {job['id']} {job['status']}: {job.get('error', '')}")
+            return
+        self.result_queue.put((log_set, accumulators_from_result(job["result"])))
+
+    def get_thresholds(self):
+        """Returns (th1, th2) from the entries, falling back to the defaults."""
         try:
             th1 = float(self.th1_var.get())
         except ValueError:
@@ -174,26 +331,275 @@ class VAGEDCSuiteDataViewer(tk.Tk):
             th2 = float(self.th2_var.get())
         except ValueError:
             th2 = DEFAULT_THRESHOLD2
+        return th1, th2
+
+    def get_parse_options(self):
+        """Returns the extra parse_csv options (conditioning, resample_step) from the toolbar."""
+        options = {}
+        if self.condition_var.get():
+            options["conditioning"] = dict(DEFAULT_CONDITIONING)
+        try:
+            step = float(self.resample_var.get().replace(",", "."))
+        except ValueError:
+            step = 0
+        if step > 0:
+            options["resample_step"] = step
+        return options
+
+    def toggle_watch(self):
+        """
+        Starts or stops watch mode. While watching, every CSV that finishes in the
+        chosen directory is parsed in the background and added to the current result.
+        """
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+            self.watch_button.config(text="Watch Folder")
+            print("Stopped watching.")
+            return
 
-        # Accumulate distributed results from each CSV file.
-        all_distributed = []
-        for file_path in file_paths:
-            # parse_csv returns a list of dictionaries (distributed_results) for that file.
-            distributed_results = parse_csv(file_path, th1, th2)
-            # Extend our overall list.
-            all_distributed.extend(distributed_results)
+        directory = filedialog.askdirectory(title="Select Log Directory")
+        if not directory:
+            return
 
-        # Average the accumulated results.
-        avg_parsed_data = average_distributed_results(all_distributed, ROW_HEADERS, COL_HEADERS)
-        print("\n--- Averaged Distributed Table - Final ---")
-        print_distributed_table(avg_parsed_data, ROW_HEADERS, COL_HEADERS)
+        th1, th2 = self.get_thresholds()
+        options = self.get_parse_options()
+        self.log_params = (th1, th2, options)
+        self.watcher = LogWatcher(directory, th1, th2, options)
+        indexed = self.watcher.indexed_results()
+        if indexed:
+            # Logs processed in an earlier session come straight from the index.
+            self.result_queue.put((None, indexed))
+        # Watch batches always go into whatever log set is current.
+        self.watcher.start(lambda batch: self.result_queue.put((None, batch)))
+        self.watch_button.config(text="Stop Watching")
+        print(f"Watching {directory} ({len(indexed)} logs restored from index).")
+
+    def drain_results(self):
+        """
+        Adds all batches delivered by background parsing to the log set and
+        refreshes the table once. Runs on the Tk thread via after().
+        """
+        merged = False
+        while True:
+            try:
+                log_set, batch = self.result_queue.get_nowait()
+            except queue.Empty:
+                break
+            if log_set is not None and log_set is not self.log_set:
+                continue  # Result of an earlier pick that has been replaced.
+            for path, acc in batch:
+                print(f"Ingested {os.path.basename(path)}")
+                self.log_set.add(path, acc)
+            merged = True
+
+        if merged:
+            self.logs_changed()
+            print("\n--- Averaged Distributed Table - Final ---")
+            print_distributed_table(self.color_table, ROW_HEADERS, COL_HEADERS)
 
-        self.color_table = avg_parsed_data
+        try:
+            ranked = self.tune_queue.get_nowait()
+        except queue.Empty:
+            pass
+        else:
+            self.tuning_done(ranked)
 
-        # Update the table view (if pasted data already exists).
+        try:
+            version, index = self.window_queue.get_nowait()
+        except queue.Empty:
+            pass
+        else:
+            if version == self.cell_windows_version:
+                self.cell_windows = index
+                self.data_table.inspector.refresh()
+
+        self.after(200, self.drain_results)
+
+    def logs_changed(self):
+        """Recomputes color_table from the enabled logs and refreshes the views."""
+        self.color_table = self.log_set.averaged()
+        self.cell_windows = None
+        self.cell_windows_version += 1
+        self.trace_plot.set_log_choices(self.log_set.paths())
+        if self.log_window is not None:
+            self.log_window.refresh()
         if self.last_pasted_data is not None:
             self.mode_changed()
+            th1, th2, options = self.log_params
+            # One revision per analysis; batches arriving later amend it.
+            self.add_revision(
+                updated_map(map_values(self.last_pasted_data), self.color_table), "updated", amend=True,
+                logs=[p for p in self.log_set.paths() if self.log_set.is_enabled(p)],
+                th1=th1, th2=th2, options=options, aggregation=self.log_set.mode
+            )
+
+    def aggregation_changed(self, *args):
+        """Recombines the loaded logs with the chosen aggregation mode."""
+        self.log_set.set_mode(self.aggregation_var.get())
+        if len(self.log_set):
+            self.logs_changed()
+
+    def cell_details(self, row_header, col_header):
+        """
+        Lines for the table's cell inspector: the cell's correction and sample
+        count over the enabled logs and the acceleration windows behind it.
+        """
+        if self.color_table is None or self.log_params is None:
+            return []
+        key = (row_header, col_header)
+        lines = [
+            f"correction {self.color_table.get(key, 0):+.2f} ({self.log_set.mode}), "
+            f"{self.log_set.total.counts.get(key, 0)} samples"
+        ]
+        if self.cell_windows is None:
+            self.index_cell_windows()
+            lines.append("indexing windows...")
+            return lines
+        contributions = self.cell_windows.get(key, [])
+        if contributions:
+            lines.append(f"{len(contributions)} windows, largest shares:")
+            for path, window, share in sorted(contributions, key=lambda item: -abs(item[2]))[:INSPECTOR_WINDOWS]:
+                lines.append(
+                    f"  {os.path.basename(path)} {window['start_time']:.1f}-{window['end_time']:.1f} s: "
+                    f"{share:+.3f} ({len(window['events'])} events)"
+                )
+        return lines
+
+    def index_cell_windows(self):
+        """
+        Starts indexing the windows of the enabled logs per cell in the
+        background (unless already running for the current logs); the index
+        is handed over via window_queue and picked up by drain_results.
+        """
+        if self.indexing_version == self.cell_windows_version:
+            return
+        version = self.indexing_version = self.cell_windows_version
+        th1, th2, options = self.log_params
+        paths = [p for p in self.log_set.paths() if self.log_set.is_enabled(p)]
 
+        def run():
+            index = {}
+            try:
+                index = cell_window_index(paths, th1, th2, options)
+            finally:
+                self.window_queue.put((version, index))
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def show_logs(self):
+        """Opens (or raises) the window listing the loaded logs."""
+        if self.log_window is not None and self.log_window.winfo_exists():
+            self.log_window.lift()
+            return
+        self.log_window = LogListWindow(self, self.log_set, on_change=self.logs_changed)
+        self.log_window.protocol("WM_DELETE_WINDOW", self.close_logs)
+
+    def show_events(self):
+        """Opens a window listing the acceleration windows of the loaded logs."""
+        if not len(self.log_set):
+            print("No logs loaded.")
+            return
+        th1, th2, options = self.log_params
+        EventWindow(self, self.log_set.paths(), th1, th2, options, on_select=self.plot_window)
+
+    def plot_log(self, path):
+        """Shows a loaded log in the trace plot, with its events marked."""
+        th1, th2, options = self.log_params
+        cached, windows = get_windows(path, th1, th2, options)
+        self.trace_plot.set_log(cached, windows, title=os.path.basename(path))
+        self.plotted_path = os.path.abspath(path)
+
+    def plot_window(self, cached, window):
+        """Zooms the trace plot to an acceleration window picked in the events window."""
+        if self.plotted_path != cached.meta["path"]:
+            self.plot_log(cached.meta["path"])
+        # Show a little context before and after the window.
+        margin = max(10, (window["end_row"] - window["start_row"]) // 2)
+        self.trace_plot.show_range(window["start_row"] - margin, window["end_row"] + margin)
+
+    def evaluate_maps(self):
+        """
+        Predicts the RMS boost error the loaded logs would have had with the
+        original, updated and fixed map (see evaluator.py) and prints it.
+        The logs are replayed from the parse cache in the background.
+        """
+        if not self.last_pasted_data or self.color_table is None:
+            print("Either pasted data or CSV data is missing.")
+            return
+        th1, th2, options = self.log_params
+        original = map_values(self.last_pasted_data)
+        updated = updated_map(original, self.color_table)
+        _, fixed = fix_map(updated, self.apply_column_fix_var.get())
+        paths = [p for p in self.log_set.paths() if self.log_set.is_enabled(p)]
+
+        def run():
+            evaluator = ReplayEvaluator(original)
+            for path in paths:
+                evaluator.add_log(*get_windows(path, th1, th2, options))
+            print(f"\n--- Map evaluation ({evaluator.samples} samples, "
+                  f"sensitivity {evaluator.sensitivity:.2f} mbar per %) ---")
+            for name, score in zip(("original", "updated", "fixed"),
+                                   evaluator.score_many([original, updated, fixed])):
+                print(f"{name:<9} rms {score['rms']:>8.2f} mbar  improvement {score['improvement']:>+8.2f}")
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def auto_tune(self):
+        """
+        Searches Threshold 1/2, gain and column fix for the map with the lowest
+        predicted boost error (see tuner.py), using the loaded logs. The search
+        runs in the background; the best map is shown when it is done.
+        """
+        if not self.last_pasted_data or not len(self.log_set):
+            print("Either pasted data or CSV data is missing.")
+            return
+        th1, th2, options = self.log_params
+        original = map_values(self.last_pasted_data)
+        paths = [p for p in self.log_set.paths() if self.log_set.is_enabled(p)]
+        training, held_out = split_logs(paths)
+        print(f"Auto-tuning on {len(training)} logs, scoring on {len(held_out)} held-out logs...")
+        self.tune_button.config(state=tk.DISABLED)
+
+        def on_progress(done, total, best):
+            print(f"{done}/{total} threshold pairs, best rms {best['rms']:.2f}")
+
+        def run():
+            ranked = []
+            try:
+                ranked = tune(original, training, held_out, options,
+                              window_thresholds=(th1, th2), on_progress=on_progress)
+            except (OSError, ValueError) as e:
+                print(f"Auto-tune failed: {e}")
+            finally:
+                # tuning_done re-enables the button, also after a failure.
+                self.tune_queue.put(ranked)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def tuning_done(self, ranked):
+        """Shows the best auto-tuned map and takes over its thresholds and column fix setting."""
+        self.tune_button.config(state=tk.NORMAL)
+        if not ranked:
+            print("Nothing to tune.")
+            return
+        print("\n--- Auto-tune ranking ---")
+        for entry in ranked[:10]:
+            print(f"th1 {entry['th1']:>6g}  th2 {entry['th2']:>6g}  gain {entry['gain']:>5g}  "
+                  f"fix {'yes' if entry['column_fix'] else 'no':<3}  rms {entry['rms']:>8.2f}  "
+                  f"improvement {entry['improvement']:>+8.2f}")
+        best = ranked[0]
+        self.th1_var.set(str(best["th1"]))
+        self.th2_var.set(str(best["th2"]))
+        self.apply_column_fix_var.set(best["column_fix"])
+        # Shown like a fixed map, so "Copy to VAGEDCSuite" copies it.
+        self.data_table.update_table([[format_percent(v) for v in row] for row in best["map"]])
+        self.add_revision(best["map"], "tuned", th1=best["th1"], th2=best["th2"],
+                          gain=best["gain"], column_fix=best["column_fix"])
+
+    def close_logs(self):
+        self.log_window.destroy()
+        self.log_window = None
 
     def mode_changed(self, *args):
         """
@@ -238,6 +644,77 @@ class VAGEDCSuiteDataViewer(tk.Tk):
         """Callback for the 'Fix table' button. Also changes the view to Show fixed map."""
         self.data_table.fix_table(apply_column_fix=self.apply_column_fix_var.get())
         self.mode_var.set("Show fixed map")
+        if self.last_pasted_data and self.color_table is not None:
+            _, fixed = fix_map(updated_map(map_values(self.last_pasted_data), self.color_table),
+                               self.apply_column_fix_var.get())
+            self.add_revision(fixed, "fixed", column_fix=self.apply_column_fix_var.get())
+
+    # -----------------------
+    # Map revisions
+    # -----------------------
+    def add_revision(self, values, kind, **meta):
+        self.revisions.add(values, kind, **meta)
+        if self.revision_window is not None:
+            self.revision_window.refresh()
+
+    def show_revision(self, number):
+        """
+        Shows a revision in the table. An original map becomes the pasted map
+        again (so the modes work on it); other revisions are shown as they are,
+        ready for "Copy to VAGEDCSuite".
+        """
+        texts = [[format_percent(v) for v in row] for row in self.revisions.checkout(number)]
+        if self.revisions.meta(number)["kind"] == "original":
+            self.last_pasted_data = texts
+            self.mode_changed()
+        else:
+            self.data_table.update_table(texts)
+        if self.revision_window is not None:
+            self.revision_window.refresh()
+
+    def show_revision_diff(self, a, b):
+        """Shows revision b colored by its change against revision a, and prints the changed cells."""
+        texts = [[format_percent(v) for v in row] for row in self.revisions.map(b)]
+        changes = self.revisions.diff(a, b)
+        self.data_table.update_table(texts)
+        self.data_table.update_colors_from_csv({
+            (ROW_HEADERS[i], COL_HEADERS[j]): vb - va for (i, j), (va, vb) in changes.items()
+        })
+        print(f"\n--- Revision {b} against {a}: {len(changes)} cells changed ---")
+        for (i, j), (va, vb) in sorted(changes.items()):
+            print(f"{ROW_HEADERS[i]:>5} / {COL_HEADERS[j]:>6}: {va:7.2f} -> {vb:7.2f}")
+
+    def undo(self):
+        number = self.revisions.undo()
+        if number is None:
+            print("Nothing to undo.")
+            return
+        self.show_revision(number)
+
+    def redo(self):
+        number = self.revisions.redo()
+        if number is None:
+            print("Nothing to redo.")
+            return
+        self.show_revision(number)
+
+    def show_revisions(self):
+        """Opens (or raises) the window listing the map revisions."""
+        if self.revision_window is not None and self.revision_window.winfo_exists():
+            self.revision_window.lift()
+            return
+        self.revision_window = RevisionWindow(self, self.revisions, on_show=self.show_revision,
+                                              on_diff=self.show_revision_diff, on_load=self.revisions_loaded)
+        self.revision_window.protocol("WM_DELETE_WINDOW", self.close_revisions)
+
+    def revisions_loaded(self, store):
+        self.revisions = store
+        if store.current >= 0:
+            self.show_revision(store.current)
+
+    def close_revisions(self):
+        self.revision_window.destroy()
+        self.revision_window = None
 
     def copy_to_vagedcsuite(self):
         """
@@ -246,25 +723,13 @@ class VAGEDCSuiteDataViewer(tk.Tk):
         and copies the resulting string to the clipboard.
         The conversion is the reverse of what 'Paste from VAGEDCSuite' does.
         """
-        chunks = []
-        # Iterate over the table's cells.
-        for i, row in enumerate(self.data_table.cell_labels):
-            for j, lbl in enumerate(row):
-                text = lbl.cget("text")
-                if text and text.endswith("%"):
-                    # Remove the "%" and replace comma with dot.
-                    try:
-                        num_value = float(text.rstrip("%").replace(",", "."))
-                    except ValueError:
-                        continue
-                    # Reverse the transformation: 
-                    # pasted: num_value = (10000 - val) / 100  ==>  val = 10000 - num_value * 100
-                    val_int = int(round(10000 - num_value * 100))
-                    chunk = f"{j}:{i}:{val_int}"
-                    chunks.append(chunk)
-        if chunks:
-            # Join chunks with ":~", prefix with "2" and suffix with "~"
-            result = "2" + ":~".join(chunks) + "~"
+        values = [
+            [parse_percent(lbl.cget("text"), None) if lbl.cget("text").endswith("%") else None
+             for lbl in row]
+            for row in self.data_table.cell_labels
+        ]
+        result = format_vagedcsuite(values)
+        if result is not None:
             self.clipboard_clear()
             self.clipboard_append(result)
             print("Copied to clipboard:")
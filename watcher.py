@@ -0,0 +1,197 @@
+"""
+Watches a log directory and ingests finished CSV files in the background.
+
+A file counts as finished once its size has stayed the same for a number of
+consecutive polls. Every processed file is recorded (with its size, mtime and
+correction totals) in an index inside the watched directory, so a restart
+restores the accumulated result without parsing the backlog again. Files that
+cannot be parsed are recorded with the error and only tried again once they
+change.
+"""
+
+import json
+import os
+import threading
+
+from config import (
+    WATCH_POLL_INTERVAL,
+    WATCH_STABLE_POLLS,
+    WATCH_INDEX_FILE
+)
+from accumulator import CorrectionAccumulator
+from logset import parse_log_totals
+
+INDEX_VERSION = 2
+
+
+class LogWatcher:
+    def __init__(self, directory, th1, th2, options=None,
+                 poll_interval=WATCH_POLL_INTERVAL,
+                 stable_polls=WATCH_STABLE_POLLS,
+                 index_name=WATCH_INDEX_FILE):
+        self.directory = directory
+        self.th1 = th1
+        self.th2 = th2
+        # Extra parse_csv options (conditioning, resample_step), stored the way
+        # they come back from JSON so they compare equal to the index.
+        self.options = json.loads(json.dumps(options or {}))
+        self.poll_interval = poll_interval
+        self.stable_polls = stable_polls
+        self.index_path = os.path.join(directory, index_name)
+
+        # name -> (last seen size, number of polls the size stayed unchanged)
+        self._pending = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.index = self._load_index()
+
+    # -----------------------
+    # Index handling
+    # -----------------------
+    def _load_index(self):
+        """
+        Loads the index of processed files. Entries created with different
+        thresholds or parse options are dropped, since their
+        corrections would no longer match.
+        """
+        try:
+            with open(self.index_path, mode="r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = None
+
+        if (not isinstance(index, dict)
+                or index.get("version") != INDEX_VERSION
+                or index.get("th1") != self.th1
+                or index.get("th2") != self.th2
+                or index.get("options") != self.options):
+            index = {
+                "version": INDEX_VERSION,
+                "th1": self.th1,
+                "th2": self.th2,
+                "options": self.options,
+                "files": {}
+            }
+        return index
+
+    def _save_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, mode="w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def indexed_results(self):
+        """
+        Returns a list of (file_path, CorrectionAccumulator) for every file
+        in the index that still exists unchanged on disk.
+        """
+        results = []
+        for name, entry in sorted(self.index["files"].items()):
+            if "totals" not in entry:
+                continue  # File that could not be parsed.
+            stat = self._stat(name)
+            if stat is None or stat.st_size != entry["size"] or stat.st_mtime != entry["mtime"]:
+                continue
+            results.append((os.path.join(self.directory, name),
+                            CorrectionAccumulator.from_dict(entry["totals"])))
+        return results
+
+    # -----------------------
+    # Polling
+    # -----------------------
+    def _stat(self, name):
+        try:
+            return os.stat(os.path.join(self.directory, name))
+        except OSError:
+            return None
+
+    def _is_indexed(self, name, stat):
+        entry = self.index["files"].get(name)
+        return (entry is not None
+                and entry["size"] == stat.st_size
+                and entry["mtime"] == stat.st_mtime)
+
+    def poll(self):
+        """
+        Scans the directory once, parses every file that has become stable
+        since the last poll and returns the batch as a list of
+        (file_path, CorrectionAccumulator). Returns an empty list if nothing new is ready.
+        """
+        try:
+            names = sorted(os.listdir(self.directory))
+        except OSError as e:
+            print(f"Cannot read watch directory {self.directory}: {e}")
+            return []
+
+        ready = []
+        seen = set()
+        for name in names:
+            if not name.lower().endswith(".csv"):
+                continue
+            stat = self._stat(name)
+            if stat is None or stat.st_size == 0 or self._is_indexed(name, stat):
+                continue
+            seen.add(name)
+
+            last_size, stable = self._pending.get(name, (None, 0))
+            stable = stable + 1 if stat.st_size == last_size else 0
+            self._pending[name] = (stat.st_size, stable)
+            if stable >= self.stable_polls:
+                ready.append((name, stat))
+
+        # Forget files that disappeared before they were finished.
+        for name in list(self._pending):
+            if name not in seen:
+                del self._pending[name]
+
+        batch = []
+        for name, stat in ready:
+            del self._pending[name]
+            path = os.path.join(self.directory, name)
+            try:
+                acc = parse_log_totals(path, self.th1, self.th2, options=self.options)
+            except (OSError, ValueError) as e:
+                print(f"Skipping {path}: {e}")
+                self.index["files"][name] = {
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime,
+                    "error": str(e)
+                }
+                continue
+            self.index["files"][name] = {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "totals": acc.to_dict()
+            }
+            batch.append((path, acc))
+
+        if ready:
+            self._save_index()
+        return batch
+
+    def run(self, on_batch):
+        """
+        Polls until stop() is called, passing every non-empty batch to on_batch.
+        """
+        while not self._stop_event.is_set():
+            batch = self.poll()
+            if batch:
+                on_batch(batch)
+            self._stop_event.wait(self.poll_interval)
+
+    def start(self, on_batch):
+        """Runs the polling loop in a daemon thread."""
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, args=(on_batch,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Ends the polling loop and waits for it, so a file that is being parsed
+        right now is still finished (and indexed) before stop() returns.
+        """
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None